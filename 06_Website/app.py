@@ -9,13 +9,63 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import time
 from pathlib import Path
 
+from modules.player_store import read_players, dataset_signature
+from modules.similarity import SimilarityIndex
+from modules.percentiles import PercentileEngine, age_groups
+from modules.filters import FilterEngine
+from modules.name_index import NameIndex
+from modules.metrics import add_derived_columns
+from modules.shared_data import attach_or_publish, remove_stale
+from modules.lru import LRUCache
+from modules.binning import ScatterBins, BINNING_MIN_POINTS
+from modules.timing import SpanRecorder, RerunProfiler
+
 # Get the directory of this script for proper path resolution
 SCRIPT_DIR = Path(__file__).parent.resolve()
-DATA_PATH = SCRIPT_DIR.parent / 'data' / 'players_data_light-2024_2025.csv'
+# A season CSV, or a PlayerStore directory (modules/player_store.py) holding many seasons
+DATA_PATH = Path(os.environ.get('SCOUT_DATA') or SCRIPT_DIR.parent / 'data' / 'players_data_light-2024_2025.csv')
+
+# Which seasons and leagues to load, comma separated (all by default), e.g.
+# SCOUT_SEASONS=2022-2023,2023-2024,2024-2025 SCOUT_LEAGUES="Premier League,La Liga"
+# With a store only the matching partitions are read.
+DATA_QUERY = {
+    'seasons': os.environ['SCOUT_SEASONS'].split(',') if os.environ.get('SCOUT_SEASONS') else None,
+    'leagues': os.environ['SCOUT_LEAGUES'].split(',') if os.environ.get('SCOUT_LEAGUES') else None,
+    'min_minutes': 450,
+}
+
+# Only these raw columns are used by the pages, so only these are read from the cache
+DATA_COLUMNS = ['Player', 'Pos', 'Squad', 'Comp', 'Age', 'Min', '90s', 'Gls', 'Ast', 'G+A',
+                'xG', 'xAG', 'PrgC', 'PrgP', 'Tkl', 'Int', 'SCA']
+
+SIMILARITY_METRICS = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90',
+                      'Prog Carries per 90', 'Prog Passes per 90', 'Tackles per 90', 'Interceptions per 90']
+
+PERCENTILE_METRICS = SIMILARITY_METRICS + ['G+A per 90', 'Shot Creating per 90']
+PERCENTILE_COHORTS = {
+    'position': ['Position'],
+    'league_position': ['League', 'Position'],
+    'age_position': ['Age Group', 'Position'],
+}
+
+# Multi-worker mode: when set, the first worker publishes the cleaned data and index
+# arrays to this directory and every worker memory-maps them instead of re-parsing the CSV
+SHARED_DIR = os.environ.get('SCOUT_SHARED_DIR')
+SHARED_FORMAT = 1  # bump when derived columns or index layouts change
+
+# Large player pools: search similar players with the approximate (IVF) index
+APPROXIMATE_SIMILARITY = os.environ.get('SCOUT_APPROXIMATE_SIMILARITY') == '1'
+
+# Plotly figures kept per worker, keyed by dataset version and the widget values they depend on
+FIGURE_CACHE_SIZE = 128
+
+# Explore scatter: WebGL above this many players; from BINNING_MIN_POINTS crowded areas are
+# drawn as grid cells (modules/binning.py) and only the players around them as points
+SCATTER_WEBGL_MIN = 1000
 
 st.set_page_config(
     page_title="Scout Tool",
@@ -274,38 +324,63 @@ st.markdown("""
 
 # ============ SESSION STATE ============
 if 'page' not in st.session_state:
-    st.session_state.page = 'compare'
+    # ?page=diagnostics opens the diagnostics page, which has no nav button
+    st.session_state.page = 'diagnostics' if st.query_params.get('page') == 'diagnostics' else 'compare'
+
+# ============ TIMING ============
+@st.cache_resource
+def load_timings():
+    # One recorder per worker process, shared by every session
+    return SpanRecorder()
+
+timings = load_timings()
+span = timings.span
+page = st.session_state.page
+rerun_start = time.perf_counter()
 
 # ============ LOAD DATA ============
-@st.cache_data
-def load_data():
-    df = pd.read_csv(DATA_PATH)
+def build_data():
+    df = read_players(DATA_PATH, columns=DATA_COLUMNS, **DATA_QUERY)
     df = df[df['Min'] >= 450].copy()
 
-    df['Goals per 90'] = (df['Gls'] / df['90s']).round(2)
-    df['Assists per 90'] = (df['Ast'] / df['90s']).round(2)
-    df['xG per 90'] = (df['xG'] / df['90s']).round(2)
-    df['xAG per 90'] = (df['xAG'] / df['90s']).round(2)
-    df['G+A per 90'] = (df['G+A'] / df['90s']).round(2)
-    df['Prog Carries per 90'] = (df['PrgC'] / df['90s']).round(2)
-    df['Prog Passes per 90'] = (df['PrgP'] / df['90s']).round(2)
-    df['Tackles per 90'] = (df['Tkl'] / df['90s']).round(2)
-    df['Interceptions per 90'] = (df['Int'] / df['90s']).round(2)
-    df['Shot Creating per 90'] = (df['SCA'] / df['90s']).round(2)
-
-    def simplify_pos(pos):
-        if pd.isna(pos): return 'Unknown'
-        if 'GK' in pos: return 'GK'
-        if 'FW' in pos: return 'FW'
-        if 'MF' in pos: return 'MF'
-        if 'DF' in pos: return 'DF'
-        return 'Unknown'
-
-    df['Position'] = df['Pos'].apply(simplify_pos)
-    df['League'] = df['Comp'].str.replace('eng ', '').str.replace('es ', '').str.replace('de ', '').str.replace('it ', '').str.replace('fr ', '')
+    # App-labelled per-90 metrics rounded for display, plus Position and League
+    add_derived_columns(df, app_labels=True, decimals=2, dtype=np.float64)
+    df['Age Group'] = age_groups(df['Age'])
     return df
 
-df = load_data()
+@st.cache_data
+def load_local_data():
+    return build_data()
+
+def build_shared():
+    # Everything other workers attach to: the cleaned frame plus precomputed index arrays
+    df = build_data()
+    similarity = SimilarityIndex(df, SIMILARITY_METRICS, key_col='Player', group_col='Position')
+    percentiles = PercentileEngine(df, PERCENTILE_COHORTS)
+    percentiles.prepare(PERCENTILE_METRICS)
+    arrays = {f'similarity::{k}': v for k, v in similarity.shared_arrays().items()}
+    arrays.update({f'percentiles::{k}': v for k, v in percentiles.shared_arrays().items()})
+    return df, arrays
+
+@st.cache_resource
+def load_shared_dataset():
+    version = f'{dataset_signature(DATA_PATH, **DATA_QUERY)[:12]}-v{SHARED_FORMAT}'
+    shared = attach_or_publish(SHARED_DIR, version, build_shared)
+    remove_stale(SHARED_DIR, keep=version)
+    return shared
+
+def load_data():
+    # Shared mode hands out the memory-mapped frame itself, with no per-session copy
+    if SHARED_DIR:
+        return load_shared_dataset().frame
+    return load_local_data()
+
+def shared_arrays(prefix):
+    return load_shared_dataset().arrays(prefix) if SHARED_DIR else None
+
+@st.cache_resource
+def dataset_version():
+    return dataset_signature(DATA_PATH, **DATA_QUERY)[:12]
 
 METRIC_NAMES = {
     'Goals per 90': 'Goals per 90',
@@ -327,147 +402,199 @@ COLORS = {
 }
 
 # ============ SIMILARITY FUNCTION ============
+@st.cache_resource
+def load_similarity_index():
+    # Built once per dataset version (load_data is cached), shared across sessions
+    return SimilarityIndex(load_data(), SIMILARITY_METRICS, key_col='Player', group_col='Position',
+                           arrays=shared_arrays('similarity'), approximate=APPROXIMATE_SIMILARITY)
+
 def find_similar_players(player_name, df, n=5):
-    metrics = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90',
-               'Prog Carries per 90', 'Prog Passes per 90', 'Tackles per 90', 'Interceptions per 90']
-    player_data = df[df['Player'] == player_name]
-    if len(player_data) == 0:
+    labels, scores = load_similarity_index().query(player_name, n)
+    if len(labels) == 0:
         return pd.DataFrame()
-    position = player_data['Position'].iloc[0]
-    pos_df = df[df['Position'] == position].copy()
-    X = pos_df[metrics].fillna(0)
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    player_idx = pos_df[pos_df['Player'] == player_name].index[0]
-    player_idx_in_array = list(pos_df.index).index(player_idx)
-    similarities = cosine_similarity([X_scaled[player_idx_in_array]], X_scaled)[0]
-    pos_df['Similarity'] = similarities
-    similar = pos_df[pos_df['Player'] != player_name].nlargest(n, 'Similarity')
-    return similar[['Player', 'Squad', 'League', 'Age', 'Similarity', 'Goals per 90', 'Assists per 90']]
-
-# ============ HEADER - Single row with logo + nav buttons ============
-header_cols = st.columns([1.5, 1, 1, 1, 1, 1])
-
-with header_cols[0]:
-    st.markdown('<h2 style="margin:0;padding:10px 0;">⚽ Scout Tool</h2>', unsafe_allow_html=True)
-
-with header_cols[1]:
-    if st.button("📊 Compare", key="nav_compare", use_container_width=True, type="primary" if st.session_state.page == 'compare' else "secondary"):
-        st.session_state.page = 'compare'
-        st.rerun()
-with header_cols[2]:
-    if st.button("🔍 Similar", key="nav_similar", use_container_width=True, type="primary" if st.session_state.page == 'similar' else "secondary"):
-        st.session_state.page = 'similar'
-        st.rerun()
-with header_cols[3]:
-    if st.button("📈 Explore", key="nav_explore", use_container_width=True, type="primary" if st.session_state.page == 'explore' else "secondary"):
-        st.session_state.page = 'explore'
-        st.rerun()
-with header_cols[4]:
-    if st.button("📋 Database", key="nav_database", use_container_width=True, type="primary" if st.session_state.page == 'database' else "secondary"):
-        st.session_state.page = 'database'
-        st.rerun()
-with header_cols[5]:
-    if st.button("ℹ️ About", key="nav_about", use_container_width=True, type="primary" if st.session_state.page == 'about' else "secondary"):
-        st.session_state.page = 'about'
-        st.rerun()
-
-st.divider()
-
-# ============ PAGE CONTENT ============
-if st.session_state.page == 'compare':  # COMPARE
-    st.markdown('<p class="page-title">Player Comparison</p>', unsafe_allow_html=True)
-    st.markdown('<p class="page-subtitle">Compare two players side-by-side using percentile rankings</p>', unsafe_allow_html=True)
-
-    st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-    c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.2, 2])
-    with c1: league = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="c_lg")
-    with c2: pos = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="c_pos")
-    with c3: mins = st.selectbox("Minimum Minutes", [450, 900, 1350, 1800], index=1, key="c_min")
-    with c4: ages = st.slider("Age Range", 16, 40, (18, 35), key="c_age")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    fdf = df.copy()
-    if league != 'All': fdf = fdf[fdf['League'] == league]
-    if pos != 'All': fdf = fdf[fdf['Position'] == pos]
-    fdf = fdf[(fdf['Age'] >= ages[0]) & (fdf['Age'] <= ages[1]) & (fdf['Min'] >= mins)]
-
-    st.markdown(f'<div class="pill">✓ {len(fdf)} players found</div>', unsafe_allow_html=True)
-
-    players = sorted(fdf['Player'].unique().tolist())
-    if len(players) >= 2:
-        c1, c2 = st.columns(2)
-        with c1: p1 = st.selectbox("Select Player 1", players, index=0, key="p1")
-        with c2: p2 = st.selectbox("Select Player 2", players, index=min(1, len(players)-1), key="p2")
-
-        p1d, p2d = df[df['Player'] == p1].iloc[0], df[df['Player'] == p2].iloc[0]
-        position = p1d['Position']
-
-        if position == 'FW':
-            metrics = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90', 'Shot Creating per 90', 'Prog Carries per 90']
-            chart_names = ['Goals', 'Assists', 'xG', 'xAG', 'Shot Creating', 'Prog Carries']
-        elif position == 'MF':
-            metrics = ['Goals per 90', 'Assists per 90', 'Prog Passes per 90', 'Prog Carries per 90', 'Tackles per 90', 'Interceptions per 90']
-            chart_names = ['Goals', 'Assists', 'Prog Passes', 'Prog Carries', 'Tackles', 'Interceptions']
-        elif position == 'DF':
-            metrics = ['Tackles per 90', 'Interceptions per 90', 'Prog Passes per 90', 'Prog Carries per 90', 'Goals per 90', 'Assists per 90']
-            chart_names = ['Tackles', 'Interceptions', 'Prog Passes', 'Prog Carries', 'Goals', 'Assists']
-        else:
-            metrics = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90', 'Shot Creating per 90', 'Prog Carries per 90']
-            chart_names = ['Goals', 'Assists', 'xG', 'xAG', 'Shot Creating', 'Prog Carries']
-
-        pos_df = df[df['Position'] == position]
-        def pct(d, m): return (pos_df[m] < d[m]).sum() / len(pos_df) * 100 if not pd.isna(d[m]) else 0
+    similar = df.loc[labels, ['Player', 'Squad', 'League', 'Age', 'Goals per 90', 'Assists per 90']].copy()
+    similar.insert(4, 'Similarity', scores.astype(float))
+    return similar
+
+# ============ PERCENTILES ============
+@st.cache_resource
+def load_percentile_engine():
+    return PercentileEngine(load_data(), PERCENTILE_COHORTS, arrays=shared_arrays('percentiles'))
+
+# ============ FILTERS ============
+@st.cache_resource
+def load_filter_engine():
+    return FilterEngine(load_data(), categorical=['League', 'Position', 'Squad'], ranges=['Age', 'Min'])
+
+def filter_rows(league='All', position='All', ages=None, min_minutes=None):
+    # Row positions in df matching the page filters ('All' means no filter)
+    return load_filter_engine().select(
+        League=None if league == 'All' else league,
+        Position=None if position == 'All' else position,
+        Age=ages,
+        Min=(min_minutes, None) if min_minutes is not None else None,
+    )
 
-        v1, v2 = [pct(p1d, m) for m in metrics], [pct(p2d, m) for m in metrics]
+# ============ FIGURES ============
+@st.cache_resource
+def load_figure_cache():
+    # Shared by every session of this worker; figures taken from it must not be modified
+    return LRUCache(FIGURE_CACHE_SIZE)
+
+def cached_figure(page, key, build):
+    # build() runs only when this dataset version and widget state has no figure yet
+    return load_figure_cache().get_or_build((dataset_version(), page) + tuple(key), build)
+
+# ============ PLAYER NAMES ============
+@st.cache_resource
+def load_name_index():
+    return NameIndex(load_data()['Player'])
+
+def player_row(name):
+    # First row for an exact player name
+    return df.iloc[load_name_index().first(name)]
+
+# Opt-in cProfile capture of one whole rerun (requested from the diagnostics page)
+profiler = None
+if st.session_state.get('profile_next_rerun'):
+    profiler = RerunProfiler()
+    profiler.start()
+
+# From here on the rerun runs inside try, so the profiler is stopped however it ends
+try:
+    with span('load_data'):
+        df = load_data()
+
+    # ============ HEADER - Single row with logo + nav buttons ============
+    header_cols = st.columns([1.5, 1, 1, 1, 1, 1])
+
+    with header_cols[0]:
+        st.markdown('<h2 style="margin:0;padding:10px 0;">⚽ Scout Tool</h2>', unsafe_allow_html=True)
+
+    with header_cols[1]:
+        if st.button("📊 Compare", key="nav_compare", use_container_width=True, type="primary" if st.session_state.page == 'compare' else "secondary"):
+            st.session_state.page = 'compare'
+            st.rerun()
+    with header_cols[2]:
+        if st.button("🔍 Similar", key="nav_similar", use_container_width=True, type="primary" if st.session_state.page == 'similar' else "secondary"):
+            st.session_state.page = 'similar'
+            st.rerun()
+    with header_cols[3]:
+        if st.button("📈 Explore", key="nav_explore", use_container_width=True, type="primary" if st.session_state.page == 'explore' else "secondary"):
+            st.session_state.page = 'explore'
+            st.rerun()
+    with header_cols[4]:
+        if st.button("📋 Database", key="nav_database", use_container_width=True, type="primary" if st.session_state.page == 'database' else "secondary"):
+            st.session_state.page = 'database'
+            st.rerun()
+    with header_cols[5]:
+        if st.button("ℹ️ About", key="nav_about", use_container_width=True, type="primary" if st.session_state.page == 'about' else "secondary"):
+            st.session_state.page = 'about'
+            st.rerun()
+
+    st.divider()
+
+    # ============ PAGE CONTENT ============
+    if st.session_state.page == 'compare':  # COMPARE
+        st.markdown('<p class="page-title">Player Comparison</p>', unsafe_allow_html=True)
+        st.markdown('<p class="page-subtitle">Compare two players side-by-side using percentile rankings</p>', unsafe_allow_html=True)
+
+        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+        c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.2, 2])
+        with c1: league = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="c_lg")
+        with c2: pos = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="c_pos")
+        with c3: mins = st.selectbox("Minimum Minutes", [450, 900, 1350, 1800], index=1, key="c_min")
+        with c4: ages = st.slider("Age Range", 16, 40, (18, 35), key="c_age")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        with span('compare.filter'):
+            rows = filter_rows(league, pos, ages, mins)
+            players = load_name_index().names(rows)
+
+        st.markdown(f'<div class="pill">✓ {len(rows)} players found</div>', unsafe_allow_html=True)
+
+        if len(players) >= 2:
+            c1, c2 = st.columns(2)
+            with c1: p1 = st.selectbox("Select Player 1", players, index=0, key="p1")
+            with c2: p2 = st.selectbox("Select Player 2", players, index=min(1, len(players)-1), key="p2")
+
+            p1d, p2d = player_row(p1), player_row(p2)
+            position = p1d['Position']
+
+            if position == 'FW':
+                metrics = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90', 'Shot Creating per 90', 'Prog Carries per 90']
+                chart_names = ['Goals', 'Assists', 'xG', 'xAG', 'Shot Creating', 'Prog Carries']
+            elif position == 'MF':
+                metrics = ['Goals per 90', 'Assists per 90', 'Prog Passes per 90', 'Prog Carries per 90', 'Tackles per 90', 'Interceptions per 90']
+                chart_names = ['Goals', 'Assists', 'Prog Passes', 'Prog Carries', 'Tackles', 'Interceptions']
+            elif position == 'DF':
+                metrics = ['Tackles per 90', 'Interceptions per 90', 'Prog Passes per 90', 'Prog Carries per 90', 'Goals per 90', 'Assists per 90']
+                chart_names = ['Tackles', 'Interceptions', 'Prog Passes', 'Prog Carries', 'Goals', 'Assists']
+            else:
+                metrics = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90', 'Shot Creating per 90', 'Prog Carries per 90']
+                chart_names = ['Goals', 'Assists', 'xG', 'xAG', 'Shot Creating', 'Prog Carries']
+
+            def build_radar():
+                # Both players are ranked against Player 1's position group
+                with span('compare.percentiles'):
+                    engine = load_percentile_engine()
+                    def pct(d, m): return engine.percentile_of_value(d[m], m, position)
+
+                    v1, v2 = [pct(p1d, m) for m in metrics], [pct(p2d, m) for m in metrics]
+
+                with span('compare.figure'):
+                    fig = go.Figure()
+                    fig.add_trace(go.Scatterpolar(r=v1+[v1[0]], theta=chart_names+[chart_names[0]], fill='toself', name=p1, line=dict(color='#166534', width=3), fillcolor='rgba(22,101,52,0.2)'))
+                    fig.add_trace(go.Scatterpolar(r=v2+[v2[0]], theta=chart_names+[chart_names[0]], fill='toself', name=p2, line=dict(color='#3b82f6', width=3), fillcolor='rgba(59,130,246,0.2)'))
+                    fig.update_layout(
+                        polar=dict(bgcolor='#fafafa', radialaxis=dict(visible=True, range=[0,100], gridcolor='#e5e5e5'), angularaxis=dict(gridcolor='#e5e5e5', tickfont=dict(color='#166534', size=12))),
+                        showlegend=True, legend=dict(font=dict(color='#166534'), bgcolor='white'),
+                        paper_bgcolor='rgba(0,0,0,0)', font=dict(color='#166534'), height=480, margin=dict(t=60,b=40,l=80,r=80)
+                    )
+                return fig
+
+            fig = cached_figure('compare', (p1, p2, position), build_radar)
+            with span('compare.render'):
+                st.plotly_chart(fig, use_container_width=True)
+
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown(f'''<div class="player-card"><h3 style="color:#166534 !important;">🟢 {p1}</h3><p><strong>Team:</strong> {p1d['Squad']}</p><p><strong>League:</strong> {p1d['League']}</p><p><strong>Age:</strong> {int(p1d['Age'])} <span class="stat-chip">{p1d['Pos']}</span></p><p><strong>Minutes:</strong> {int(p1d['Min']):,}</p><hr style="border:none;border-top:1px solid #e0e5e1;margin:14px 0;"><p><strong>Goals:</strong> {int(p1d['Gls'])} <span style="color:#6b7b6b;">(xG: {p1d['xG']:.1f})</span></p><p><strong>Assists:</strong> {int(p1d['Ast'])} <span style="color:#6b7b6b;">(xAG: {p1d['xAG']:.1f})</span></p></div>''', unsafe_allow_html=True)
+            with c2:
+                st.markdown(f'''<div class="player-card"><h3 style="color:#3b82f6 !important;">🔵 {p2}</h3><p><strong>Team:</strong> {p2d['Squad']}</p><p><strong>League:</strong> {p2d['League']}</p><p><strong>Age:</strong> {int(p2d['Age'])} <span class="stat-chip">{p2d['Pos']}</span></p><p><strong>Minutes:</strong> {int(p2d['Min']):,}</p><hr style="border:none;border-top:1px solid #e0e5e1;margin:14px 0;"><p><strong>Goals:</strong> {int(p2d['Gls'])} <span style="color:#6b7b6b;">(xG: {p2d['xG']:.1f})</span></p><p><strong>Assists:</strong> {int(p2d['Ast'])} <span style="color:#6b7b6b;">(xAG: {p2d['xAG']:.1f})</span></p></div>''', unsafe_allow_html=True)
+        else:
+            st.warning("Adjust filters to show at least 2 players.")
 
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(r=v1+[v1[0]], theta=chart_names+[chart_names[0]], fill='toself', name=p1, line=dict(color='#166534', width=3), fillcolor='rgba(22,101,52,0.2)'))
-        fig.add_trace(go.Scatterpolar(r=v2+[v2[0]], theta=chart_names+[chart_names[0]], fill='toself', name=p2, line=dict(color='#3b82f6', width=3), fillcolor='rgba(59,130,246,0.2)'))
-        fig.update_layout(
-            polar=dict(bgcolor='#fafafa', radialaxis=dict(visible=True, range=[0,100], gridcolor='#e5e5e5'), angularaxis=dict(gridcolor='#e5e5e5', tickfont=dict(color='#166534', size=12))),
-            showlegend=True, legend=dict(font=dict(color='#166534'), bgcolor='white'),
-            paper_bgcolor='rgba(0,0,0,0)', font=dict(color='#166534'), height=480, margin=dict(t=60,b=40,l=80,r=80)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    elif st.session_state.page == 'similar':  # SIMILAR
+        st.markdown('<p class="page-title">Find Similar Players</p>', unsafe_allow_html=True)
+        st.markdown('<p class="page-subtitle">Discover statistically similar players using machine learning</p>', unsafe_allow_html=True)
 
-        c1, c2 = st.columns(2)
+        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+        c1, c2 = st.columns([3, 1])
         with c1:
-            st.markdown(f'''<div class="player-card"><h3 style="color:#166534 !important;">🟢 {p1}</h3><p><strong>Team:</strong> {p1d['Squad']}</p><p><strong>League:</strong> {p1d['League']}</p><p><strong>Age:</strong> {int(p1d['Age'])} <span class="stat-chip">{p1d['Pos']}</span></p><p><strong>Minutes:</strong> {int(p1d['Min']):,}</p><hr style="border:none;border-top:1px solid #e0e5e1;margin:14px 0;"><p><strong>Goals:</strong> {int(p1d['Gls'])} <span style="color:#6b7b6b;">(xG: {p1d['xG']:.1f})</span></p><p><strong>Assists:</strong> {int(p1d['Ast'])} <span style="color:#6b7b6b;">(xAG: {p1d['xAG']:.1f})</span></p></div>''', unsafe_allow_html=True)
+            all_players = load_name_index().names()
+            selected_player = st.selectbox("Select a Player", all_players, key="sim_player")
         with c2:
-            st.markdown(f'''<div class="player-card"><h3 style="color:#3b82f6 !important;">🔵 {p2}</h3><p><strong>Team:</strong> {p2d['Squad']}</p><p><strong>League:</strong> {p2d['League']}</p><p><strong>Age:</strong> {int(p2d['Age'])} <span class="stat-chip">{p2d['Pos']}</span></p><p><strong>Minutes:</strong> {int(p2d['Min']):,}</p><hr style="border:none;border-top:1px solid #e0e5e1;margin:14px 0;"><p><strong>Goals:</strong> {int(p2d['Gls'])} <span style="color:#6b7b6b;">(xG: {p2d['xG']:.1f})</span></p><p><strong>Assists:</strong> {int(p2d['Ast'])} <span style="color:#6b7b6b;">(xAG: {p2d['xAG']:.1f})</span></p></div>''', unsafe_allow_html=True)
-    else:
-        st.warning("Adjust filters to show at least 2 players.")
-
-elif st.session_state.page == 'similar':  # SIMILAR
-    st.markdown('<p class="page-title">Find Similar Players</p>', unsafe_allow_html=True)
-    st.markdown('<p class="page-subtitle">Discover statistically similar players using machine learning</p>', unsafe_allow_html=True)
-
-    st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-    c1, c2 = st.columns([3, 1])
-    with c1:
-        all_players = sorted(df['Player'].unique().tolist())
-        selected_player = st.selectbox("Select a Player", all_players, key="sim_player")
-    with c2:
-        n_similar = st.selectbox("Show Top", [3, 5, 10], index=1, key="n_sim")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    player_data = df[df['Player'] == selected_player].iloc[0]
-    st.markdown(f'''<div class="player-card">
+            n_similar = st.selectbox("Show Top", [3, 5, 10], index=1, key="n_sim")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        player_data = player_row(selected_player)
+        st.markdown(f'''<div class="player-card">
         <h3 style="margin-bottom:12px;">Selected: {selected_player}</h3>
         <p><strong>Team:</strong> {player_data['Squad']} | <strong>League:</strong> {player_data['League']} | <strong>Position:</strong> <span class="stat-chip">{player_data['Position']}</span> | <strong>Age:</strong> {int(player_data['Age'])}</p>
         <p><strong>Stats:</strong> {int(player_data['Gls'])} goals, {int(player_data['Ast'])} assists, {player_data['xG']:.1f} xG in {int(player_data['Min'])} minutes</p>
     </div>''', unsafe_allow_html=True)
 
-    similar = find_similar_players(selected_player, df, n_similar)
+        with span('similar.find_similar_players'):
+            similar = find_similar_players(selected_player, df, n_similar)
 
-    if len(similar) > 0:
-        st.markdown(f"### Top {n_similar} Similar Players")
-        st.markdown(f"<p class='page-subtitle'>Based on per-90 metrics for {player_data['Position']} position</p>", unsafe_allow_html=True)
+        if len(similar) > 0:
+            st.markdown(f"### Top {n_similar} Similar Players")
+            st.markdown(f"<p class='page-subtitle'>Based on per-90 metrics for {player_data['Position']} position</p>", unsafe_allow_html=True)
 
-        for i, (_, row) in enumerate(similar.iterrows(), 1):
-            sim_pct = int(row['Similarity'] * 100)
-            st.markdown(f'''<div class="similar-card">
+            for i, (_, row) in enumerate(similar.iterrows(), 1):
+                sim_pct = int(row['Similarity'] * 100)
+                st.markdown(f'''<div class="similar-card">
                 <div style="display:flex;justify-content:space-between;align-items:center;">
                     <div>
                         <strong style="font-size:1.1rem;">{i}. {row['Player']}</strong>
@@ -478,82 +605,121 @@ elif st.session_state.page == 'similar':  # SIMILAR
                 </div>
             </div>''', unsafe_allow_html=True)
 
-        st.markdown('''<div class="card" style="margin-top:1.5rem;">
+            st.markdown('''<div class="card" style="margin-top:1.5rem;">
             <h4>How it works</h4>
             <p>Uses <strong>cosine similarity</strong> on standardized per-90 metrics (goals, assists, xG, xAG, progressive carries/passes, tackles, interceptions). Players are compared only within their position group.</p>
         </div>''', unsafe_allow_html=True)
 
-elif st.session_state.page == 'explore':  # EXPLORE
-    st.markdown('<p class="page-title">Scatter Explorer</p>', unsafe_allow_html=True)
-    st.markdown('<p class="page-subtitle">Visualize player distributions across different metrics</p>', unsafe_allow_html=True)
-
-    st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-    c1, c2, c3, c4, c5, c6 = st.columns([1, 1, 1, 1, 1.2, 1.2])
-    with c1: lg2 = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="s_lg")
-    with c2: ps2 = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="s_pos")
-    with c3: mn2 = st.selectbox("Min Minutes", [450, 900, 1350, 1800], index=1, key="s_min")
-    with c4: clr = st.selectbox("Color By", ['Position', 'League'], key="s_clr")
-    metric_options = list(METRIC_NAMES.keys())
-    with c5: xm = st.selectbox("X-Axis", metric_options, index=2, key="xm")
-    with c6: ym = st.selectbox("Y-Axis", metric_options, index=0, key="ym")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    sdf = df.copy()
-    if lg2 != 'All': sdf = sdf[sdf['League'] == lg2]
-    if ps2 != 'All': sdf = sdf[sdf['Position'] == ps2]
-    sdf = sdf[sdf['Min'] >= mn2]
-
-    st.markdown(f'<div class="pill">✓ {len(sdf)} players</div>', unsafe_allow_html=True)
-
-    cm = COLORS['positions'] if clr == 'Position' else COLORS['leagues']
-    fig = px.scatter(sdf, x=xm, y=ym, color=clr, color_discrete_map=cm, hover_data=['Player', 'Squad', 'Age', 'Gls', 'Ast'], labels={xm: METRIC_NAMES[xm], ym: METRIC_NAMES[ym]}, opacity=0.85)
-    fig.update_traces(marker=dict(size=11, line=dict(width=1.5, color='white')))
-    fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='#fafafa', font=dict(color='#166534'), height=550, xaxis=dict(gridcolor='#e5e5e5'), yaxis=dict(gridcolor='#e5e5e5'), legend=dict(bgcolor='white'))
-    st.plotly_chart(fig, use_container_width=True)
-
-elif st.session_state.page == 'database':  # DATABASE
-    st.markdown('<p class="page-title">Player Database</p>', unsafe_allow_html=True)
-    st.markdown('<p class="page-subtitle">Browse and filter the complete player database</p>', unsafe_allow_html=True)
-
-    st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-    c1, c2, c3, c4, c5 = st.columns([1.2, 1.2, 1.2, 1.2, 2])
-    with c1: lg3 = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="t_lg")
-    with c2: ps3 = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="t_pos")
-    with c3: mn3 = st.selectbox("Min Minutes", [450, 900, 1350, 1800], index=1, key="t_min")
-    with c4:
-        sort_options = {'Goals + Assists per 90': 'G+A per 90', 'Goals per 90': 'Goals per 90', 'Assists per 90': 'Assists per 90', 'Expected Goals per 90': 'xG per 90', 'Minutes Played': 'Min'}
-        srt_display = st.selectbox("Sort By", list(sort_options.keys()), key="srt")
-        srt = sort_options[srt_display]
-    with c5: ag3 = st.slider("Age Range", 16, 40, (18, 35), key="t_age")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    tdf = df.copy()
-    if lg3 != 'All': tdf = tdf[tdf['League'] == lg3]
-    if ps3 != 'All': tdf = tdf[tdf['Position'] == ps3]
-    tdf = tdf[(tdf['Age'] >= ag3[0]) & (tdf['Age'] <= ag3[1]) & (tdf['Min'] >= mn3)]
-
-    st.markdown(f'<div class="pill">✓ {len(tdf)} players</div>', unsafe_allow_html=True)
-
-    display_cols = {'Player': 'Player', 'Squad': 'Team', 'League': 'League', 'Position': 'Pos', 'Age': 'Age', 'Min': 'Minutes', 'Gls': 'Goals', 'Ast': 'Assists', 'G+A': 'G+A', 'xG': 'xG', 'xAG': 'xAG', 'G+A per 90': 'G+A/90', 'Prog Carries per 90': 'PrgC/90'}
-    cols = list(display_cols.keys())
-    display_df = tdf[cols].copy()
-    display_df.columns = list(display_cols.values())
-
-    # Use st.table for guaranteed light background, or style dataframe
-    st.dataframe(
-        display_df.sort_values(display_cols.get(srt, srt), ascending=False).style.set_properties(**{'background-color': 'white', 'color': '#4a5d4a'}),
-        use_container_width=True,
-        height=500
-    )
-    st.download_button("📥 Download CSV", tdf[cols].to_csv(index=False), "players.csv", "text/csv")
-
-elif st.session_state.page == 'about':  # ABOUT
-    st.markdown('<p class="page-title">About This Tool</p>', unsafe_allow_html=True)
-    st.markdown('<p class="page-subtitle">Learn about the visualization, data, and methodology</p>', unsafe_allow_html=True)
-
-    c1, c2 = st.columns([2, 1])
-    with c1:
-        st.markdown('''<div class="card">
+    elif st.session_state.page == 'explore':  # EXPLORE
+        st.markdown('<p class="page-title">Scatter Explorer</p>', unsafe_allow_html=True)
+        st.markdown('<p class="page-subtitle">Visualize player distributions across different metrics</p>', unsafe_allow_html=True)
+
+        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+        c1, c2, c3, c4, c5, c6 = st.columns([1, 1, 1, 1, 1.2, 1.2])
+        with c1: lg2 = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="s_lg")
+        with c2: ps2 = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="s_pos")
+        with c3: mn2 = st.selectbox("Min Minutes", [450, 900, 1350, 1800], index=1, key="s_min")
+        with c4: clr = st.selectbox("Color By", ['Position', 'League'], key="s_clr")
+        metric_options = list(METRIC_NAMES.keys())
+        with c5: xm = st.selectbox("X-Axis", metric_options, index=2, key="xm")
+        with c6: ym = st.selectbox("Y-Axis", metric_options, index=0, key="ym")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        with span('explore.filter'):
+            rows = filter_rows(lg2, ps2, min_minutes=mn2)
+
+        st.markdown(f'<div class="pill">✓ {len(rows)} players</div>', unsafe_allow_html=True)
+
+        cm = COLORS['positions'] if clr == 'Position' else COLORS['leagues']
+        layout = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='#fafafa', font=dict(color='#166534'), height=550, xaxis=dict(gridcolor='#e5e5e5'), yaxis=dict(gridcolor='#e5e5e5'), legend=dict(bgcolor='white'))
+
+        def build_scatter():
+            with span('explore.frame'):
+                sdf = load_filter_engine().frame(rows)
+            with span('explore.figure'):
+                fig = px.scatter(sdf, x=xm, y=ym, color=clr, color_discrete_map=cm, hover_data=['Player', 'Squad', 'Age', 'Gls', 'Ast'], labels={xm: METRIC_NAMES[xm], ym: METRIC_NAMES[ym]}, opacity=0.85, render_mode='webgl' if len(rows) > SCATTER_WEBGL_MIN else 'svg')
+                fig.update_traces(marker=dict(size=11, line=dict(width=1.5, color='white')))
+                fig.update_layout(**layout)
+            return fig
+
+        def build_binned_scatter():
+            with span('explore.binning'):
+                xy = load_filter_engine().frame(rows, columns=[xm, ym]).to_numpy(dtype=np.float64)
+                bins = ScatterBins(xy[:, 0], xy[:, -1])
+                outliers = load_filter_engine().frame(rows[bins.outliers])
+            with span('explore.figure'):
+                cx, cy = bins.cell_centers()
+                fig = go.Figure()
+                # Trace 0: one square per crowded cell, darker with more players (selectable, see below)
+                fig.add_trace(go.Scattergl(x=cx, y=cy, mode='markers', name='Crowded areas', customdata=bins.counts, hovertemplate='%{customdata} players<extra></extra>', marker=dict(symbol='square', size=9, color=np.log10(bins.counts), colorscale='Greens', cmin=0)))
+                for group, part in outliers.groupby(clr, sort=True):
+                    fig.add_trace(go.Scattergl(x=part[xm], y=part[ym], mode='markers', name=group, customdata=part[['Player', 'Squad', 'Age', 'Gls', 'Ast']].to_numpy(), hovertemplate='<b>%{customdata[0]}</b><br>%{customdata[1]}, age %{customdata[2]}<br>Goals %{customdata[3]}, assists %{customdata[4]}<extra></extra>', opacity=0.85, marker=dict(size=9, color=cm.get(group), line=dict(width=1, color='white'))))
+                fig.update_layout(**layout, xaxis_title=METRIC_NAMES[xm], yaxis_title=METRIC_NAMES[ym], legend_title_text=clr)
+            return fig, bins
+
+        key = (lg2, ps2, mn2, clr, xm, ym)
+        if len(rows) < BINNING_MIN_POINTS:
+            fig = cached_figure('explore', key, build_scatter)
+            with span('explore.render'):
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            fig, bins = cached_figure('explore.binned', key, build_binned_scatter)
+            with span('explore.render'):
+                event = st.plotly_chart(fig, use_container_width=True, on_select='rerun', selection_mode='points', key='explore_binned')
+
+            # Players in the crowded cells clicked on
+            cells = [bins.dense_cells[p['point_index']] for p in event.selection.points if p['curve_number'] == 0]
+            if cells:
+                members = load_filter_engine().frame(rows[bins.members(cells)])
+                st.dataframe(members[list(dict.fromkeys(['Player', 'Squad', 'League', 'Position', xm, ym]))].sort_values(ym, ascending=False), hide_index=True, use_container_width=True)
+            else:
+                st.caption(f"{len(bins.dense_cells)} shaded cells group {int(bins.counts.sum()):,} players; click one to list them.")
+
+    elif st.session_state.page == 'database':  # DATABASE
+        st.markdown('<p class="page-title">Player Database</p>', unsafe_allow_html=True)
+        st.markdown('<p class="page-subtitle">Browse and filter the complete player database</p>', unsafe_allow_html=True)
+
+        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+        c1, c2, c3, c4, c5 = st.columns([1.2, 1.2, 1.2, 1.2, 2])
+        with c1: lg3 = st.selectbox("League", ['All'] + sorted(df['League'].unique().tolist()), key="t_lg")
+        with c2: ps3 = st.selectbox("Position", ['All', 'FW', 'MF', 'DF', 'GK'], key="t_pos")
+        with c3: mn3 = st.selectbox("Min Minutes", [450, 900, 1350, 1800], index=1, key="t_min")
+        with c4:
+            sort_options = {'Goals + Assists per 90': 'G+A per 90', 'Goals per 90': 'Goals per 90', 'Assists per 90': 'Assists per 90', 'Expected Goals per 90': 'xG per 90', 'Minutes Played': 'Min'}
+            srt_display = st.selectbox("Sort By", list(sort_options.keys()), key="srt")
+            srt = sort_options[srt_display]
+        with c5: ag3 = st.slider("Age Range", 16, 40, (18, 35), key="t_age")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        display_cols = {'Player': 'Player', 'Squad': 'Team', 'League': 'League', 'Position': 'Pos', 'Age': 'Age', 'Min': 'Minutes', 'Gls': 'Goals', 'Ast': 'Assists', 'G+A': 'G+A', 'xG': 'xG', 'xAG': 'xAG', 'G+A per 90': 'G+A/90', 'Prog Carries per 90': 'PrgC/90'}
+        cols = list(display_cols.keys())
+        with span('database.filter'):
+            tdf = load_filter_engine().frame(filter_rows(lg3, ps3, ag3, mn3), cols)
+
+        st.markdown(f'<div class="pill">✓ {len(tdf)} players</div>', unsafe_allow_html=True)
+
+        display_df = tdf.rename(columns=display_cols)
+
+        with span('database.sort'):
+            sorted_df = display_df.sort_values(display_cols.get(srt, srt), ascending=False)
+
+        # Use st.table for guaranteed light background, or style dataframe
+        with span('database.render'):
+            st.dataframe(
+                sorted_df.style.set_properties(**{'background-color': 'white', 'color': '#4a5d4a'}),
+                use_container_width=True,
+                height=500
+            )
+        with span('database.csv_export'):
+            st.download_button("📥 Download CSV", tdf.to_csv(index=False), "players.csv", "text/csv")
+
+    elif st.session_state.page == 'about':  # ABOUT
+        st.markdown('<p class="page-title">About This Tool</p>', unsafe_allow_html=True)
+        st.markdown('<p class="page-subtitle">Learn about the visualization, data, and methodology</p>', unsafe_allow_html=True)
+
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            st.markdown('''<div class="card">
             <h3 style="margin-bottom:12px;">Visualization Goals</h3>
             <p style="font-size:1.05rem;line-height:1.8;">
                 This tool enables <strong>data-driven player scouting</strong> by providing interactive visualizations that help users:
@@ -566,7 +732,7 @@ elif st.session_state.page == 'about':  # ABOUT
             </ul>
         </div>''', unsafe_allow_html=True)
 
-        st.markdown('''<div class="card">
+            st.markdown('''<div class="card">
             <h3 style="margin-bottom:12px;">Key Metrics Explained</h3>
             <table>
                 <tr><td style="width:160px;"><strong>xG (Expected Goals)</strong></td><td>Measures quality of scoring chances based on shot location and type</td></tr>
@@ -577,7 +743,7 @@ elif st.session_state.page == 'about':  # ABOUT
             </table>
         </div>''', unsafe_allow_html=True)
 
-        st.markdown('''<div class="card">
+            st.markdown('''<div class="card">
             <h3 style="margin-bottom:12px;">Technology Stack</h3>
             <p><strong>Why Streamlit?</strong> Chosen for rapid prototyping and native Python/Pandas integration.</p>
             <table>
@@ -588,8 +754,8 @@ elif st.session_state.page == 'about':  # ABOUT
             </table>
         </div>''', unsafe_allow_html=True)
 
-    with c2:
-        st.markdown('''<div class="card">
+        with c2:
+            st.markdown('''<div class="card">
             <h3 style="margin-bottom:12px;">Intended Audience</h3>
             <ul>
                 <li><strong>Fantasy Football Managers</strong></li>
@@ -599,7 +765,7 @@ elif st.session_state.page == 'about':  # ABOUT
             </ul>
         </div>''', unsafe_allow_html=True)
 
-        st.markdown('''<div class="card">
+            st.markdown('''<div class="card">
             <h3 style="margin-bottom:12px;">Data Source</h3>
             <p><strong>Source:</strong> FBref via Kaggle</p>
             <p><strong>Season:</strong> 2024-25</p>
@@ -607,8 +773,53 @@ elif st.session_state.page == 'about':  # ABOUT
             <p><strong>Players:</strong> ~2,500 with 450+ minutes</p>
         </div>''', unsafe_allow_html=True)
 
-        st.markdown('''<div class="card" style="text-align:center;">
+            st.markdown('''<div class="card" style="text-align:center;">
             <p style="color:#6b7b6b !important;font-size:0.85rem;margin-bottom:8px;">Created by</p>
             <p style="font-size:1.3rem;font-weight:700;color:#166534 !important;margin-bottom:4px;">Karim Mattar</p>
             <p style="color:#6b7b6b !important;">UC Berkeley MIDS<br>DS209 Data Visualization</p>
         </div>''', unsafe_allow_html=True)
+
+    elif st.session_state.page == 'diagnostics':  # DIAGNOSTICS (hidden, open with ?page=diagnostics)
+        st.markdown('<p class="page-title">Diagnostics</p>', unsafe_allow_html=True)
+        uptime = time.time() - timings.started
+        st.markdown(f'<p class="page-subtitle">Stage timings for this worker over the last {timings.window} samples per stage ({uptime / 60:.0f} min since reset)</p>', unsafe_allow_html=True)
+
+        summary = timings.summary()
+        if summary:
+            table = pd.DataFrame.from_dict(summary, orient='index')
+            for col in ['p50', 'p95', 'p99', 'max']:
+                table[col] = (table[col] * 1000).round(2)
+            table = table.rename(columns={'count': 'Count', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'p99': 'p99 (ms)', 'max': 'Max (ms)'})
+            st.dataframe(table[['Count', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)']], use_container_width=True)
+        else:
+            st.info("No timings recorded yet.")
+
+        c1, c2, c3 = st.columns(3)
+        with c1: st.download_button("📥 Export JSON", timings.to_json(), "timings.json", "application/json")
+        with c2: st.download_button("📥 Export Prometheus", timings.to_prometheus(), "timings.prom", "text/plain")
+        with c3:
+            if st.button("Reset timings", key="diag_reset"):
+                timings.reset()
+                st.rerun()
+
+        figures = load_figure_cache()
+        st.markdown(f"<p class='page-subtitle'>Figure cache: {len(figures)}/{figures.maxsize} figures, {figures.hits} hits, {figures.misses} misses</p>", unsafe_allow_html=True)
+
+        st.markdown("### Profile a rerun")
+        st.markdown("<p class='page-subtitle'>Captures a cProfile of the next rerun in this session, e.g. after changing a filter (switching page ends that rerun early, at the nav button)</p>", unsafe_allow_html=True)
+        if st.button("Profile next rerun", key="diag_profile"):
+            st.session_state.profile_next_rerun = True
+            st.session_state.profile_report = None
+        if st.session_state.get('profile_next_rerun'):
+            st.info("Profiling is armed for the next rerun.")
+        if st.session_state.get('profile_report'):
+            st.code(st.session_state.profile_report, language=None)
+
+    # ============ END OF RERUN ============
+    # Reruns cut short by st.rerun() never get here, so they are not recorded
+    timings.record(f'{page}.rerun', time.perf_counter() - rerun_start)
+finally:
+    # Also runs when st.rerun() or an error ends the rerun early, so the profiler never stays enabled
+    if profiler is not None:
+        st.session_state.profile_report = profiler.stop()
+        st.session_state.profile_next_rerun = False
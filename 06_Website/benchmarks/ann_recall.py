@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of approximate similar-player search
+Builds a large synthetic player pool, then compares the IVF index (float32 and int8,
+over a range of n_probe) with the exact scikit-learn cosine_similarity search the
+app has always used: standardize each position group, score, take the top k.
+
+Usage:
+    python benchmarks/ann_recall.py                  # 400k players, k=10
+    python benchmarks/ann_recall.py --rows 1000000 --k 5 --probes 4,16,64
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import StandardScaler
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from modules import similarity
+from modules.similarity import SimilarityIndex
+from run_benchmarks import REAL_CSV, APP_SIMILARITY_METRICS, app_load_data
+
+
+def synthetic_pool(n_rows, seed=0):
+    """n_rows players resampled from the real data with 20% noise on every metric"""
+    base = app_load_data(REAL_CSV)
+    rng = np.random.default_rng(seed)
+    pool = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    for col in APP_SIMILARITY_METRICS:
+        pool[col] = pool[col] * rng.normal(1.0, 0.2, n_rows)
+    pool['Player'] = pool['Player'] + ' #' + pool.index.astype(str)
+    return pool
+
+
+def exact_reference(pool, rows, k):
+    """Top-k rows per query the way app.py used to compute them (sklearn, per position)"""
+    reference = {}
+    positions = pool['Position'].to_numpy()
+    for position in np.unique(positions[rows]):
+        group = np.flatnonzero(positions == position)
+        X = StandardScaler().fit_transform(pool[APP_SIMILARITY_METRICS].fillna(0).to_numpy()[group])
+        for row in rows[positions[rows] == position]:
+            scores = cosine_similarity(X[np.searchsorted(group, row)][None, :], X)[0]
+            scores[np.searchsorted(group, row)] = -np.inf
+            reference[row] = set(group[np.argsort(-scores, kind='stable')[:k]])
+    return reference
+
+
+def evaluate(index, rows, reference, k):
+    """Mean recall@k and per-query latencies (ms) of index over the query rows"""
+    latencies, recalls = [], []
+    for row in rows:
+        start = time.perf_counter()
+        found, _ = index.top_k(row, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(reference[row].intersection(found)) / k)
+    return np.mean(recalls), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400_000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--probes', default='1,2,4,8,16,32')
+    args = parser.parse_args()
+
+    print(f"Building a pool of {args.rows:,} players...")
+    pool = synthetic_pool(args.rows)
+    rows = np.random.default_rng(1).choice(len(pool), args.queries, replace=False)
+    reference = exact_reference(pool, rows, args.k)
+
+    print(f"\n{'mode':<24}{'build (s)':>10}{'recall@' + str(args.k):>11}{'mean (ms)':>11}{'p95 (ms)':>10}")
+    start = time.perf_counter()
+    exact = SimilarityIndex(pool, APP_SIMILARITY_METRICS)
+    build = time.perf_counter() - start
+    recall, latency = evaluate(exact, rows, reference, args.k)
+    print(f"{'exact':<24}{build:>10.2f}{recall:>11.3f}{latency.mean():>11.3f}{np.percentile(latency, 95):>10.3f}")
+
+    for quantize in (None, 'int8'):
+        index = SimilarityIndex(pool, APP_SIMILARITY_METRICS, approximate=True, quantize=quantize)
+        start = time.perf_counter()
+        # Build every position's IVF index up front so it isn't counted as query latency
+        for group in index.groups():
+            index._ivf(group, index._partition(group))
+        build = time.perf_counter() - start
+        for n_probe in map(int, args.probes.split(',')):
+            index.n_probe = n_probe
+            recall, latency = evaluate(index, rows, reference, args.k)
+            label = f"ivf {quantize or 'float32'} n_probe={n_probe}"
+            print(f"{label:<24}{build:>10.2f}{recall:>11.3f}{latency.mean():>11.3f}{np.percentile(latency, 95):>10.3f}")
+
+    small = sum(1 for g in exact.groups() if len(exact._partition(g)['rows']) < similarity.ANN_MIN_ROWS)
+    if small:
+        print(f"\n{small} position group(s) below {similarity.ANN_MIN_ROWS:,} players were searched exactly")
+
+
+if __name__ == '__main__':
+    main()
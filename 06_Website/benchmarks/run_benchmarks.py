@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Football Scout Tool
+Times the data paths at the real dataset size and on synthetic scale-ups, reports
+wall time and peak memory, and flags regressions against a saved baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # real, 100k and 1M players
+    python benchmarks/run_benchmarks.py --sizes real          # quick run
+    python benchmarks/run_benchmarks.py --only similarity     # benchmarks whose name contains this
+    python benchmarks/run_benchmarks.py --save-baseline       # record benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).parent.resolve()
+SITE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(SITE_DIR))
+
+from modules.data_cache import ColumnarCache
+from modules.data_processor import FootballDataProcessor
+from modules.filters import FilterEngine
+from modules.metrics import add_derived_columns
+from modules.percentiles import PercentileEngine, age_groups
+from modules.player_store import read_players
+from modules.similarity import SimilarityIndex
+from synthetic import make_synthetic
+
+REAL_CSV = SITE_DIR.parent / 'data' / 'players_data-2024_2025.csv'
+WORK_DIR = BENCH_DIR / '.data'
+BASELINE_PATH = BENCH_DIR / 'baseline.json'
+
+SIZES = {'real': None, '100k': 100_000, '1m': 1_000_000}
+
+# Same columns, default data query, metrics and cohorts as app.py
+APP_QUERY = {'seasons': None, 'leagues': None, 'min_minutes': 450}
+APP_COLUMNS = ['Player', 'Pos', 'Squad', 'Comp', 'Age', 'Min', '90s', 'Gls', 'Ast', 'G+A',
+               'xG', 'xAG', 'PrgC', 'PrgP', 'Tkl', 'Int', 'SCA']
+APP_SIMILARITY_METRICS = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90',
+                          'Prog Carries per 90', 'Prog Passes per 90', 'Tackles per 90', 'Interceptions per 90']
+APP_RADAR_METRICS = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90',
+                     'Shot Creating per 90', 'Prog Carries per 90']
+APP_COHORTS = {
+    'position': ['Position'],
+    'league_position': ['League', 'Position'],
+    'age_position': ['Age Group', 'Position'],
+}
+
+BENCHMARKS = []
+
+
+def benchmark(name, max_rows=None):
+    """Register a benchmark; the function does its setup and returns the callable to time"""
+    def register(func):
+        BENCHMARKS.append({'name': name, 'setup': func, 'max_rows': max_rows})
+        return func
+    return register
+
+
+def app_load_data(csv_path):
+    """Mirror of build_data() in app.py"""
+    df = read_players(csv_path, columns=APP_COLUMNS, **APP_QUERY)
+    df = df[df['Min'] >= 450].copy()
+    add_derived_columns(df, app_labels=True, decimals=2, dtype=np.float64)
+    df['Age Group'] = age_groups(df['Age'])
+    return df
+
+
+class Context:
+    """Per-dataset state shared by the benchmarks (built lazily, never timed)"""
+
+    def __init__(self, csv_path, n_rows):
+        self.csv_path = csv_path
+        self.n_rows = n_rows
+        self.rng = np.random.default_rng(0)
+        self._app_df = None
+        self._processor = None
+
+    @property
+    def app_df(self):
+        if self._app_df is None:
+            self._app_df = app_load_data(self.csv_path)
+        return self._app_df
+
+    @property
+    def processor(self):
+        if self._processor is None:
+            self._processor = FootballDataProcessor(self.csv_path)
+            self._processor.load_and_clean()
+        return self._processor
+
+    def sample(self, values, n):
+        return [values[i] for i in self.rng.integers(0, len(values), n)]
+
+    def clear_cache(self):
+        # Only this CSV's entries: the app's cache for its own CSV lives in the same directory
+        ColumnarCache().remove(self.csv_path)
+
+
+# ============ BENCHMARKS ============
+@benchmark('load_data (cold cache)')
+def bench_load_cold(ctx):
+    def run():
+        ctx.clear_cache()
+        app_load_data(ctx.csv_path)
+    return run
+
+
+@benchmark('load_data (warm cache)')
+def bench_load_warm(ctx):
+    app_load_data(ctx.csv_path)
+    return lambda: app_load_data(ctx.csv_path)
+
+
+@benchmark('processor.load_and_clean (cold cache)')
+def bench_processor_cold(ctx):
+    def run():
+        ctx.clear_cache()
+        FootballDataProcessor(ctx.csv_path).load_and_clean()
+    return run
+
+
+@benchmark('processor.load_and_clean (warm cache)')
+def bench_processor_warm(ctx):
+    FootballDataProcessor(ctx.csv_path).load_and_clean()
+    return lambda: FootballDataProcessor(ctx.csv_path).load_and_clean()
+
+
+@benchmark('app similarity: index build')
+def bench_app_similarity_build(ctx):
+    df = ctx.app_df
+    return lambda: SimilarityIndex(df, APP_SIMILARITY_METRICS)
+
+
+@benchmark('app similarity: 100 queries')
+def bench_app_similarity_query(ctx):
+    index = SimilarityIndex(ctx.app_df, APP_SIMILARITY_METRICS)
+    players = ctx.sample(ctx.app_df['Player'].tolist(), 100)
+
+    def run():
+        for player in players:
+            index.query(player, 10)
+    return run
+
+
+@benchmark('processor.find_similar_players: 20 queries')
+def bench_processor_similarity(ctx):
+    processor = ctx.processor
+    players = ctx.sample(processor.df_filtered['Player_Clean'].tolist(), 20)
+
+    def run():
+        processor._similarity_index = None
+        for player in players:
+            processor.find_similar_players(player, 10)
+    return run
+
+
+@benchmark('percentiles: 100 radar comparisons')
+def bench_percentile_lookups(ctx):
+    df = ctx.app_df
+    engine = PercentileEngine(df, APP_COHORTS)
+    rows = ctx.sample(list(range(len(df))), 200)
+    positions = df['Position'].to_numpy()
+    values = df[APP_RADAR_METRICS].to_numpy()
+
+    def run():
+        for a, b in zip(rows[::2], rows[1::2]):
+            for j, metric in enumerate(APP_RADAR_METRICS):
+                engine.percentile_of_value(values[a, j], metric, positions[a])
+                engine.percentile_of_value(values[b, j], metric, positions[a])
+    return run
+
+
+@benchmark('percentiles: bulk matrix, all cohorts')
+def bench_percentile_matrix(ctx):
+    df = ctx.app_df
+
+    def run():
+        engine = PercentileEngine(df, APP_COHORTS)
+        for cohort in APP_COHORTS:
+            engine.percentile_matrix(APP_SIMILARITY_METRICS, cohort)
+    return run
+
+
+@benchmark('page filtering: index build')
+def bench_filter_build(ctx):
+    df = ctx.app_df
+    return lambda: FilterEngine(df, categorical=['League', 'Position', 'Squad'], ranges=['Age', 'Min'])
+
+
+@benchmark('page filtering: 100 filter combinations')
+def bench_filter_select(ctx):
+    engine = FilterEngine(ctx.app_df, categorical=['League', 'Position', 'Squad'], ranges=['Age', 'Min'])
+    leagues = ctx.sample([None] + engine.values('League'), 100)
+    positions = ctx.sample([None, 'FW', 'MF', 'DF', 'GK'], 100)
+    minutes = ctx.sample([450, 900, 1350, 1800], 100)
+
+    def run():
+        for league, position, mins in zip(leagues, positions, minutes):
+            engine.select(League=league, Position=position, Age=(18, 35), Min=(mins, None))
+    return run
+
+
+@benchmark('generate_charts.py build', max_rows=100_000)
+def bench_generate_charts(ctx):
+    # generate_charts.py reads ../data/players_data_light-2024_2025.csv relative to its cwd
+    root = WORK_DIR / f'charts-{ctx.n_rows}'
+    site, data = root / 'site', root / 'data'
+    site.mkdir(parents=True, exist_ok=True)
+    data.mkdir(parents=True, exist_ok=True)
+    target = data / 'players_data_light-2024_2025.csv'
+    if not target.exists():
+        os.symlink(Path(ctx.csv_path).resolve(), target)
+
+    def run():
+        subprocess.run([sys.executable, str(SITE_DIR / 'generate_charts.py'), '--force'], cwd=site,
+                       check=True, stdout=subprocess.DEVNULL)
+    run.subprocess = True
+    return run
+
+
+# ============ RUNNER ============
+def dataset_for(size):
+    """Path to the CSV for a size label, generating synthetic data on first use"""
+    n_rows = SIZES[size]
+    if n_rows is None:
+        return REAL_CSV
+    path = WORK_DIR / size / f'players_synthetic_{size}.csv'
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        print(f"Generating {n_rows:,} synthetic players -> {path}")
+        make_synthetic(REAL_CSV, n_rows, path)
+    return path
+
+
+def measure(run, repeat):
+    """Best wall time over repeat runs, and peak memory in MB of one extra run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    if getattr(run, 'subprocess', False):
+        # Child max RSS (cumulative high-water mark of all children)
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    else:
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def compare(results, baseline, tolerance, noise_floor):
+    """Benchmarks that got slower or hungrier than the baseline by more than tolerance"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        if result['time_s'] > base['time_s'] * (1 + tolerance) and result['time_s'] - base['time_s'] > noise_floor:
+            regressions.append((key, 'time', base['time_s'], result['time_s']))
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance) and result['peak_mb'] - base['peak_mb'] > 1:
+            regressions.append((key, 'memory', base['peak_mb'], result['peak_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='real,100k,1m', help='comma-separated: ' + ', '.join(SIZES))
+    parser.add_argument('--only', help='run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before flagging (0.25 = 25%%)')
+    parser.add_argument('--noise-floor', type=float, default=0.005, help='ignore time differences below this (s)')
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes.split(','):
+        csv_path = dataset_for(size)
+        ctx = Context(csv_path, sum(1 for _ in open(csv_path, 'rb')) - 1)
+        print(f"\n=== {size} ({ctx.n_rows:,} players, {csv_path.name}) ===")
+        print(f"{'benchmark':<48}{'time (s)':>12}{'peak (MB)':>12}")
+
+        for bench in BENCHMARKS:
+            if args.only and args.only not in bench['name']:
+                continue
+            if bench['max_rows'] and ctx.n_rows > bench['max_rows']:
+                print(f"{bench['name']:<48}{'skipped':>12}")
+                continue
+            run = bench['setup'](ctx)
+            elapsed, peak = measure(run, args.repeat)
+            results[f"{size}/{bench['name']}"] = {'time_s': elapsed, 'peak_mb': peak}
+            print(f"{bench['name']:<48}{elapsed:>12.4f}{peak:>12.1f}")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'numpy': np.__version__,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    WORK_DIR.mkdir(exist_ok=True)
+    with open(WORK_DIR / 'latest.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.noise_floor)
+    if not regressions:
+        print("\nNo regressions against the baseline")
+        return 0
+    print("\nRegressions against the baseline:")
+    for key, kind, before, after in regressions:
+        unit = 's' if kind == 'time' else 'MB'
+        print(f"  {key}: {kind} {before:.4f}{unit} -> {after:.4f}{unit} ({after / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Synthetic scale-up datasets for the benchmarks
+Resamples real players into a CSV with the same columns, jittering the stats and
+renaming players so names stay unique
+"""
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 100_000
+
+
+def make_synthetic(source_csv, n_rows, out_path, seed=0):
+    """Write n_rows synthetic players with source_csv's schema to out_path"""
+    source = pd.read_csv(source_csv)
+    rng = np.random.default_rng(seed)
+    float_cols = [c for c in source.columns if pd.api.types.is_float_dtype(source[c])]
+    protected = {'Age', 'Born', '90s'}
+
+    written = 0
+    while written < n_rows:
+        size = min(CHUNK_ROWS, n_rows - written)
+        chunk = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+
+        # Small multiplicative noise so rows aren't exact duplicates of real players
+        for col in float_cols:
+            if col not in protected:
+                chunk[col] = (chunk[col] * rng.normal(1.0, 0.05, size)).round(3)
+
+        ids = np.arange(written, written + size)
+        chunk['Rk'] = ids + 1
+        chunk['Player'] = chunk['Player'] + ' #' + pd.Series(ids).astype(str)
+
+        chunk.to_csv(out_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += size
+
+    return out_path
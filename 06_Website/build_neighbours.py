@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compute similar-player neighbour tables in batch
+For a scout's shortlist or for every player in the dataset
+
+Usage:
+    python3 build_neighbours.py --players "Pedri" "Bukayo Saka" -k 5
+    python3 build_neighbours.py --players-file shortlist.txt -o shortlist_neighbours.csv
+    python3 build_neighbours.py --all -k 20 -o static/data/neighbours.npz
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.data_processor import FootballDataProcessor
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data',
+                            'players_data_light-2024_2025.csv')
+
+
+def save_npz(path, processor, rows, neighbours, scores):
+    """Compact table: one (player, squad) per row, then neighbour row ids and float32 scores"""
+    df = processor.df_filtered
+    np.savez_compressed(
+        path,
+        player=df['Player_Clean'].to_numpy(dtype=str),
+        squad=df['Squad'].to_numpy(dtype=str),
+        query=rows.astype(np.int32),
+        neighbours=neighbours.astype(np.int32),
+        similarity=scores.astype(np.float32),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument('--players', nargs='+', help='player names')
+    who.add_argument('--players-file', help='text file with one player name per line')
+    who.add_argument('--all', action='store_true', help='every player in the dataset')
+    parser.add_argument('-k', '--neighbours', type=int, default=10, help='neighbours per player')
+    parser.add_argument('--all-positions', action='store_true', help='compare across positions')
+    parser.add_argument('--block-rows', type=int, default=256, help='query rows per matrix block')
+    parser.add_argument('--workers', type=int, default=None, help='threads (default: all cores)')
+    parser.add_argument('--data', default=DEFAULT_DATA, help='player CSV or PlayerStore directory')
+    parser.add_argument('--seasons', nargs='+', help='seasons to load from a store, e.g. 2023-2024 2024-2025')
+    parser.add_argument('--leagues', nargs='+', help='leagues to load, e.g. "Premier League" "La Liga"')
+    parser.add_argument('-o', '--output', help='.csv or .npz file (default: print)')
+    args = parser.parse_args()
+
+    processor = FootballDataProcessor(args.data, seasons=args.seasons, leagues=args.leagues)
+    processor.load_and_clean(min_minutes=450)
+
+    names = None
+    if args.players:
+        names = args.players
+    elif args.players_file:
+        with open(args.players_file) as f:
+            names = [line.strip() for line in f if line.strip()]
+
+    options = dict(n_similar=args.neighbours, position_filter=not args.all_positions,
+                   block_rows=args.block_rows, workers=args.workers)
+    start = time.perf_counter()
+    if args.output and args.output.endswith('.npz'):
+        rows, neighbours, scores = processor.neighbour_table(names, **options)
+        save_npz(args.output, processor, rows, neighbours, scores)
+        found = len(rows)
+    else:
+        similar = processor.find_similar_batch(names, **options)
+        if args.output is None:
+            print(similar.to_string(index=False))
+        else:
+            similar.to_csv(args.output, index=False)
+        found = similar['Query'].nunique()
+    elapsed = time.perf_counter() - start
+    print(f"Found neighbours for {found} players in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Add season CSVs to a partitioned player store (modules/player_store.py)
+Each CSV is split into one partition per league; re-adding a season replaces it
+
+Usage:
+    python3 build_store.py ../data/players_data-2024_2025.csv
+    python3 build_store.py old/players_2022_2023.csv old/players_2023_2024.csv --store ../data/store
+    python3 build_store.py export.csv --season 2021-2022
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.player_store import PlayerStore, season_from_path
+
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'store')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv', nargs='+', help='season CSVs with the FBref column layout')
+    parser.add_argument('--season', help='season of the CSV (default: taken from the file name)')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='store directory')
+    args = parser.parse_args()
+
+    if args.season and len(args.csv) > 1:
+        parser.error('--season needs a single CSV')
+
+    store = PlayerStore(args.store)
+    for path in args.csv:
+        season = args.season or season_from_path(path)
+        if season is None:
+            parser.error(f'no season in the file name {path}; pass --season')
+        start = time.perf_counter()
+        df = pd.read_csv(path)
+        store.write(df, season)
+        print(f"{season}: {len(df)} players from {path} in {time.perf_counter() - start:.1f}s")
+
+    print(f"Store {args.store}: seasons {', '.join(store.seasons())}; leagues {', '.join(store.leagues())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Move the data inlined in saved Vega-Lite specs out to shared, content-hashed files
+Rewrites every <name>.json spec in a directory, and its <name>.html page, to load
+its data through data.url from <directory>/data/
+
+Usage:
+    python3 compact_charts.py charts
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.chart_data import save_chart, remove_unused
+
+
+def directory_size(paths):
+    return sum(p.stat().st_size for p in paths if p.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory of chart .json specs and .html pages')
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    data_dir = directory / 'data'
+    specs = []
+    for path in sorted(directory.glob('*.json')):
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+        # Only Vega-Lite specs (other JSON files in the directory are left alone)
+        if isinstance(spec, dict) and '$schema' in spec:
+            specs.append((path, spec))
+
+    pages = [p.with_suffix('.html') for p, _ in specs]
+    before = directory_size([p for p, _ in specs] + pages)
+    used = []
+    for path, spec in specs:
+        used += save_chart(spec, path.with_suffix('.html'), data_dir, json_spec=True)
+    remove_unused(data_dir, used)
+
+    after = directory_size([p for p, _ in specs] + pages)
+    shared = directory_size([data_dir / name for name in set(used)])
+    print(f"{len(specs)} charts: {before / 1e6:.1f} MB -> {after / 1e3:.0f} KB of specs and pages "
+          f"+ {shared / 1e3:.0f} KB in {len(set(used))} shared dataset(s)")
+
+
+if __name__ == '__main__':
+    main()
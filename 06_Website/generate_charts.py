@@ -1,83 +1,188 @@
 """
 Generate Altair charts and save as HTML files
 This creates static visualizations that can be embedded in the website
+
+Each chart and data file is a build task keyed by its input data slice, parameters
+and code (see modules/build.py); unchanged tasks are skipped and the rest run in
+parallel. Pass --force to rebuild everything.
 """
 
 import sys
 import os
-sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
 
+from modules import chart_data, data_processor, percentiles, similarity, static_export, visualizations
+from modules.build import Builder, format_report
 from modules.data_processor import FootballDataProcessor
 from modules.visualizations import PlayerVisualizations
-import json
+from modules.static_export import export_players
+from modules.chart_data import save_chart, remove_unused
 
-# Initialize
-data_path = '../data/players_data_light-2024_2025.csv'
-processor = FootballDataProcessor(data_path)
-df = processor.load_and_clean(min_minutes=450)
-viz = PlayerVisualizations()
-
-print(f"Loaded {len(df)} players")
-
-# Create output directory
-os.makedirs('static/charts', exist_ok=True)
-os.makedirs('static/data', exist_ok=True)
-
-# Generate example charts that will be embedded in HTML pages
-
-# 1. League comparison scatter
-print("Generating league comparison scatter...")
-chart = viz.create_scatter_explorer(
-    df[df['Position'].isin(['FW', 'MF'])],
-    x_metric='PrgC_per90',
-    y_metric='xGxAG_per90',
-    color_by='Comp'
-)
-chart.save('static/charts/league_scatter.html')
-
-# 2. Position distribution - use position-appropriate metrics
-print("Generating position analysis...")
-position_metrics = {
+# Chart data goes to content-hashed files shared by every chart (see modules/chart_data.py)
+CHART_DATA_DIR = 'static/data/charts'
+PLAYER_DATA_DIR = 'static/data/players'
+SEARCH_INDEX_DIR = 'static/data/search'
+BUILD_STATE = 'static/.build_state.json'
+
+# Position-appropriate metrics for the top-N charts
+POSITION_METRICS = {
     'GK': 'Save%',      # Goalkeepers ranked by Save Percentage
     'DF': 'Tkl_per90',  # Defenders ranked by Tackles per 90
     'MF': 'PrgC_per90', # Midfielders ranked by Progressive Carries per 90
     'FW': 'Gls_per90'   # Forwards ranked by Goals per 90
 }
-for pos, metric in position_metrics.items():
-    chart = viz.create_top_players_chart(df, metric, n=15, position=pos)
-    chart.save(f'static/charts/top_{pos.lower()}.html')
-
-# 3. League comparison box plots
-print("Generating league comparisons...")
-chart = viz.create_league_comparison(df[df['Position'] != 'GK'], 'Tkl_per90')
-chart.save('static/charts/league_tackles.html')
-
-chart = viz.create_league_comparison(df[df['Position'] != 'GK'], 'Cmp%')
-chart.save('static/charts/league_passing.html')
-
-# 4. Generate data for dropdowns
-print("Generating metadata...")
-metadata = {
-    'leagues': processor.get_leagues(),
-    'positions': processor.get_positions(),
-    'teams': processor.get_teams(),
-    'players': processor.get_player_list()[:100],
-    'total_players': len(df)
+
+PER90 = {'kind': 'number', 'scale': 100}
+PLAYER_EXPORT_COLUMNS = {
+    'Player_Clean': {'kind': 'text'},
+    'Squad': {'kind': 'dict'},
+    'Comp': {'kind': 'dict'},
+    'Position': {'kind': 'dict'},
+    'Age': {'kind': 'number', 'scale': 1},
+    'Gls_per90': PER90, 'Ast_per90': PER90, 'xG_per90': PER90, 'xAG_per90': PER90,
+    'PrgC_per90': PER90, 'Tkl_per90': PER90, 'Touches_per90': PER90,
+    'Cmp%': {'kind': 'number', 'scale': 10},
 }
 
-with open('static/data/metadata.json', 'w') as f:
-    json.dump(metadata, f)
+# Precomputed lookup tables for the Similar and Compare pages
+SIMILAR_K = 10
+COMPARISON_METRICS = ['Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90', 'PrgC_per90', 'Tkl_per90']
+
+
+# ============ TASKS ============
+# Run in worker processes; each returns the extra files it wrote
+
+def build_chart(method, data, path, **params):
+    """Build one PlayerVisualizations chart from its data slice and save it"""
+    chart = getattr(PlayerVisualizations(), method)(data, **params)
+    return [os.path.join(CHART_DATA_DIR, name) for name in save_chart(chart, path, CHART_DATA_DIR)]
+
+
+def write_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f)
+    return []
+
+
+def export_player_data(df, directory, columns, n_similar, metrics):
+    """Full processed data for client-side filtering: column-oriented shards per
+    (position, league) with precompressed copies (see modules/static_export.py)
+
+    Also writes lookup tables keyed by player id (a row of df), so the pages never
+    score players themselves: the n_similar most similar players within the same
+    position and across all positions, and per-position percentiles of metrics,
+    computed exactly as the app does.
+    """
+    processor = FootballDataProcessor.from_frame(df)
+    tables = {}
+    for name, position_filter in (('similar_position', True), ('similar_all', False)):
+        _, ids, scores = processor.neighbour_table(n_similar=n_similar, position_filter=position_filter)
+        tables[name] = static_export.neighbour_table(ids, scores)
+    tables['percentiles_position'] = static_export.percentile_table(
+        processor.get_percentile_table(metrics, cohort='position'), 'position')
+    manifest = export_players(df, directory, columns, tables=tables)
+    return [os.path.join(directory, entry['file'])
+            for entry in manifest['shards'] + list(manifest['tables'].values())]
+
+
+def export_search_index(names, directory):
+    """Player-name search index for the search boxes, sharded by first letter"""
+    manifest = static_export.export_search_index(names, directory)
+    return [os.path.join(directory, shard['file']) for shard in manifest['shards'].values()]
+
+
+def add_tasks(builder, processor, df):
+    """The build DAG: one task per chart and data file, each given only its slice of df
+
+    Returns the names of the chart tasks (whose results are chart data files).
+    """
+    chart_code = (visualizations, chart_data)
+    charts = ['league_scatter', 'league_tackles', 'league_passing']
+
+    # 1. League comparison scatter
+    builder.add('league_scatter', build_chart, 'create_scatter_explorer',
+                df[df['Position'].isin(['FW', 'MF'])], 'static/charts/league_scatter.html',
+                x_metric='PrgC_per90', y_metric='xGxAG_per90', color_by='Comp',
+                outputs=['static/charts/league_scatter.html'], code=chart_code)
+
+    # 2. Position analysis - top players by position-appropriate metrics
+    for pos, metric in POSITION_METRICS.items():
+        path = f'static/charts/top_{pos.lower()}.html'
+        charts.append(f'top_{pos.lower()}')
+        builder.add(f'top_{pos.lower()}', build_chart, 'create_top_players_chart',
+                    df[df['Position'] == pos], path, metric=metric, n=15, position=pos,
+                    outputs=[path], code=chart_code)
+
+    # 3. League comparison box plots
+    outfield = df[df['Position'] != 'GK']
+    for name, metric in (('league_tackles', 'Tkl_per90'), ('league_passing', 'Cmp%')):
+        path = f'static/charts/{name}.html'
+        builder.add(name, build_chart, 'create_league_comparison', outfield, path, metric=metric,
+                    outputs=[path], code=chart_code)
+
+    # 4. Data for dropdowns (player names are in the search index, see 6.)
+    metadata = {
+        'leagues': processor.get_leagues(),
+        'positions': processor.get_positions(),
+        'teams': processor.get_teams(),
+        'total_players': len(df)
+    }
+    builder.add('metadata', write_json, metadata, 'static/data/metadata.json',
+                outputs=['static/data/metadata.json'])
+
+    # 5. Player data export with similar-player and percentile tables; these are the
+    # slowest part of the build, so they are computed in the task and skipped with it
+    builder.add('player_data', export_player_data, df, PLAYER_DATA_DIR, PLAYER_EXPORT_COLUMNS,
+                SIMILAR_K, COMPARISON_METRICS, outputs=[os.path.join(PLAYER_DATA_DIR, static_export.MANIFEST)],
+                code=(static_export, data_processor, similarity, percentiles))
+
+    # 6. Search index over every player name, ids matching the player data export
+    builder.add('search_index', export_search_index, df['Player_Clean'].tolist(), SEARCH_INDEX_DIR,
+                outputs=[os.path.join(SEARCH_INDEX_DIR, static_export.MANIFEST)], code=(static_export,))
+    return charts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', action='store_true', help='rebuild every task')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--report', help='also write the build report to this JSON file')
+    args = parser.parse_args()
+
+    # Same data selection as the app: a season CSV or a PlayerStore directory, optionally narrowed
+    data_path = os.environ.get('SCOUT_DATA') or '../data/players_data_light-2024_2025.csv'
+    processor = FootballDataProcessor(
+        data_path,
+        seasons=os.environ['SCOUT_SEASONS'].split(',') if os.environ.get('SCOUT_SEASONS') else None,
+        leagues=os.environ['SCOUT_LEAGUES'].split(',') if os.environ.get('SCOUT_LEAGUES') else None,
+    )
+    df = processor.load_and_clean(min_minutes=450)
+    print(f"Loaded {len(df)} players")
+
+    # Create output directory
+    os.makedirs('static/charts', exist_ok=True)
+    os.makedirs('static/data', exist_ok=True)
+
+    builder = Builder(BUILD_STATE, workers=args.workers)
+    chart_tasks = add_tasks(builder, processor, df)
+    results, report = builder.run(force=args.force)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=1)
+
+    # Data files still used by any chart, built this run or earlier
+    if not any(r['status'] == 'failed' for r in report):
+        remove_unused(CHART_DATA_DIR, [os.path.basename(p) for name in chart_tasks for p in results[name]])
 
-# 5. Save processed data as JSON for client-side filtering
-print("Saving processed data...")
-df_export = df[[
-    'Player_Clean', 'Squad', 'Comp', 'Position', 'Age',
-    'Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90',
-    'PrgC_per90', 'Tkl_per90', 'Touches_per90', 'Cmp%'
-]].head(500)
+    print("✓ Chart generation complete!")
+    print(f"Charts saved to: static/charts/")
+    print(f"Data saved to: static/data/")
+    return 1 if any(r['status'] == 'failed' for r in report) else 0
 
-df_export.to_json('static/data/players_sample.json', orient='records')
 
-print("✓ Chart generation complete!")
-print(f"Charts saved to: static/charts/")
-print(f"Data saved to: static/data/")
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Density binning for large scatter plots
+Puts points on a 2D histogram grid; crowded cells are drawn as one aggregated
+marker each and only the points in sparse cells individually, so a chart's size
+depends on the grid rather than on the number of players
+"""
+
+import numpy as np
+
+# Scatter plots with at least this many points are drawn binned
+BINNING_MIN_POINTS = 5000
+
+# Grid cells per axis, and the most points a cell may hold and still be drawn point by point
+GRID_BINS = 60
+SPARSE_MAX = 3
+
+
+class ScatterBins:
+    """Points on a bins x bins grid spanning their x/y range
+
+    cell holds each point's cell id (iy * bins + ix, or -1 where x or y is
+    missing). Cells with more than sparse_max points are dense: dense_cells
+    lists them with their counts and edges, and every point outside them
+    (except missing ones) is in outliers. All point indices are positions in
+    the input arrays.
+    """
+
+    def __init__(self, x, y, bins=GRID_BINS, sparse_max=SPARSE_MAX):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        self.bins = bins
+        self.x_edges = self._edges(x[valid], bins)
+        self.y_edges = self._edges(y[valid], bins)
+
+        ix = np.clip(np.searchsorted(self.x_edges, x, side='right') - 1, 0, bins - 1)
+        iy = np.clip(np.searchsorted(self.y_edges, y, side='right') - 1, 0, bins - 1)
+        self.cell = np.where(valid, iy * bins + ix, -1)
+
+        counts = np.bincount(self.cell[valid], minlength=bins * bins)
+        dense = counts > sparse_max
+        self.dense_cells = np.flatnonzero(dense)
+        self.counts = counts[self.dense_cells]
+        self.outliers = np.flatnonzero(valid & ~dense[np.maximum(self.cell, 0)])
+
+    @staticmethod
+    def _edges(values, bins):
+        lo, hi = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+        if hi <= lo:
+            lo, hi = lo - 0.5, hi + 0.5
+        return np.linspace(lo, hi, bins + 1)
+
+    def cell_bounds(self):
+        """(x0, x1, y0, y1) arrays: the edges of each dense cell"""
+        ix, iy = self.dense_cells % self.bins, self.dense_cells // self.bins
+        return self.x_edges[ix], self.x_edges[ix + 1], self.y_edges[iy], self.y_edges[iy + 1]
+
+    def cell_centers(self):
+        """(x, y) arrays: the center of each dense cell"""
+        x0, x1, y0, y1 = self.cell_bounds()
+        return (x0 + x1) / 2, (y0 + y1) / 2
+
+    def members(self, cells):
+        """Indices of the points in the given cells"""
+        return np.flatnonzero(np.isin(self.cell, cells))
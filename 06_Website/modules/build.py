@@ -0,0 +1,180 @@
+"""
+Incremental task runner for generate_charts.py
+Tasks form a small DAG; each is keyed by a hash of its input data, parameters and code,
+skipped when its outputs are up to date, and otherwise run on a process pool
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+
+def hash_value(value, digest):
+    """Feed a task argument into digest (DataFrames by content, other values by repr)"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([list(map(str, value.columns)), list(map(str, value.dtypes))]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(str(value.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(value.tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode())
+            hash_value(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            hash_value(item, digest)
+    else:
+        digest.update(repr(value).encode())
+
+
+def source_hash(*objects):
+    """Hash of the source code of functions or modules, so code changes invalidate tasks"""
+    digest = hashlib.sha1()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+class Task:
+    """One build step: func(*args, **kwargs) writing the files in outputs
+
+    func must be a module-level function (it runs in a worker process). It may
+    return a list of further files it wrote; those are checked like outputs and
+    are returned again when the task is skipped.
+    """
+
+    def __init__(self, name, func, args=(), kwargs=None, outputs=(), deps=(), code=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.code = list(code)  # extra modules/functions whose source is part of the key
+
+    def key(self, dep_keys):
+        digest = hashlib.sha1(self.name.encode())
+        digest.update(source_hash(self.func, *self.code).encode())
+        hash_value(self.args, digest)
+        hash_value(self.kwargs, digest)
+        for dep in self.deps:
+            digest.update(dep_keys[dep].encode())
+        return digest.hexdigest()
+
+
+def _run(func, args, kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class Builder:
+    """Run tasks in dependency order, skipping those whose key and outputs are unchanged
+
+    State (task keys, returned files and timings) is kept in state_path between runs.
+    """
+
+    def __init__(self, state_path, workers=None):
+        self.state_path = state_path
+        self.workers = workers or os.cpu_count() or 1
+        self.tasks = {}
+        try:
+            with open(state_path) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def add(self, name, func, *args, outputs=(), deps=(), code=(), **kwargs):
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task {name}")
+        missing = [d for d in deps if d not in self.tasks]
+        if missing:
+            raise ValueError(f"Task {name} depends on unknown task(s) {missing}")
+        self.tasks[name] = Task(name, func, args, kwargs, outputs, deps, code)
+        return self.tasks[name]
+
+    def _up_to_date(self, task, key):
+        previous = self.state.get(task.name)
+        if previous is None or previous['key'] != key:
+            return False
+        return all(os.path.exists(path) for path in task.outputs + previous.get('files', []))
+
+    def _save_state(self):
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def run(self, force=False):
+        """Build every out-of-date task; returns (results, report)
+
+        results maps task names to what they returned (or returned last time,
+        if skipped). report is one {'task', 'status', 'seconds'} row per task,
+        status being 'built', 'skipped' or 'failed'. Tasks whose dependencies
+        failed are not run. Tasks are submitted as soon as their dependencies
+        are done, so independent branches run side by side.
+        """
+        keys, results, report = {}, {}, {}
+        pending = dict(self.tasks)
+        running = {}
+        failed = set()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                for name, task in list(pending.items()):
+                    if any(d in pending or d in running for d in task.deps):
+                        continue
+                    del pending[name]
+                    if any(d in failed for d in task.deps):
+                        failed.add(name)
+                        report[name] = {'task': name, 'status': 'failed', 'seconds': 0.0}
+                        continue
+                    keys[name] = task.key(keys)
+                    if not force and self._up_to_date(task, keys[name]):
+                        results[name] = self.state[name].get('files', [])
+                        report[name] = {'task': name, 'status': 'skipped', 'seconds': 0.0}
+                        continue
+                    running[pool.submit(_run, task.func, task.args, task.kwargs)] = name
+
+                if not running:
+                    continue
+                done = next(iter(wait(running, return_when=FIRST_COMPLETED).done))
+                name = running.pop(done)
+                try:
+                    result, seconds = done.result()
+                except Exception as e:
+                    failed.add(name)
+                    self.state.pop(name, None)
+                    report[name] = {'task': name, 'status': 'failed', 'seconds': 0.0, 'error': repr(e)}
+                    continue
+                results[name] = list(result or [])
+                self.state[name] = {'key': keys[name], 'files': results[name], 'seconds': round(seconds, 3)}
+                report[name] = {'task': name, 'status': 'built', 'seconds': seconds}
+                self._save_state()
+
+        self._save_state()
+        return results, [report[name] for name in self.tasks]
+
+
+def format_report(report):
+    """Plain-text table of a Builder.run() report"""
+    width = max([len(r['task']) for r in report] + [4])
+    lines = [f"{'task':<{width}}  {'status':<8}  seconds"]
+    for r in report:
+        lines.append(f"{r['task']:<{width}}  {r['status']:<8}  {r['seconds']:7.2f}"
+                     + (f"  {r['error']}" if 'error' in r else ''))
+    counts = {s: sum(r['status'] == s for r in report) for s in ('built', 'skipped', 'failed')}
+    lines.append(', '.join(f'{n} {s}' for s, n in counts.items()))
+    return '\n'.join(lines)
@@ -0,0 +1,69 @@
+"""
+Changesets written by incremental ingestion (data/ingest.py)
+Lists the players inserted, updated and removed in each league, and maps that onto
+old and new DataFrames so indexes only rebuild the groups that changed
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# Stable player identity across fetches: FBref has duplicate names but not duplicate (name, club, birth year)
+KEY_COLS = ['Player', 'Squad', 'Born']
+
+
+def player_keys(df, key_cols=KEY_COLS):
+    """(player, squad, born) per row; born is an int, or None when missing"""
+    player, squad, born = key_cols
+    years = pd.to_numeric(df[born], errors='coerce').to_numpy(dtype=np.float64)
+    born_values = [None if np.isnan(y) else int(y) for y in years]
+    return list(zip(df[player].astype(str), df[squad].astype(str), born_values))
+
+
+class Changeset:
+    """Players inserted, updated and removed per league by one ingestion run"""
+
+    def __init__(self, leagues):
+        """leagues maps a league name to {'inserted': keys, 'updated': keys, 'removed': keys}"""
+        self.leagues = {
+            league: {kind: {tuple(k) for k in change.get(kind, ())} for kind in ('inserted', 'updated', 'removed')}
+            for league, change in leagues.items()
+        }
+
+    @classmethod
+    def load(cls, path):
+        """Read a changeset JSON file"""
+        with open(path) as f:
+            return cls(json.load(f)['leagues'])
+
+    def keys(self, *kinds):
+        """Union of player keys of the given kinds across leagues"""
+        return set().union(*(change[kind] for change in self.leagues.values() for kind in kinds))
+
+    @property
+    def inserted(self):
+        return self.keys('inserted')
+
+    @property
+    def updated(self):
+        return self.keys('updated')
+
+    @property
+    def removed(self):
+        return self.keys('removed')
+
+    def __bool__(self):
+        return bool(self.keys('inserted', 'updated', 'removed'))
+
+    def row_mapping(self, old_df, new_df, key_cols=KEY_COLS):
+        """New row position of each row of old_df, or -1 if it was removed or its stats changed
+
+        Rows of new_df that no old row maps to are the inserted and updated players.
+        """
+        gone = self.keys('inserted', 'updated', 'removed')
+        position = {key: i for i, key in enumerate(player_keys(new_df, key_cols))}
+        return np.array(
+            [-1 if key in gone else position.get(key, -1) for key in player_keys(old_df, key_cols)],
+            dtype=np.int64,
+        )
@@ -0,0 +1,113 @@
+"""
+Shared, content-addressed datasets for generated Vega-Lite charts
+Moves the data Altair inlines into each spec out to <hash>.json files referenced
+through data.url, so charts built from the same data share one cached download
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from altair.utils.html import spec_to_html
+
+from modules.static_export import write_compressed, compressed_copies
+
+# Versions written into the chart HTML (same as Altair's own chart.save())
+VEGA_VERSION = '5'
+VEGALITE_VERSION = '5.20.1'
+VEGAEMBED_VERSION = '6'
+
+
+def _strings(node, out):
+    """Collect every string (keys and values) in a JSON-like structure"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            out.add(key)
+            _strings(value, out)
+    elif isinstance(node, list):
+        for value in node:
+            _strings(value, out)
+    elif isinstance(node, str):
+        out.add(node.replace('\\', ''))
+    return out
+
+
+def used_fields(spec, fields):
+    """The fields the spec can refer to: named anywhere, or inside an expression (datum.x)"""
+    strings = _strings({k: v for k, v in spec.items() if k != 'datasets'}, set())
+    expressions = [s for s in strings if 'datum' in s]
+    return [f for f in fields if f in strings or any(f in e for e in expressions)]
+
+
+def _json_value(value):
+    # NaN is not valid JSON; Vega reads null as missing
+    return None if isinstance(value, float) and value != value else value
+
+
+def _replace_named_data(node, urls):
+    if isinstance(node, dict):
+        if set(node) == {'name'} and node['name'] in urls:
+            return {'url': urls[node['name']]}
+        return {k: _replace_named_data(v, urls) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_replace_named_data(v, urls) for v in node]
+    return node
+
+
+def externalize(spec, data_dir, url_prefix):
+    """Spec with its inline datasets written to data_dir and referenced by URL
+
+    Each dataset keeps only the fields the spec uses and is stored as
+    <sha1[:16]>.json (with precompressed siblings), so identical data from
+    different charts is one file. url_prefix is how the chart page reaches
+    data_dir (e.g. '../data/charts/'). Returns (spec, written file names).
+    """
+    datasets = spec.get('datasets')
+    if not datasets:
+        return spec, []
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    urls, written = {}, []
+    for name, rows in datasets.items():
+        fields = list(dict.fromkeys(f for row in rows[:1] for f in row)) if rows else []
+        keep = used_fields(spec, fields)
+        rows = [{f: _json_value(row.get(f)) for f in keep} for row in rows]
+        data = json.dumps(rows, separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode()
+        file_name = hashlib.sha1(data).hexdigest()[:16] + '.json'
+        # Content-addressed, so only missing files (e.g. .br once brotli is installed) are written
+        if not all(p.exists() for p in compressed_copies(data_dir / file_name)):
+            write_compressed(data_dir / file_name, data)
+        urls[name] = url_prefix + file_name
+        written.append(file_name)
+
+    spec = _replace_named_data({k: v for k, v in spec.items() if k != 'datasets'}, urls)
+    return spec, written
+
+
+def save_chart(chart, path, data_dir, json_spec=False):
+    """Save an Altair chart (or a Vega-Lite spec dict) as HTML with external data
+
+    The data URL is made relative to the HTML file. With json_spec=True the
+    spec is also written next to it as .json. Returns the dataset file names used.
+    """
+    spec = chart if isinstance(chart, dict) else chart.to_dict()
+    path = Path(path)
+    url_prefix = os.path.relpath(data_dir, path.parent).replace(os.sep, '/') + '/'
+    spec, written = externalize(spec, data_dir, url_prefix)
+
+    html = spec_to_html(spec, mode='vega-lite', vega_version=VEGA_VERSION,
+                        vegaembed_version=VEGAEMBED_VERSION, vegalite_version=VEGALITE_VERSION)
+    path.write_text(html, encoding='utf-8')
+    if json_spec:
+        path.with_suffix('.json').write_text(json.dumps(spec), encoding='utf-8')
+    return written
+
+
+def remove_unused(data_dir, used):
+    """Delete dataset files in data_dir (and their compressed copies) not in used"""
+    keep = set(used) | {f'{name}.gz' for name in used} | {f'{name}.br' for name in used}
+    for path in Path(data_dir).glob('*.json*'):
+        if path.name not in keep:
+            path.unlink()
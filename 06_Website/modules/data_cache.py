@@ -0,0 +1,208 @@
+"""
+Columnar on-disk cache for the player CSVs
+Parses the wide FBref CSV once, then serves column projections from .npy files
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+CACHE_VERSION = 1
+
+
+def file_signature(path):
+    """Cheap change check: file size and modification time"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file (used when size/mtime disagree)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_columns(df, directory):
+    """Write each column of df as .npy file(s) in directory; returns the column specs"""
+    directory = Path(directory)
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            np.save(directory / f'{i}.npy', series.to_numpy())
+            columns.append({'name': name, 'file': str(i), 'kind': 'numeric'})
+        else:
+            # Dictionary-encode strings so nothing needs pickling
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(directory / f'{i}.codes.npy', codes.astype(np.int32))
+            np.save(directory / f'{i}.cats.npy', np.asarray(uniques, dtype=str))
+            columns.append({'name': name, 'file': str(i), 'kind': 'string'})
+    return columns
+
+
+def load_columns(directory, specs, names=None, mmap_mode=None, categorical=False):
+    """Load columns written by save_columns as a dict of arrays
+
+    With mmap_mode='r' numeric columns are memory-mapped rather than read.
+    categorical=True returns string columns as pandas Categoricals whose codes
+    stay memory-mapped too; otherwise they are materialized as object arrays.
+    """
+    directory = Path(directory)
+    by_name = {c['name']: c for c in specs}
+    wanted = list(names) if names is not None else [c['name'] for c in specs]
+
+    missing = [name for name in wanted if name not in by_name]
+    if missing:
+        raise KeyError(f"Columns not in {directory.name}: {missing}")
+
+    data = {}
+    for name in wanted:
+        col = by_name[name]
+        if col['kind'] == 'numeric':
+            data[name] = np.load(directory / f"{col['file']}.npy", mmap_mode=mmap_mode)
+            continue
+        codes = np.load(directory / f"{col['file']}.codes.npy", mmap_mode=mmap_mode)
+        cats = np.load(directory / f"{col['file']}.cats.npy").astype(object)
+        if categorical:
+            data[name] = pd.Categorical.from_codes(codes, categories=cats)
+        else:
+            values = cats[np.maximum(codes, 0)] if len(cats) else np.full(len(codes), np.nan, dtype=object)
+            values[codes < 0] = np.nan
+            data[name] = values
+    return data
+
+
+class ColumnarCache:
+    """Store each CSV column as its own .npy file so reads can skip unused columns
+
+    Layout for data/players.csv with the default cache directory:
+        data/.cache/players.json            manifest (source signature, hash, columns)
+        data/.cache/players.<hash>/0.npy    one array per numeric column
+        data/.cache/players.<hash>/3.codes.npy + 3.cats.npy   string columns
+    """
+
+    def __init__(self, cache_dir=None):
+        """Initialize with an optional cache directory (defaults to <csv dir>/.cache)"""
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    def _dir_for(self, csv_path):
+        return self.cache_dir or Path(csv_path).resolve().parent / '.cache'
+
+    def manifest_path(self, csv_path):
+        """Path of the JSON manifest describing the cached copy of csv_path"""
+        return self._dir_for(csv_path) / f'{Path(csv_path).stem}.json'
+
+    def _read_manifest(self, csv_path):
+        try:
+            with open(self.manifest_path(csv_path)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != CACHE_VERSION:
+            return None
+        if not (self._dir_for(csv_path) / manifest['data_dir']).is_dir():
+            return None
+        return manifest
+
+    def _write_manifest(self, csv_path, manifest):
+        # Write-then-rename so concurrent readers never see a half-written manifest
+        path = self.manifest_path(csv_path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def validate(self, csv_path):
+        """Return the manifest if the cache matches csv_path, else None"""
+        manifest = self._read_manifest(csv_path)
+        if manifest is None:
+            return None
+
+        signature = file_signature(csv_path)
+        if signature == manifest['source']:
+            return manifest
+
+        # Size or mtime changed (e.g. fresh checkout): fall back to the content hash
+        if file_hash(csv_path) != manifest['sha1']:
+            return None
+        manifest['source'] = signature
+        self._write_manifest(csv_path, manifest)
+        return manifest
+
+    def build(self, csv_path, df=None):
+        """Parse csv_path (unless df is given) and write the columnar copy"""
+        if df is None:
+            df = pd.read_csv(csv_path)
+
+        cache_dir = self._dir_for(csv_path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        signature = file_signature(csv_path)
+        sha1 = file_hash(csv_path)
+        stem = Path(csv_path).stem
+        data_dir = f'{stem}.{sha1[:12]}'
+
+        tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix=f'.{stem}.'))
+        columns = save_columns(df, tmp_dir)
+
+        final_dir = cache_dir / data_dir
+        if final_dir.exists():
+            shutil.rmtree(tmp_dir)
+        else:
+            os.replace(tmp_dir, final_dir)
+
+        manifest = {
+            'version': CACHE_VERSION,
+            'source': signature,
+            'sha1': sha1,
+            'data_dir': data_dir,
+            'n_rows': len(df),
+            'columns': columns,
+        }
+        self._write_manifest(csv_path, manifest)
+
+        # Drop data directories left behind by older versions of this CSV
+        for old in cache_dir.glob(f'{stem}.*'):
+            if old.is_dir() and old.name != data_dir:
+                shutil.rmtree(old, ignore_errors=True)
+
+        return manifest
+
+    def remove(self, csv_path):
+        """Delete the cached copy of csv_path, leaving other CSVs' entries alone"""
+        cache_dir = self._dir_for(csv_path)
+        stem = Path(csv_path).stem
+        self.manifest_path(csv_path).unlink(missing_ok=True)
+        for old in cache_dir.glob(f'{stem}.*'):
+            if old.is_dir():
+                shutil.rmtree(old, ignore_errors=True)
+
+    def read(self, csv_path, columns=None, mmap_mode=None):
+        """Load csv_path through the cache, materializing only the requested columns"""
+        manifest = self.validate(csv_path)
+        if manifest is None:
+            df = pd.read_csv(csv_path)
+            try:
+                self.build(csv_path, df)
+            except OSError:
+                # Read-only deployments still work, just without the speedup
+                pass
+            return df[list(columns)] if columns is not None else df
+
+        data_dir = self._dir_for(csv_path) / manifest['data_dir']
+        data = load_columns(data_dir, manifest['columns'], columns, mmap_mode=mmap_mode)
+        return pd.DataFrame(data, columns=list(data))
+
+
+def read_players_csv(csv_path, columns=None, cache_dir=None):
+    """Drop-in replacement for pd.read_csv(csv_path, usecols=columns) backed by the cache"""
+    return ColumnarCache(cache_dir).read(csv_path, columns=columns)
@@ -6,37 +6,70 @@ Handles data loading, cleaning, and feature engineering
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
+
+from modules.player_store import read_players
+from modules.similarity import SimilarityIndex, ALL_POSITIONS
+from modules.percentiles import PercentileEngine, age_groups
+from modules.filters import FilterEngine
+from modules.name_index import NameIndex
+from modules.metrics import add_derived_columns
+from modules.changes import Changeset, KEY_COLS
+
+# Cohorts players are ranked against for percentiles
+PERCENTILE_COHORTS = {
+    'position': ['Position'],
+    'league_position': ['Comp', 'Position'],
+    'age_position': ['Age_Group', 'Position'],
+}
 
 class FootballDataProcessor:
     """Process and prepare football player statistics for visualization"""
 
-    def __init__(self, data_path):
-        """Initialize with path to CSV data"""
+    def __init__(self, data_path, approximate_similarity=False, seasons=None, leagues=None, positions=None):
+        """Initialize with path to CSV data or to a PlayerStore directory
+
+        approximate_similarity switches similar-player search to the IVF index
+        for very large player pools (small position groups stay exact).
+        seasons, leagues and positions select the players to load; with a
+        store they are pushed down so only matching partitions are read.
+        """
         self.data_path = data_path
+        self.approximate_similarity = approximate_similarity
+        self.query = {'seasons': seasons, 'leagues': leagues, 'positions': positions}
         self.df = None
         self.df_filtered = None
         self.scaler = StandardScaler()
-
-    def load_and_clean(self, min_minutes=450):
-        """Load data and apply basic cleaning"""
-        self.df = pd.read_csv(self.data_path)
+        self._similarity_index = None
+        self._percentile_engine = None
+        self._filter_engine = None
+        self._name_index = None
+
+    @classmethod
+    def from_frame(cls, df, approximate_similarity=False):
+        """Processor over a frame load_and_clean() already returned (e.g. in a worker process)"""
+        processor = cls(None, approximate_similarity)
+        processor.df_filtered = df
+        return processor
+
+    def load_and_clean(self, min_minutes=450, columns=None):
+        """Load data and apply basic cleaning
+
+        columns limits which raw CSV columns are read (all of them by default)
+        """
+        self.df = read_players(self.data_path, columns=columns, min_minutes=min_minutes, **self.query)
+        self._similarity_index = None
+        self._percentile_engine = None
+        self._filter_engine = None
+        self._name_index = None
 
         # Filter for players with meaningful playing time
         self.df_filtered = self.df[self.df['Min'] >= min_minutes].copy()
 
-        # Create per-90 metrics
-        self._create_per90_metrics()
-
-        # Simplify positions
-        self.df_filtered['Position'] = self.df_filtered['Pos'].apply(self._simplify_position)
+        # Create per-90 metrics, simplified positions and league labels
+        add_derived_columns(self.df_filtered)
 
         # Create age groups
-        self.df_filtered['Age_Group'] = pd.cut(
-            self.df_filtered['Age'],
-            bins=[0, 21, 23, 27, 32, 50],
-            labels=['U21', '21-23', '24-27', '28-32', '33+']
-        )
+        self.df_filtered['Age_Group'] = age_groups(self.df_filtered['Age'])
 
         # Performance vs expectation
         self.df_filtered['Goals_minus_xG'] = self.df_filtered['Gls'] - self.df_filtered['xG']
@@ -47,78 +80,88 @@ class FootballDataProcessor:
 
         return self.df_filtered
 
-    def _create_per90_metrics(self):
-        """Create per-90 minute statistics"""
-        metrics = [
-            ('Gls', 'Gls_per90'),
-            ('Ast', 'Ast_per90'),
-            ('xG', 'xG_per90'),
-            ('xAG', 'xAG_per90'),
-            ('G+A', 'G+A_per90'),
-            ('PrgC', 'PrgC_per90'),
-            ('Tkl', 'Tkl_per90'),
-            ('Int', 'Int_per90'),
-            ('Blocks', 'Blocks_per90'),
-            ('Sh', 'Sh_per90'),
-            ('SoT', 'SoT_per90'),
-            ('Touches', 'Touches_per90'),
-            ('PrgP', 'PrgP_per90'),
-            ('CrsPA', 'CrsPA_per90'),
-            ('Carries', 'Carries_per90'),
-        ]
-
-        for original, per90 in metrics:
-            if original in self.df_filtered.columns:
-                self.df_filtered[per90] = self.df_filtered[original] / self.df_filtered['90s']
-
-        # Combined metrics
-        if 'xG' in self.df_filtered.columns and 'xAG' in self.df_filtered.columns:
-            self.df_filtered['xGxAG_per90'] = (
-                self.df_filtered['xG'] + self.df_filtered['xAG']
-            ) / self.df_filtered['90s']
-
-    @staticmethod
-    def _simplify_position(pos):
-        """Simplify position strings to main categories"""
-        if pd.isna(pos):
-            return 'Unknown'
-        pos_upper = str(pos).upper()
-        if 'GK' in pos_upper:
-            return 'GK'
-        elif 'FW' in pos_upper:
-            return 'FW'
-        elif 'MF' in pos_upper:
-            return 'MF'
-        elif 'DF' in pos_upper:
-            return 'DF'
-        return 'Unknown'
-
-    def get_player_data(self, player_name):
-        """Get all data for a specific player"""
-        return self.df_filtered[
-            self.df_filtered['Player_Clean'].str.contains(player_name, case=False, na=False)
-        ]
-
-    def get_players_by_filters(self, positions=None, leagues=None, age_min=None, age_max=None, teams=None):
-        """Filter players by multiple criteria"""
-        df = self.df_filtered.copy()
-
-        if positions:
-            df = df[df['Position'].isin(positions)]
+    def apply_changeset(self, changeset, min_minutes=450, columns=None):
+        """Reload the data after an incremental ingestion run (see data/ingest.py)
+
+        changeset is a Changeset or the path of a changeset JSON file. Similarity
+        and percentile indexes that were already built are carried over, and only
+        the position/cohort groups that contain changed players are rebuilt.
+        columns, if given, always gets the player key columns (Player, Squad, Born)
+        the changeset is matched on.
+        """
+        if not isinstance(changeset, Changeset):
+            changeset = Changeset.load(changeset)
+        if self.df_filtered is not None and not changeset:
+            return self.df_filtered
+
+        if columns is not None:
+            columns = list(dict.fromkeys(list(columns) + KEY_COLS))
+
+        old_df = self.df_filtered
+        old_similarity, old_percentiles = self._similarity_index, self._percentile_engine
+        self.load_and_clean(min_minutes, columns)
+        if old_df is None or any(c not in old_df.columns for c in KEY_COLS):
+            # Old rows without keys cannot be matched; the indexes are rebuilt on first use
+            return self.df_filtered
+
+        old_to_new = changeset.row_mapping(old_df, self.df_filtered)
+        if old_similarity is not None:
+            self._similarity_index = old_similarity.updated(self.df_filtered, old_to_new)
+        if old_percentiles is not None:
+            self._percentile_engine = old_percentiles.updated(self.df_filtered, old_to_new)
+        return self.df_filtered
 
-        if leagues:
-            df = df[df['Comp'].isin(leagues)]
+    def get_name_index(self):
+        """Player name index over the loaded data, built on first use"""
+        if self._name_index is None:
+            self._name_index = NameIndex(self.df_filtered['Player_Clean'])
+        return self._name_index
 
-        if age_min:
-            df = df[df['Age'] >= age_min]
+    def get_player_data(self, player_name):
+        """Get all data for a specific player
 
-        if age_max:
-            df = df[df['Age'] <= age_max]
+        Matching ignores case and accents; exact name matches come first,
+        followed by partial matches.
+        """
+        return self.df_filtered.iloc[self.get_name_index().search(player_name)]
 
-        if teams:
-            df = df[df['Squad'].isin(teams)]
+    def get_filter_engine(self):
+        """Filter engine over the loaded data, built on first use"""
+        if self._filter_engine is None:
+            self._filter_engine = FilterEngine(
+                self.df_filtered, categorical=['Position', 'Comp', 'Squad'], ranges=['Age']
+            )
+        return self._filter_engine
 
-        return df
+    def get_players_by_filters(self, positions=None, leagues=None, age_min=None, age_max=None, teams=None):
+        """Filter players by multiple criteria"""
+        engine = self.get_filter_engine()
+        rows = engine.select(
+            Position=positions or None,
+            Comp=leagues or None,
+            Age=(age_min or None, age_max or None) if (age_min or age_max) else None,
+            Squad=teams or None,
+        )
+        return engine.frame(rows)
+
+    # Key metrics for similarity
+    SIMILARITY_METRICS = [
+        'Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90',
+        'PrgC_per90', 'Tkl_per90', 'Int_per90', 'Touches_per90',
+        'Cmp%', 'PrgP_per90'
+    ]
+
+    def get_similarity_index(self):
+        """Similarity index over the loaded data, built on first use"""
+        if self._similarity_index is None:
+            available_metrics = [m for m in self.SIMILARITY_METRICS if m in self.df_filtered.columns]
+            # Raw per-90 values (no standardization), as this tool has always compared them
+            self._similarity_index = SimilarityIndex(
+                self.df_filtered, available_metrics,
+                key_col='Player_Clean', group_col='Position', standardize=False, dtype=np.float64,
+                approximate=self.approximate_similarity
+            )
+        return self._similarity_index
 
     def find_similar_players(self, player_name, n_similar=10, position_filter=True):
         """Find statistically similar players using cosine similarity"""
@@ -127,44 +170,57 @@ class FootballDataProcessor:
         if len(player_data) == 0:
             return pd.DataFrame()
 
-        player = player_data.iloc[0]
-        position = player['Position']
+        index = self.get_similarity_index()
+        position = player_data.iloc[0]['Position']
 
         # Filter to same position if requested
-        if position_filter and position != 'Unknown':
-            comparison_df = self.df_filtered[self.df_filtered['Position'] == position].copy()
+        group = position if position_filter and position != 'Unknown' else ALL_POSITIONS
+        labels, scores = index.query_label(player_data.index[0], n_similar, group=group)
+
+        similar = self.df_filtered.loc[
+            labels, ['Player_Clean', 'Squad', 'Comp', 'Position', 'Age'] + index.metrics
+        ].copy()
+        similar.insert(5, 'Similarity', scores.astype(float))
+        return similar
+
+    def neighbour_table(self, player_names=None, n_similar=10, position_filter=True,
+                        block_rows=256, workers=None):
+        """Compact neighbour table for many players (every player when player_names is None)
+
+        Same neighbours as find_similar_players() for each name, computed in blocked
+        matrix products. Returns (rows, neighbours, scores): row positions in
+        df_filtered of the players found, and (len(rows), n_similar) arrays of
+        neighbour row positions (-1 padded) and similarity scores (NaN padded).
+        Names that match no player are left out.
+        """
+        index = self.get_similarity_index()
+        if player_names is None:
+            rows = np.arange(len(self.df_filtered))
         else:
-            comparison_df = self.df_filtered.copy()
-
-        # Key metrics for similarity
-        metrics = [
-            'Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90',
-            'PrgC_per90', 'Tkl_per90', 'Int_per90', 'Touches_per90',
-            'Cmp%', 'PrgP_per90'
-        ]
-
-        # Filter to available metrics
-        available_metrics = [m for m in metrics if m in comparison_df.columns]
-
-        # Prepare data for similarity calculation
-        X = comparison_df[available_metrics].fillna(0)
-        player_vector = player[available_metrics].fillna(0).values.reshape(1, -1)
-
-        # Calculate cosine similarity
-        similarities = cosine_similarity(player_vector, X)[0]
-
-        # Add similarity scores
-        comparison_df['Similarity'] = similarities
-
-        # Exclude the player themselves
-        comparison_df = comparison_df[
-            comparison_df['Player_Clean'] != player['Player_Clean']
-        ]
-
-        # Return top N similar players
-        return comparison_df.nlargest(n_similar, 'Similarity')[
-            ['Player_Clean', 'Squad', 'Comp', 'Position', 'Age', 'Similarity'] + available_metrics
-        ]
+            matches = [self.get_player_data(name) for name in player_names]
+            rows = self.df_filtered.index.get_indexer([m.index[0] for m in matches if len(m) > 0])
+
+        positions = self.df_filtered['Position'].to_numpy()[rows]
+        groups = np.where(position_filter & (positions != 'Unknown'), positions, ALL_POSITIONS)
+        neighbours, scores = index.batch_top_k(rows, n_similar, group=groups,
+                                               block_rows=block_rows, workers=workers)
+        return rows, neighbours, scores
+
+    def find_similar_batch(self, player_names=None, n_similar=10, position_filter=True,
+                           block_rows=256, workers=None):
+        """neighbour_table() as one row per (player, neighbour)
+
+        Columns: Query, Rank, Player_Clean, Squad, Comp, Position, Similarity.
+        """
+        rows, neighbours, scores = self.neighbour_table(player_names, n_similar, position_filter,
+                                                        block_rows, workers)
+        found = neighbours >= 0
+        query_rows = np.repeat(rows, found.sum(axis=1))
+        similar = self.df_filtered.iloc[neighbours[found]][['Player_Clean', 'Squad', 'Comp', 'Position']]
+        similar.insert(0, 'Query', self.df_filtered['Player_Clean'].to_numpy()[query_rows])
+        similar.insert(1, 'Rank', np.nonzero(found)[1] + 1)
+        similar['Similarity'] = scores[found].astype(float)
+        return similar.reset_index(drop=True)
 
     def get_position_specific_metrics(self, position):
         """Get the most relevant metrics for each position"""
@@ -177,30 +233,27 @@ class FootballDataProcessor:
 
         return metrics_by_position.get(position, [])
 
-    def get_percentile_ranks(self, player_name, metrics):
+    def get_percentile_engine(self):
+        """Percentile engine over the loaded data, built on first use"""
+        if self._percentile_engine is None:
+            self._percentile_engine = PercentileEngine(self.df_filtered, PERCENTILE_COHORTS)
+        return self._percentile_engine
+
+    def get_percentile_ranks(self, player_name, metrics, cohort='position'):
         """Calculate percentile ranks for a player across specified metrics"""
         player_data = self.get_player_data(player_name)
 
         if len(player_data) == 0:
             return {}
 
-        player = player_data.iloc[0]
-        position = player['Position']
-
-        # Compare within same position
-        position_players = self.df_filtered[self.df_filtered['Position'] == position]
+        # Compare within same position (or another cohort from PERCENTILE_COHORTS)
+        available = [m for m in metrics if m in self.df_filtered.columns]
+        return self.get_percentile_engine().percentiles(player_data.index[0], available, cohort)
 
-        percentiles = {}
-        for metric in metrics:
-            if metric in position_players.columns:
-                player_value = player[metric]
-                if pd.notna(player_value):
-                    percentile = (position_players[metric] < player_value).sum() / len(position_players) * 100
-                    percentiles[metric] = percentile
-                else:
-                    percentiles[metric] = 0
-
-        return percentiles
+    def get_percentile_table(self, metrics, cohort='position'):
+        """Percentile ranks of every player for the given metrics"""
+        available = [m for m in metrics if m in self.df_filtered.columns]
+        return self.get_percentile_engine().percentile_matrix(available, cohort)
 
     def get_leagues(self):
         """Get list of all leagues"""
@@ -209,7 +262,8 @@ class FootballDataProcessor:
     def get_teams(self, league=None):
         """Get list of teams, optionally filtered by league"""
         if league:
-            return sorted(self.df_filtered[self.df_filtered['Comp'] == league]['Squad'].unique())
+            rows = self.get_filter_engine().select(Comp=league)
+            return sorted(pd.unique(self.df_filtered['Squad'].to_numpy()[rows]))
         return sorted(self.df_filtered['Squad'].unique())
 
     def get_positions(self):
@@ -218,12 +272,5 @@ class FootballDataProcessor:
 
     def get_player_list(self, position=None, league=None):
         """Get list of player names, optionally filtered"""
-        df = self.df_filtered.copy()
-
-        if position:
-            df = df[df['Position'] == position]
-
-        if league:
-            df = df[df['Comp'] == league]
-
-        return sorted(df['Player_Clean'].unique())
+        rows = self.get_filter_engine().select(Position=position or None, Comp=league or None)
+        return self.get_name_index().names(rows)
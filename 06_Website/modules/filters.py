@@ -0,0 +1,101 @@
+"""
+Filter engine for the page filters (league, position, team, age, minutes)
+Answers filter combinations with precomputed bitmaps and sorted indexes instead of DataFrame copies
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FilterEngine:
+    """Row selection over a fixed DataFrame
+
+    Categorical columns get one packed bitmap per value; range columns get a
+    sorted index answered with np.searchsorted. select() returns row positions
+    (in dataframe order) and never copies the frame.
+    """
+
+    def __init__(self, df, categorical=(), ranges=()):
+        """Index the given categorical and range columns of df"""
+        self.df = df
+        self.n_rows = len(df)
+        self._bitmaps = {}
+        self._counts = {}
+        self._sorted = {}
+
+        for col in categorical:
+            codes, uniques = pd.factorize(df[col])
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            self._bitmaps[col] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+            self._counts[col] = dict(zip(uniques, counts))
+
+        for col in ranges:
+            values = df[col].to_numpy(dtype=np.float64)
+            rows = np.flatnonzero(~np.isnan(values))
+            rows = rows[np.argsort(values[rows], kind='stable')]
+            self._sorted[col] = (values[rows], rows)
+
+    def values(self, col):
+        """Distinct values of an indexed categorical column"""
+        return list(self._counts[col])
+
+    def _plan(self, col, condition):
+        """Estimated match count and a callable producing the packed bitmap"""
+        if col in self._bitmaps:
+            wanted = condition if isinstance(condition, (list, tuple, set, frozenset)) else [condition]
+            wanted = [v for v in wanted if v in self._bitmaps[col]]
+            count = sum(self._counts[col][v] for v in wanted)
+
+            def build():
+                if not wanted:
+                    return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+                return np.bitwise_or.reduce([self._bitmaps[col][v] for v in wanted])
+            return count, build
+
+        if col in self._sorted:
+            lo, hi = condition
+            values, rows = self._sorted[col]
+            start = np.searchsorted(values, lo, side='left') if lo is not None else 0
+            stop = np.searchsorted(values, hi, side='right') if hi is not None else len(values)
+            stop = max(start, stop)
+
+            def build():
+                mask = np.zeros(self.n_rows, dtype=bool)
+                mask[rows[start:stop]] = True
+                return np.packbits(mask)
+            return stop - start, build
+
+        raise KeyError(f"Column is not indexed: {col}")
+
+    def select(self, predicates=None, **kwargs):
+        """Row positions matching every predicate
+
+        Categorical predicates take a value or a list of values; range predicates
+        take an inclusive (low, high) tuple where either end may be None.
+        Predicates whose value is None are ignored.
+        """
+        predicates = {**(predicates or {}), **kwargs}
+        plans = [self._plan(col, cond) for col, cond in predicates.items() if cond is not None]
+        if not plans:
+            return np.arange(self.n_rows)
+
+        # Most selective first, so the running AND empties out as early as possible
+        plans.sort(key=lambda plan: plan[0])
+        result = None
+        for count, build in plans:
+            if count == 0:
+                return np.array([], dtype=np.int64)
+            bitmap = build()
+            result = bitmap if result is None else result & bitmap
+            if not result.any():
+                return np.array([], dtype=np.int64)
+        return np.flatnonzero(np.unpackbits(result, count=self.n_rows))
+
+    def frame(self, rows, columns=None):
+        """Materialize only the selected rows (and columns) of the indexed frame"""
+        if columns is None:
+            return self.df.iloc[rows]
+        positions = self.df.columns.get_indexer(columns)
+        if (positions < 0).any():
+            raise KeyError(f"Columns not in frame: {[c for c, i in zip(columns, positions) if i < 0]}")
+        return self.df.iloc[rows, positions]
@@ -0,0 +1,108 @@
+"""
+Derived metrics shared by the Streamlit app and FootballDataProcessor
+One registry of per-90 metrics plus Position/League labels, computed in a single vectorized pass
+"""
+
+import numpy as np
+import pandas as pd
+
+# (column name, source columns summed before dividing by 90s, label used by the Streamlit app)
+# Metrics without an app label are only added by FootballDataProcessor.
+PER90_METRICS = [
+    ('Gls_per90', ['Gls'], 'Goals per 90'),
+    ('Ast_per90', ['Ast'], 'Assists per 90'),
+    ('xG_per90', ['xG'], 'xG per 90'),
+    ('xAG_per90', ['xAG'], 'xAG per 90'),
+    ('G+A_per90', ['G+A'], 'G+A per 90'),
+    ('PrgC_per90', ['PrgC'], 'Prog Carries per 90'),
+    ('Tkl_per90', ['Tkl'], 'Tackles per 90'),
+    ('Int_per90', ['Int'], 'Interceptions per 90'),
+    ('Blocks_per90', ['Blocks'], None),
+    ('Sh_per90', ['Sh'], None),
+    ('SoT_per90', ['SoT'], None),
+    ('Touches_per90', ['Touches'], None),
+    ('PrgP_per90', ['PrgP'], 'Prog Passes per 90'),
+    ('CrsPA_per90', ['CrsPA'], None),
+    ('Carries_per90', ['Carries'], None),
+    ('SCA_per90', ['SCA'], 'Shot Creating per 90'),
+    ('xGxAG_per90', ['xG', 'xAG'], None),
+]
+
+# First match wins, so hybrid positions like "FW,MF" count as FW
+POSITION_PRIORITY = ['GK', 'FW', 'MF', 'DF']
+
+
+def simplify_position(pos):
+    """Simplify position strings to main categories"""
+    if pd.isna(pos):
+        return 'Unknown'
+    pos_upper = str(pos).upper()
+    for position in POSITION_PRIORITY:
+        if position in pos_upper:
+            return position
+    return 'Unknown'
+
+
+def league_label(comp):
+    """Drop the country code from a competition name ("eng Premier League" -> "Premier League")"""
+    if pd.isna(comp):
+        return comp
+    country, _, name = str(comp).partition(' ')
+    return name if name and country.islower() else comp
+
+
+def map_values(series, func):
+    """Apply func once per distinct value and broadcast the result through a lookup table"""
+    codes, uniques = pd.factorize(series)
+    table = np.array([func(u) for u in uniques] + [func(np.nan)], dtype=object)
+    # Missing values have code -1, which picks the last entry of the table
+    return pd.Series(table[codes], index=series.index)
+
+
+def per90_metrics(df, app_labels=False):
+    """(column name, source columns) for every registry metric whose sources are in df"""
+    metrics = []
+    for name, sources, label in PER90_METRICS:
+        if app_labels:
+            if label is None:
+                continue
+            name = label
+        if all(s in df.columns for s in sources):
+            metrics.append((name, sources))
+    return metrics
+
+
+def add_per90_metrics(df, app_labels=False, decimals=None, dtype=np.float32):
+    """Add every available per-90 metric to df in place; returns the new column names
+
+    All source columns are read as one block, gathered into metric order
+    (summing sources for combined metrics like xG+xAG) and divided by 90s
+    in one broadcast.
+    """
+    metrics = per90_metrics(df, app_labels)
+    if not metrics:
+        return []
+
+    sources = list(dict.fromkeys(s for _, cols in metrics for s in cols))
+    block = df[sources].to_numpy(dtype=np.float64)
+    values = block[:, [sources.index(cols[0]) for _, cols in metrics]]
+    for j, (_, cols) in enumerate(metrics):
+        for s in cols[1:]:
+            values[:, j] += block[:, sources.index(s)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values /= df['90s'].to_numpy(dtype=np.float64)[:, None]
+    if decimals is not None:
+        values = np.round(values, decimals)
+
+    names = [name for name, _ in metrics]
+    df[names] = values.astype(dtype)
+    return names
+
+
+def add_derived_columns(df, app_labels=False, decimals=None, dtype=np.float32):
+    """Per-90 metrics plus the simplified Position and League label columns"""
+    add_per90_metrics(df, app_labels=app_labels, decimals=decimals, dtype=dtype)
+    df['Position'] = map_values(df['Pos'], simplify_position)
+    df['League'] = map_values(df['Comp'], league_label)
+    return df
@@ -0,0 +1,139 @@
+"""
+Player name index for lookups and search boxes
+Exact matches by hash map, prefix/substring search on accent- and case-folded keys
+"""
+
+import unicodedata
+
+import numpy as np
+
+# Letters that NFKD does not decompose into base letter + accent
+_EXTRA_FOLDS = str.maketrans({
+    'ø': 'o', 'Ø': 'o', 'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe',
+    'đ': 'd', 'Đ': 'd', 'ð': 'd', 'Ð': 'd', 'ł': 'l', 'Ł': 'l',
+    'þ': 'th', 'Þ': 'th', 'ı': 'i', 'ß': 'ss',
+})
+
+# Substring search uses postings of this many characters
+NGRAM = 3
+
+
+def fold_name(name):
+    """Lower-case, accent-free form of a name ("Martin Ødegaard" -> "martin odegaard")"""
+    name = str(name).translate(_EXTRA_FOLDS)
+    name = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class NameIndex:
+    """Index over a sequence of player names; results are row positions into that sequence"""
+
+    def __init__(self, names):
+        """Build the index from names (one per row, duplicates allowed)"""
+        self._names = np.asarray([str(n) for n in names], dtype=object)
+        self._folded = [fold_name(n) for n in self._names]
+
+        # Exact lookups, by original and by folded name, rows in input order
+        self._exact = {}
+        self._exact_folded = {}
+        for row, (name, key) in enumerate(zip(self._names, self._folded)):
+            self._exact.setdefault(name, []).append(row)
+            self._exact_folded.setdefault(key, []).append(row)
+
+        # Sorted keys for prefix search: the full name and every word in it,
+        # so "odeg" finds "Martin Ødegaard"
+        keys, rows = [], []
+        for row, key in enumerate(self._folded):
+            words = key.split(' ')
+            for i in range(len(words)):
+                keys.append(' '.join(words[i:]))
+                rows.append(row)
+        order = np.argsort(np.asarray(keys, dtype=str), kind='stable')
+        self._prefix_keys = np.asarray(keys, dtype=str)[order]
+        self._prefix_rows = np.asarray(rows, dtype=np.int64)[order]
+
+        # n-gram postings for substring search
+        self._postings = {}
+        for row, key in enumerate(self._folded):
+            for gram in _ngrams(key):
+                self._postings.setdefault(gram, []).append(row)
+
+        # Rows ordered by original name, for sorted name lists
+        self._name_order = np.argsort(self._names.astype(str), kind='stable')
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._exact
+
+    def exact(self, name):
+        """Rows whose name is exactly name"""
+        return list(self._exact.get(name, []))
+
+    def first(self, name):
+        """First row whose name is exactly name, or None"""
+        rows = self._exact.get(name)
+        return rows[0] if rows else None
+
+    def prefix(self, query):
+        """Rows where the folded name, or any word of it, starts with the folded query"""
+        q = fold_name(query)
+        if not q:
+            return []
+        start = np.searchsorted(self._prefix_keys, q, side='left')
+        stop = np.searchsorted(self._prefix_keys, q + '\U0010ffff', side='left')
+        return sorted(set(self._prefix_rows[start:stop].tolist()))
+
+    def contains(self, query):
+        """Rows whose folded name contains the folded query"""
+        q = fold_name(query)
+        if not q:
+            return list(range(len(self._names)))
+        if len(q) < NGRAM:
+            # Too short for the postings; a plain pass over the folded keys is still cheap
+            return [r for r, key in enumerate(self._folded) if q in key]
+
+        candidates = None
+        for gram in sorted(_ngrams(q), key=lambda g: len(self._postings.get(g, ()))):
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                return []
+        return sorted(r for r in candidates if q in self._folded[r])
+
+    def search(self, query, limit=None):
+        """Rows matching query: exact (folded) matches, then word-prefix, then substring matches"""
+        q = fold_name(query)
+        seen = set()
+        results = []
+        for rows in (self._exact_folded.get(q, []), self.prefix(q), self.contains(q)):
+            for row in rows:
+                if row not in seen:
+                    seen.add(row)
+                    results.append(row)
+        return results[:limit] if limit is not None else results
+
+    def name(self, row):
+        """Original name of a row"""
+        return self._names[row]
+
+    def names(self, rows=None):
+        """Sorted unique names, optionally restricted to the given rows"""
+        order = self._name_order
+        if rows is not None:
+            selected = np.zeros(len(self._names), dtype=bool)
+            selected[np.asarray(rows, dtype=np.int64)] = True
+            order = order[selected[order]]
+        sorted_names = self._names[order]
+        if len(sorted_names) == 0:
+            return []
+        keep = np.ones(len(sorted_names), dtype=bool)
+        keep[1:] = sorted_names[1:] != sorted_names[:-1]
+        return sorted_names[keep].tolist()
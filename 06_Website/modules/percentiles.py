@@ -0,0 +1,191 @@
+"""
+Percentile engine for the Compare features
+Keeps pre-sorted metric values per cohort so ranks are binary searches, not column scans
+"""
+
+import numpy as np
+import pandas as pd
+
+# Age groups shared by the processor and the app
+AGE_BINS = [0, 21, 23, 27, 32, 50]
+AGE_LABELS = ['U21', '21-23', '24-27', '28-32', '33+']
+
+
+def age_groups(ages):
+    """Bucket ages into AGE_LABELS"""
+    return pd.cut(ages, bins=AGE_BINS, labels=AGE_LABELS)
+
+
+class PercentileEngine:
+    """Percentile ranks of player metrics within cohorts (position, league x position, ...)
+
+    A percentile is the share of the cohort with a strictly lower value, times 100.
+    Missing values never count as lower, but still count towards the cohort size.
+    """
+
+    def __init__(self, df, cohorts=None, arrays=None):
+        """Index df; cohorts maps a cohort name to the columns that define it
+
+        arrays, as returned by shared_arrays(), supplies sorted values prepared elsewhere.
+        """
+        self.df = df
+        self.cohorts = cohorts or {'position': ['Position']}
+        self._row_of_label = {label: i for i, label in enumerate(df.index)}
+        self._groups = {}
+        self._sorted = {}
+        self._arrays = arrays or {}
+
+    def _cohort(self, cohort):
+        """Group id per row, group keys and group sizes for a cohort"""
+        if cohort not in self._groups:
+            cols = self.cohorts[cohort]
+            keys = self.df[cols[0]] if len(cols) == 1 else pd.MultiIndex.from_frame(self.df[cols])
+            gid, uniques = pd.factorize(keys)
+            sizes = np.bincount(gid[gid >= 0], minlength=len(uniques))
+            keys = [k if isinstance(k, tuple) else (k,) for k in uniques]
+            lookup = {k: g for g, k in enumerate(keys)}
+            self._groups[cohort] = {'gid': gid, 'sizes': sizes, 'keys': keys, 'lookup': lookup}
+        return self._groups[cohort]
+
+    def _sorted_values(self, cohort, metric):
+        """Values sorted by (group, value), with each group's start offset and non-null count"""
+        key = (cohort, metric)
+        prefix = f'{cohort}::{metric}::'
+        if key not in self._sorted and prefix + 'values' in self._arrays:
+            self._sorted[key] = {part: self._arrays[prefix + part] for part in ('values', 'rows', 'starts', 'counts')}
+        if key not in self._sorted:
+            groups = self._cohort(cohort)
+            gid = groups['gid']
+            values = self.df[metric].to_numpy(dtype=np.float64)
+            valid = (gid >= 0) & ~np.isnan(values)
+            order = np.flatnonzero(valid)
+            order = order[np.lexsort((values[order], gid[order]))]
+            counts = np.bincount(gid[order], minlength=len(groups['sizes']))
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            self._sorted[key] = {'values': values[order], 'rows': order, 'starts': starts, 'counts': counts}
+        return self._sorted[key]
+
+    def prepare(self, metrics, cohorts=None):
+        """Sort the given metrics up front for every cohort (default: all of them)"""
+        for cohort in cohorts or self.cohorts:
+            for metric in metrics:
+                self._sorted_values(cohort, metric)
+
+    def shared_arrays(self):
+        """Prepared sorted arrays, keyed for PercentileEngine(..., arrays=...)"""
+        return {
+            f'{cohort}::{metric}::{part}': array
+            for (cohort, metric), sv in self._sorted.items()
+            for part, array in sv.items()
+        }
+
+    def updated(self, df, old_to_new):
+        """Engine over df (the data after an ingestion changeset) re-sorting only changed groups
+
+        old_to_new comes from Changeset.row_mapping(). Every (cohort, metric) sorted
+        so far is carried over; a group keeps its sorted values when exactly the
+        same unchanged players are in it.
+        """
+        engine = PercentileEngine(df, self.cohorts)
+        carried = np.flatnonzero(old_to_new >= 0)
+        new_from_old = np.full(len(df), -1, dtype=np.int64)
+        new_from_old[old_to_new[carried]] = carried
+
+        reusable = {}
+        for (cohort, metric) in self._sorted:
+            if cohort not in reusable:
+                reusable[cohort] = engine._reusable_groups(self, cohort, new_from_old)
+            engine._sorted[(cohort, metric)] = engine._merge_sorted(self, cohort, metric, reusable[cohort], old_to_new)
+        return engine
+
+    def _reusable_groups(self, old, cohort, new_from_old):
+        """Old group id for each group whose members all carried over from old unchanged, else -1"""
+        groups, previous = self._cohort(cohort), old._cohort(cohort)
+        old_of_new = np.array([previous['lookup'].get(k, -1) for k in groups['keys']], dtype=np.int64)
+        gid = groups['gid']
+        source = np.where(gid >= 0, new_from_old, -1)
+        same = source >= 0
+        same[same] = previous['gid'][source[same]] == old_of_new[gid[same]]
+        same_counts = np.bincount(gid[same], minlength=len(groups['keys']))
+        old_sizes = np.where(old_of_new >= 0, previous['sizes'][old_of_new], -1)
+        return np.where((same_counts == groups['sizes']) & (old_sizes == groups['sizes']), old_of_new, -1)
+
+    def _merge_sorted(self, old, cohort, metric, reusable, old_to_new):
+        """Sorted arrays for one metric: reused segments from old, fresh sorts for the rest"""
+        groups = self._cohort(cohort)
+        gid = groups['gid']
+        n_groups = len(groups['keys'])
+        values = self.df[metric].to_numpy(dtype=np.float64)
+
+        stale = (gid >= 0) & (reusable[np.maximum(gid, 0)] < 0) & ~np.isnan(values)
+        fresh = np.flatnonzero(stale)
+        fresh = fresh[np.lexsort((values[fresh], gid[fresh]))]
+        fresh_counts = np.bincount(gid[fresh], minlength=n_groups)
+        fresh_starts = np.concatenate(([0], np.cumsum(fresh_counts)[:-1]))
+
+        previous = old._sorted_values(cohort, metric)
+        parts, counts = [], np.zeros(n_groups, dtype=np.int64)
+        for g in range(n_groups):
+            if reusable[g] >= 0:
+                start, count = previous['starts'][reusable[g]], previous['counts'][reusable[g]]
+                parts.append(old_to_new[previous['rows'][start:start + count]])
+            else:
+                start, count = fresh_starts[g], fresh_counts[g]
+                parts.append(fresh[start:start + count])
+            counts[g] = count
+
+        rows = np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return {'values': values[rows], 'rows': rows, 'starts': starts, 'counts': counts}
+
+    def group_of(self, label, cohort='position'):
+        """Cohort key (tuple of column values) of the row with this index label"""
+        row = self._row_of_label[label]
+        return tuple(self.df[c].iat[row] for c in self.cohorts[cohort])
+
+    def percentile_of_value(self, value, metric, group, cohort='position'):
+        """Percentile of an arbitrary value inside one cohort group (group is a key tuple)"""
+        groups = self._cohort(cohort)
+        g = groups['lookup'].get(group if isinstance(group, tuple) else (group,))
+        if g is None or pd.isna(value):
+            return 0
+        sv = self._sorted_values(cohort, metric)
+        start = sv['starts'][g]
+        below = np.searchsorted(sv['values'][start:start + sv['counts'][g]], value, side='left')
+        return below / groups['sizes'][g] * 100
+
+    def percentile(self, label, metric, cohort='position'):
+        """Percentile of the row with this index label within its own cohort group"""
+        row = self._row_of_label[label]
+        groups = self._cohort(cohort)
+        g = groups['gid'][row]
+        if g < 0:
+            return 0
+        value = self.df[metric].iat[row]
+        return self.percentile_of_value(value, metric, groups['keys'][g], cohort)
+
+    def percentiles(self, label, metrics, cohort='position'):
+        """Percentiles of one row for several metrics, as a dict"""
+        return {m: self.percentile(label, m, cohort) for m in metrics}
+
+    def percentile_matrix(self, metrics, cohort='position'):
+        """Percentiles of every row for every metric in one vectorized pass per metric"""
+        groups = self._cohort(cohort)
+        gid = groups['gid']
+        n = len(gid)
+        result = {}
+        for metric in metrics:
+            sv = self._sorted_values(cohort, metric)
+            values = sv['values']
+            out = np.zeros(n)
+            if len(values):
+                rows = sv['rows']
+                sorted_gid = gid[rows]
+                # Strictly-lower count = offset of the first equal value within the group
+                new_run = np.ones(len(values), dtype=bool)
+                new_run[1:] = (sorted_gid[1:] != sorted_gid[:-1]) | (values[1:] != values[:-1])
+                run_start = np.maximum.accumulate(np.where(new_run, np.arange(len(values)), 0))
+                below = run_start - sv['starts'][sorted_gid]
+                out[rows] = below / groups['sizes'][sorted_gid] * 100
+            result[metric] = out
+        return pd.DataFrame(result, index=self.df.index)
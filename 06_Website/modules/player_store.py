@@ -0,0 +1,231 @@
+"""
+Partitioned multi-season player store
+One directory of .npy columns per (season, league), split into row groups with
+position and minutes statistics, so queries only read the data they match
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.data_cache import save_columns, read_players_csv, file_hash
+from modules.metrics import simplify_position, league_label, map_values
+
+MANIFEST = 'manifest.json'
+STORE_VERSION = 1
+
+# Rows per row group; groups never span two positions, so small leagues get one group per position
+ROW_GROUP_ROWS = 1024
+
+SEASON_PATTERN = re.compile(r'(\d{4})[-_](\d{4})')
+
+
+def season_from_path(path):
+    """Season named in a file name, e.g. players_data-2024_2025.csv -> '2024-2025'"""
+    match = SEASON_PATTERN.search(Path(path).name)
+    return f'{match.group(1)}-{match.group(2)}' if match else None
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_')
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _league_matches(comp, leagues):
+    """True if comp ("eng Premier League") is named in leagues, with or without its country code"""
+    return leagues is None or comp in leagues or league_label(comp) in leagues
+
+
+def _take(directory, spec, rows):
+    """Values of one stored column at the given row positions (memory-mapped, so only those pages are read)"""
+    if spec['kind'] == 'numeric':
+        return np.load(directory / f"{spec['file']}.npy", mmap_mode='r')[rows]
+    codes = np.load(directory / f"{spec['file']}.codes.npy", mmap_mode='r')[rows]
+    cats = np.load(directory / f"{spec['file']}.cats.npy").astype(object)
+    values = cats[np.maximum(codes, 0)] if len(cats) else np.full(len(codes), np.nan, dtype=object)
+    values[codes < 0] = np.nan
+    return values
+
+
+class PlayerStore:
+    """Player tables partitioned by season and league
+
+    Layout:
+        <directory>/manifest.json                              partitions and their row-group statistics
+        <directory>/season=2024-2025/league=Premier_League/   save_columns() arrays plus row.npy
+
+    Within a partition rows are sorted by simplified position, then by minutes
+    (descending), and cut into row groups that each hold one position. query()
+    skips partitions by season and league and row groups by position and
+    minutes before touching any column data; row.npy restores the original row
+    order of the selected rows.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        try:
+            with open(self.directory / MANIFEST) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'version': STORE_VERSION, 'partitions': []}
+
+    def seasons(self):
+        return sorted({p['season'] for p in self.manifest['partitions']})
+
+    def leagues(self, seasons=None):
+        seasons = _as_list(seasons)
+        return sorted({league_label(p['comp']) for p in self.manifest['partitions']
+                       if seasons is None or p['season'] in seasons})
+
+    def signature(self, **query):
+        """Hash of the manifest and a query, identifying the data the query returns"""
+        text = json.dumps(self.manifest, sort_keys=True) + json.dumps(query, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def _write_manifest(self):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.directory / MANIFEST)
+
+    def write(self, df, season, league_col='Comp'):
+        """Store one season's table, replacing that season's partitions for the leagues in df"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        positions = map_values(df['Pos'], simplify_position).to_numpy()
+        minutes = pd.to_numeric(df['Min'], errors='coerce').to_numpy(dtype=np.float64)
+        comps = set(df[league_col].dropna())
+        partitions = [p for p in self.manifest['partitions'] if p['season'] != season or p['comp'] not in comps]
+
+        for comp, rows in df.groupby(league_col, sort=False).indices.items():
+            # Position blocks, most minutes first (missing minutes last)
+            order = rows[np.lexsort((np.nan_to_num(-minutes[rows], nan=np.inf), positions[rows]))]
+            path = f'season={_slug(season)}/league={_slug(comp)}'
+            target = self.directory / path
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            tmp = Path(tempfile.mkdtemp(dir=target.parent, prefix='.tmp.'))
+            part = df.iloc[order].reset_index(drop=True)
+            columns = save_columns(part, tmp)
+            np.save(tmp / 'row.npy', np.argsort(np.argsort(order, kind='stable')).astype(np.int64))
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(tmp, target)
+
+            row_groups = []
+            part_positions, part_minutes = positions[order], minutes[order]
+            bounds = np.flatnonzero(part_positions[1:] != part_positions[:-1]) + 1
+            for block_start, block_stop in zip(np.r_[0, bounds], np.r_[bounds, len(order)]):
+                for start in range(block_start, block_stop, ROW_GROUP_ROWS):
+                    stop = min(start + ROW_GROUP_ROWS, block_stop)
+                    values = part_minutes[start:stop]
+                    values = values[~np.isnan(values)]
+                    row_groups.append({
+                        'start': int(start), 'stop': int(stop), 'position': part_positions[start],
+                        'min_minutes': float(values.min()) if len(values) else None,
+                        'max_minutes': float(values.max()) if len(values) else None,
+                    })
+            partitions.append({'season': season, 'comp': comp, 'path': path, 'n_rows': len(order),
+                               'columns': columns, 'row_groups': row_groups})
+
+        self.manifest['partitions'] = partitions
+        self._write_manifest()
+
+    def plan(self, seasons=None, leagues=None, positions=None, min_minutes=None):
+        """(partition, row positions to read) for every partition with matching rows"""
+        seasons, leagues, positions = _as_list(seasons), _as_list(leagues), _as_list(positions)
+        plan = []
+        for partition in sorted(self.manifest['partitions'], key=lambda p: p['season']):
+            if seasons is not None and partition['season'] not in seasons:
+                continue
+            if not _league_matches(partition['comp'], leagues):
+                continue
+            groups = [
+                g for g in partition['row_groups']
+                if (positions is None or g['position'] in positions)
+                and (min_minutes is None or (g['max_minutes'] is not None and g['max_minutes'] >= min_minutes))
+            ]
+            if groups:
+                plan.append((partition, np.concatenate([np.arange(g['start'], g['stop']) for g in groups])))
+        return plan
+
+    def query(self, columns=None, seasons=None, leagues=None, positions=None, min_minutes=None):
+        """Players matching every given predicate, as one DataFrame with a Season column
+
+        seasons and leagues take lists (or a single value); leagues match with or
+        without the country code ("Premier League" or "eng Premier League").
+        positions are simplified positions (GK, DF, MF, FW, Unknown). Rows come
+        out season by season and league by league in their original order.
+        """
+        plan = self.plan(seasons, leagues, positions, min_minutes)
+        if columns is None:
+            # With no matching partition the (empty) result still has every stored column
+            partitions = [p for p, _ in plan] or self.manifest['partitions']
+            columns = list(dict.fromkeys(c['name'] for p in partitions for c in p['columns']))
+        columns = [c for c in columns if c != 'Season']
+
+        parts = {name: [] for name in ['Season'] + columns}
+        for partition, rows in plan:
+            directory = self.directory / partition['path']
+            specs = {c['name']: c for c in partition['columns']}
+            if min_minutes is not None:
+                rows = rows[_take(directory, specs['Min'], rows) >= min_minutes]
+            rows = rows[np.argsort(np.load(directory / 'row.npy', mmap_mode='r')[rows], kind='stable')]
+
+            parts['Season'].append(np.full(len(rows), partition['season'], dtype=object))
+            for name in columns:
+                if name in specs:
+                    parts[name].append(_take(directory, specs[name], rows))
+                else:
+                    # Column missing from this season's schema
+                    parts[name].append(np.full(len(rows), np.nan))
+
+        if not plan:
+            return pd.DataFrame(columns=['Season'] + columns)
+        data = {name: np.concatenate(arrays) if len(arrays) > 1 else arrays[0] for name, arrays in parts.items()}
+        return pd.DataFrame(data)
+
+
+def read_players(path, columns=None, seasons=None, leagues=None, positions=None, min_minutes=None):
+    """Load players from a CSV or a PlayerStore directory
+
+    For a store the predicates are pushed down to partitions and row groups; a
+    single CSV is read through the columnar cache and filtered afterwards
+    (its season, if given, is taken from the file name).
+    """
+    if Path(path).is_dir():
+        return PlayerStore(path).query(columns, seasons, leagues, positions, min_minutes)
+
+    needed = None if columns is None else list(dict.fromkeys(list(columns) + ['Comp', 'Pos', 'Min']))
+    df = read_players_csv(path, columns=needed)
+    mask = np.ones(len(df), dtype=bool)
+    seasons, leagues, positions = _as_list(seasons), _as_list(leagues), _as_list(positions)
+    if seasons is not None and season_from_path(path) not in seasons:
+        mask[:] = False
+    if leagues is not None:
+        mask &= map_values(df['Comp'], lambda comp: _league_matches(comp, leagues)).to_numpy(dtype=bool)
+    if positions is not None:
+        mask &= map_values(df['Pos'], simplify_position).isin(positions).to_numpy()
+    if min_minutes is not None:
+        mask &= (df['Min'] >= min_minutes).to_numpy()
+    if not mask.all():
+        df = df[mask]
+    return df[list(columns)] if columns is not None else df
+
+
+def dataset_signature(path, **query):
+    """Content hash of whatever read_players(path, **query) returns, for cache versions"""
+    if Path(path).is_dir():
+        return PlayerStore(path).signature(**query)
+    return hashlib.sha1((file_hash(path) + json.dumps(query, sort_keys=True, default=str)).encode()).hexdigest()
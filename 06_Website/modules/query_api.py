@@ -0,0 +1,290 @@
+"""
+JSON query API for the static pages
+Answers search, filtered lists, similar players, percentiles and top-N from the
+FootballDataProcessor indexes, so pages fetch a few KB per interaction and get
+the same results as the Streamlit app. Responses are kept in an LRU cache and
+carry ETags.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from modules.lru import LRUCache
+from modules.static_server import StaticHandler, accepted_encodings
+
+API_PREFIX = '/api/'
+
+# Columns every player row in a response carries
+SUMMARY_COLUMNS = ['Player_Clean', 'Squad', 'Comp', 'Position', 'Age']
+
+MAX_LIMIT = 1000
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+
+class APIError(Exception):
+    """A request the API cannot answer; status is the HTTP status to send"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    # NaN is not valid JSON
+    return None if isinstance(value, float) and value != value else value
+
+
+def _records(df):
+    return [{k: _value(v) for k, v in row.items()} for row in df.to_dict('records')]
+
+
+class QueryAPI:
+    """Endpoints over a loaded FootballDataProcessor
+
+    Each endpoint is a method taking the query parameters (name -> list of
+    values, comma-separated values split) and returning a JSON-serializable
+    object. get() adds caching: responses are keyed by endpoint and
+    parameters, so a repeated query is a dict lookup.
+    """
+
+    ENDPOINTS = ('meta', 'search', 'players', 'similar', 'percentiles', 'top')
+
+    def __init__(self, processor, version='', cache_size=1024):
+        """processor must already be loaded; version (e.g. the dataset signature) goes into ETags"""
+        self.processor = processor
+        self.df = processor.df_filtered
+        self.version = version
+        self.cache = LRUCache(cache_size)
+        # The processor builds its indexes lazily and is not thread-safe; answers are
+        # computed one at a time, cache hits are not
+        self._lock = threading.Lock()
+        self._numeric = {c for c in self.df.columns if pd.api.types.is_numeric_dtype(self.df[c])}
+
+    # ============ PARAMETERS ============
+    @staticmethod
+    def _list(params, name):
+        values = [v.strip() for value in params.get(name, []) for v in value.split(',')]
+        return [v for v in values if v] or None
+
+    @staticmethod
+    def _str(params, name, default=None):
+        values = params.get(name)
+        return values[-1].strip() if values and values[-1].strip() else default
+
+    def _int(self, params, name, default, lo=0, hi=MAX_LIMIT):
+        value = self._str(params, name)
+        if value is None:
+            return default
+        try:
+            return min(max(int(value), lo), hi)
+        except ValueError:
+            raise APIError(400, f"{name} must be an integer")
+
+    def _float(self, params, name):
+        value = self._str(params, name)
+        try:
+            return None if value is None else float(value)
+        except ValueError:
+            raise APIError(400, f"{name} must be a number")
+
+    def _bool(self, params, name, default):
+        value = self._str(params, name)
+        return default if value is None else value.lower() not in ('0', 'false', 'no')
+
+    def _metric(self, name):
+        if name not in self._numeric:
+            raise APIError(400, f"Unknown metric {name!r}")
+        return name
+
+    def _columns(self, params):
+        columns = self._list(params, 'columns') or []
+        unknown = [c for c in columns if c not in self.df.columns]
+        if unknown:
+            raise APIError(400, f"Unknown column(s) {unknown}")
+        return list(dict.fromkeys(SUMMARY_COLUMNS + columns))
+
+    def _player(self, params):
+        name = self._str(params, 'player')
+        if name is None:
+            raise APIError(400, "player is required")
+        match = self.processor.get_player_data(name)
+        if len(match) == 0:
+            raise APIError(404, f"Player {name!r} not found")
+        return match.iloc[:1]
+
+    # ============ ENDPOINTS ============
+    def meta(self, params):
+        """Dropdown values and the metrics the other endpoints accept"""
+        return {
+            'version': self.version,
+            'total_players': len(self.df),
+            'leagues': self.processor.get_leagues(),
+            'positions': self.processor.get_positions(),
+            'teams': self.processor.get_teams(),
+            'metrics': sorted(self._numeric),
+        }
+
+    def search(self, params):
+        """Players whose name matches q (accents and case ignored), best matches first"""
+        query = self._str(params, 'q', '')
+        limit = self._int(params, 'limit', 10, lo=1)
+        rows = self.processor.get_name_index().search(query, limit=limit) if query else []
+        return {'results': _records(self.df.iloc[rows][SUMMARY_COLUMNS])}
+
+    def players(self, params):
+        """Players matching position/league/team/age filters, optionally sorted by a metric"""
+        df = self.processor.get_players_by_filters(
+            positions=self._list(params, 'position'),
+            leagues=self._list(params, 'league'),
+            teams=self._list(params, 'team'),
+            age_min=self._float(params, 'age_min'),
+            age_max=self._float(params, 'age_max'),
+        )
+        sort = self._str(params, 'sort')
+        if sort is not None:
+            df = df.sort_values(self._metric(sort), ascending=not self._bool(params, 'descending', True),
+                                kind='stable')
+        offset = self._int(params, 'offset', 0, hi=len(df))
+        limit = self._int(params, 'limit', 100)
+        columns = self._columns(params)
+        return {'total': len(df), 'offset': offset, 'results': _records(df.iloc[offset:offset + limit][columns])}
+
+    def similar(self, params):
+        """The n players most similar to player (cosine similarity, as in the app)"""
+        target = self._player(params)
+        same_position = self._bool(params, 'same_position', True)
+        n = self._int(params, 'n', 10, lo=1, hi=100)
+        similar = self.processor.find_similar_players(target['Player_Clean'].iloc[0], n, same_position)
+        return {
+            'player': _records(target[SUMMARY_COLUMNS])[0],
+            'same_position': same_position,
+            'results': _records(similar),
+        }
+
+    def percentiles(self, params):
+        """Percentile ranks of player within a cohort (position by default)"""
+        target = self._player(params)
+        cohort = self._str(params, 'cohort', 'position')
+        if cohort not in self.processor.get_percentile_engine().cohorts:
+            raise APIError(400, f"Unknown cohort {cohort!r}")
+        metrics = self._list(params, 'metrics') or \
+            self.processor.get_position_specific_metrics(target['Position'].iloc[0])
+        metrics = [self._metric(m) for m in metrics]
+        ranks = self.processor.get_percentile_ranks(target['Player_Clean'].iloc[0], metrics, cohort)
+        return {
+            'player': _records(target[SUMMARY_COLUMNS])[0],
+            'cohort': cohort,
+            'percentiles': {m: _value(v) for m, v in ranks.items()},
+        }
+
+    def top(self, params):
+        """The n players with the highest value of metric, optionally within positions/leagues"""
+        metric = self._metric(self._str(params, 'metric') or '')
+        df = self.processor.get_players_by_filters(
+            positions=self._list(params, 'position'),
+            leagues=self._list(params, 'league'),
+        )
+        top = df.nlargest(self._int(params, 'n', 15, lo=1), metric)
+        return {'metric': metric, 'results': _records(top[list(dict.fromkeys(SUMMARY_COLUMNS + [metric]))])}
+
+    # ============ RESPONSES ============
+    def get(self, endpoint, params):
+        """Cached response for an endpoint: {'status', 'body', 'gzip', 'etag', 'cached'}
+
+        gzip is the compressed body, or None when the body is small.
+        """
+        key = (endpoint, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        entry = self.cache.get(key)
+        if entry is not None:
+            return dict(entry, cached=True)
+
+        with self._lock:
+            try:
+                if endpoint not in self.ENDPOINTS:
+                    raise APIError(404, f"Unknown endpoint {endpoint!r}")
+                status, result = 200, getattr(self, endpoint)(params)
+            except APIError as e:
+                status, result = e.status, {'error': str(e)}
+
+        body = json.dumps(result, separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode()
+        digest = hashlib.sha1(self.version.encode() + body).hexdigest()[:24]
+        entry = {
+            'status': status,
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None,
+            'etag': f'"{digest}"',
+        }
+        # Errors are cheap to recompute; only cache answers
+        if status == 200:
+            self.cache.put(key, entry)
+        return dict(entry, cached=False)
+
+
+class APIHandler(StaticHandler):
+    """StaticHandler that answers /api/<endpoint>?... from a QueryAPI
+
+    Use api_handler() to bind it to an API instance.
+    """
+
+    api = None
+
+    def do_GET(self):
+        if self.path.startswith(API_PREFIX):
+            self._serve_api(head=False)
+        else:
+            super().do_GET()
+
+    def do_HEAD(self):
+        if self.path.startswith(API_PREFIX):
+            self._serve_api(head=True)
+        else:
+            super().do_HEAD()
+
+    def _serve_api(self, head):
+        self._started = time.perf_counter()
+        self._timed = True
+        url = urlsplit(self.path)
+        response = self.api.get(url.path[len(API_PREFIX):].strip('/'), parse_qs(url.query))
+
+        if_none_match = self.headers.get('If-None-Match')
+        if response['status'] == 200 and if_none_match and \
+                response['etag'] in [t.strip() for t in if_none_match.split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', response['etag'])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self._log_timed(304, 0, None)
+            return
+
+        body, encoding = response['body'], None
+        if response['gzip'] is not None and 'gzip' in accepted_encodings(self.headers.get('Accept-Encoding')):
+            body, encoding = response['gzip'], 'gzip'
+        self.send_response(response['status'])
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', response['etag'])
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('X-Cache', 'HIT' if response['cached'] else 'MISS')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        self._log_timed(response['status'], 0 if head else len(body), encoding)
+
+
+def api_handler(api):
+    """APIHandler subclass serving api, for make_server(..., handler=api_handler(api))"""
+    return type('BoundAPIHandler', (APIHandler,), {'api': api})
@@ -0,0 +1,106 @@
+"""
+Shared dataset for multi-worker deployments
+The first worker publishes the cleaned data and precomputed index arrays as .npy files;
+every worker memory-maps them read-only, so the OS page cache holds a single copy.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.data_cache import save_columns, load_columns
+
+MANIFEST = 'manifest.json'
+
+
+class SharedDataset:
+    """A published dataset attached read-only: a DataFrame plus named arrays"""
+
+    def __init__(self, directory, frame, arrays, version):
+        self.directory = directory
+        self.frame = frame
+        self.version = version
+        self._arrays = arrays
+
+    def arrays(self, prefix):
+        """Arrays published under prefix, with the prefix stripped from their names"""
+        start = f'{prefix}::'
+        return {name[len(start):]: a for name, a in self._arrays.items() if name.startswith(start)}
+
+
+def publish(directory, version, frame, arrays):
+    """Write frame and arrays to directory/version (atomically); returns the version directory
+
+    arrays maps names to numpy arrays. If another worker already published this
+    version, its copy is kept.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / version
+    if (target / MANIFEST).exists():
+        return target
+
+    tmp = Path(tempfile.mkdtemp(dir=directory, prefix=f'.{version}.'))
+    (tmp / 'frame').mkdir()
+    (tmp / 'arrays').mkdir()
+    np.save(tmp / 'frame' / 'index.npy', frame.index.to_numpy())
+    columns = save_columns(frame, tmp / 'frame')
+    names = []
+    for i, (name, array) in enumerate(arrays.items()):
+        np.save(tmp / 'arrays' / f'{i}.npy', np.ascontiguousarray(array))
+        names.append(name)
+    with open(tmp / MANIFEST, 'w') as f:
+        json.dump({'version': version, 'n_rows': len(frame), 'columns': columns, 'arrays': names}, f)
+
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Lost the race to another worker publishing the same version
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+def attach(directory, version):
+    """Memory-map a published version, or return None if it has not been published"""
+    target = Path(directory) / version
+    try:
+        with open(target / MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    index = np.load(target / 'frame' / 'index.npy', mmap_mode='r')
+    data = load_columns(target / 'frame', manifest['columns'], mmap_mode='r', categorical=True)
+    # copy=False keeps each column backed by its memory map
+    frame = pd.DataFrame(data, index=pd.Index(index), copy=False)
+    arrays = {
+        name: np.load(target / 'arrays' / f'{i}.npy', mmap_mode='r')
+        for i, name in enumerate(manifest['arrays'])
+    }
+    return SharedDataset(target, frame, arrays, version)
+
+
+def attach_or_publish(directory, version, build):
+    """Attach to a published version, building and publishing it first if needed
+
+    build() must return (frame, arrays). The worker that builds still attaches
+    afterwards, so it does not keep a private copy either.
+    """
+    shared = attach(directory, version)
+    if shared is None:
+        frame, arrays = build()
+        publish(directory, version, frame, arrays)
+        shared = attach(directory, version)
+    return shared
+
+
+def remove_stale(directory, keep):
+    """Delete published versions other than keep (readers that still map them are unaffected)"""
+    for path in Path(directory).iterdir():
+        if path.is_dir() and path.name != keep and not path.name.startswith('.'):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,259 @@
+"""
+Similarity index for the Similar Players features
+Precomputes per-position feature matrices so each lookup is one matrix-vector product
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.ann import IVFIndex
+
+# Group name used for searches across every position
+ALL_POSITIONS = 'All'
+
+# Approximate mode: partitions smaller than this are still searched exactly
+ANN_MIN_ROWS = 10_000
+# Approximate mode: candidates shortlisted per requested result, then rescored exactly
+RERANK_FACTOR = 4
+
+
+class SimilarityIndex:
+    """Cosine-similarity index over per-90 metrics, partitioned by position
+
+    Each group holds a contiguous float32 matrix whose rows are (optionally
+    standardized) and L2-normalized, so cosine similarity reduces to a dot product.
+    Unstandardized per-90 vectors all score close to 1, so callers that skip
+    standardization can ask for float64 to keep the ranking exact.
+
+    With approximate=True, large partitions are searched through an IVF index
+    (modules/ann.py) built on first use: only the n_probe closest lists are scored,
+    and the shortlist is rescored exactly. Raise n_probe for higher recall.
+    """
+
+    def __init__(self, df, metrics, key_col='Player', group_col='Position', standardize=True,
+                 dtype=np.float32, arrays=None, approximate=False, n_probe=8, quantize=None):
+        """Build the index from df (rows are identified by df's index labels)
+
+        arrays, as returned by shared_arrays(), reuses partitions built elsewhere
+        (e.g. memory-mapped by modules/shared_data.py) instead of recomputing them.
+        quantize='int8' stores the approximate-mode vectors as int8 codes.
+        """
+        self.metrics = list(metrics)
+        self.key_col = key_col
+        self.group_col = group_col
+        self.standardize = standardize
+        self.dtype = np.dtype(dtype)
+        # Scores closer than the matrix precision are treated as ties
+        self._decimals = np.finfo(self.dtype).precision
+        self.approximate = approximate
+        self.n_probe = n_probe
+        self.quantize = quantize
+        self._ivf_indexes = {}
+
+        self._df = df
+        self._features = None
+        self._labels = df.index.to_numpy()
+        self._groups = df[group_col].to_numpy()
+        self._keys = df[key_col].to_numpy()
+        self._partitions = {}
+
+        # O(1) row lookups: label -> row, key -> rows (in dataframe order)
+        self._row_of_label = {label: i for i, label in enumerate(self._labels)}
+        self._rows_of_key = {}
+        for i, key in enumerate(self._keys):
+            self._rows_of_key.setdefault(key, []).append(i)
+
+        for group in pd.unique(self._groups):
+            if arrays is not None and f'{group}::matrix' in arrays:
+                self._partitions[group] = {part: arrays[f'{group}::{part}'] for part in ('rows', 'matrix', 'local')}
+            else:
+                self._build_partition(group, np.flatnonzero(self._groups == group))
+
+    def _build_partition(self, group, rows):
+        if self._features is None:
+            self._features = self._df[self.metrics].fillna(0).to_numpy(dtype=np.float64)
+        X = self._features[rows]
+        if self.standardize:
+            # Same transform as StandardScaler (population std, constant columns left unscaled)
+            std = X.std(axis=0)
+            std[std == 0] = 1.0
+            X = (X - X.mean(axis=0)) / std
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = np.ascontiguousarray(X / norms, dtype=self.dtype)
+
+        # Position of each global row inside this partition (-1 if absent)
+        local = np.full(len(self._labels), -1, dtype=np.int64)
+        local[rows] = np.arange(len(rows))
+        self._partitions[group] = {'rows': rows, 'matrix': matrix, 'local': local}
+        return self._partitions[group]
+
+    def updated(self, df, old_to_new):
+        """Index over df (the data after an ingestion changeset) rebuilding only changed groups
+
+        old_to_new comes from Changeset.row_mapping(). A group keeps its matrix when
+        exactly the same unchanged players are in it, in the same order.
+        """
+        new_groups = df[self.group_col].to_numpy()
+        arrays = {}
+        reused = []
+        for group, part in self._partitions.items():
+            if group == ALL_POSITIONS:
+                continue
+            rows = old_to_new[part['rows']]
+            if not np.array_equal(rows, np.flatnonzero(new_groups == group)):
+                continue
+            local = np.full(len(df), -1, dtype=np.int64)
+            local[rows] = np.arange(len(rows))
+            arrays.update({f'{group}::rows': rows, f'{group}::matrix': part['matrix'], f'{group}::local': local})
+            reused.append(group)
+
+        index = SimilarityIndex(df, self.metrics, self.key_col, self.group_col, self.standardize, self.dtype,
+                                arrays=arrays, approximate=self.approximate, n_probe=self.n_probe,
+                                quantize=self.quantize)
+        for group in reused:
+            if group in self._ivf_indexes:
+                index._ivf_indexes[group] = self._ivf_indexes[group]
+        return index
+
+    def _partition(self, group):
+        if group in self._partitions:
+            return self._partitions[group]
+        if group == ALL_POSITIONS:
+            return self._build_partition(group, np.arange(len(self._labels)))
+        raise KeyError(f"Unknown group: {group}")
+
+    def _ivf(self, group, part):
+        """IVF index for a partition in approximate mode (None when searched exactly)"""
+        if not self.approximate or len(part['rows']) < ANN_MIN_ROWS:
+            return None
+        if group not in self._ivf_indexes:
+            self._ivf_indexes[group] = IVFIndex(part['matrix'], quantize=self.quantize)
+        return self._ivf_indexes[group]
+
+    def __contains__(self, key):
+        return key in self._rows_of_key
+
+    def shared_arrays(self):
+        """Per-position partition arrays, keyed for SimilarityIndex(..., arrays=...)"""
+        return {
+            f'{group}::{part}': array
+            for group, partition in self._partitions.items() if group != ALL_POSITIONS
+            for part, array in partition.items()
+        }
+
+    def groups(self):
+        """Groups that have been indexed"""
+        return list(self._partitions)
+
+    def top_k(self, row, n=5, group=None, exclude_rows=()):
+        """Return (row positions, scores) of the n rows most similar to row"""
+        group = self._groups[row] if group is None else group
+        part = self._partition(group)
+        local = part['local'][row]
+        if local < 0:
+            raise KeyError(f"Row {row} is not in group {group}")
+
+        query = part['matrix'][local]
+        excluded = part['local'][np.asarray(list(exclude_rows) or [row], dtype=np.int64)]
+        excluded = excluded[excluded >= 0]
+
+        ivf = self._ivf(group, part)
+        if ivf is None:
+            candidates = None
+            scores = part['matrix'] @ query
+            scores[excluded] = -np.inf
+            available = len(scores) - len(excluded)
+        else:
+            # Shortlist from the probed lists, then score the shortlist exactly
+            candidates, _ = ivf.search(query, n * RERANK_FACTOR, self.n_probe, exclude=excluded)
+            candidates.sort()
+            scores = part['matrix'][candidates] @ query
+            available = len(candidates)
+
+        n = min(n, available)
+        if n <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=self.dtype)
+        top = self._select(scores, n)
+        found = top if candidates is None else candidates[top]
+        return part['rows'][found], scores[top]
+
+    def _select(self, scores, n):
+        """Positions of the n highest scores, best first"""
+        # Rank on rounded scores so rounding noise doesn't reorder players with identical stats;
+        # ties are then broken by dataframe order like DataFrame.nlargest
+        ranked = np.round(scores, self._decimals)
+        threshold = ranked[np.argpartition(-ranked, n - 1)[n - 1]]
+        top = np.flatnonzero(ranked >= threshold)
+        return top[np.lexsort((top, -ranked[top]))][:n]
+
+    def batch_top_k(self, rows, n=5, group=None, block_rows=256, workers=None):
+        """Top n neighbours of many rows at once, like top_k(row, n, group, rows sharing its key)
+
+        group is None (each row's own group), one group for all rows, or one group per row.
+        Queries are scored in blocks of block_rows against their whole group, so peak
+        memory is about workers x block_rows x group size x itemsize. Blocks run on a
+        thread pool (NumPy releases the GIL in the matrix products). Always exact, even
+        in approximate mode.
+
+        Returns (neighbours, scores), each of shape (len(rows), n): row positions padded
+        with -1 and scores padded with NaN when a group has fewer than n other players.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if group is None:
+            groups = self._groups[rows]
+        elif np.ndim(group) == 0:
+            groups = np.full(len(rows), group, dtype=object)
+        else:
+            groups = np.asarray(group, dtype=object)
+
+        neighbours = np.full((len(rows), n), -1, dtype=np.int64)
+        scores = np.full((len(rows), n), np.nan, dtype=self.dtype)
+
+        tasks = []
+        for name in pd.unique(groups):
+            part = self._partition(name)
+            queries = np.flatnonzero(groups == name)
+            if (part['local'][rows[queries]] < 0).any():
+                raise KeyError(f"Some rows are not in group {name}")
+            tasks.extend((part, queries[i:i + block_rows]) for i in range(0, len(queries), block_rows))
+
+        def run(task):
+            part, queries = task
+            matrix = part['matrix']
+            block = matrix[part['local'][rows[queries]]] @ matrix.T
+            for out, row_scores in zip(queries, block):
+                excluded = part['local'][self._rows_of_key.get(self._keys[rows[out]], [rows[out]])]
+                excluded = excluded[excluded >= 0]
+                row_scores[excluded] = -np.inf
+                k = min(n, len(row_scores) - len(excluded))
+                if k <= 0:
+                    continue
+                top = self._select(row_scores, k)
+                neighbours[out, :k] = part['rows'][top]
+                scores[out, :k] = row_scores[top]
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(run, tasks))
+        return neighbours, scores
+
+    def query(self, key, n=5, group=None):
+        """Most similar rows to the first row matching key, excluding every row with that key
+
+        Returns (index labels, scores); both empty if key is unknown.
+        """
+        rows = self._rows_of_key.get(key)
+        if not rows:
+            return self._labels[:0], np.array([], dtype=self.dtype)
+        found, scores = self.top_k(rows[0], n, group=group, exclude_rows=rows)
+        return self._labels[found], scores
+
+    def query_label(self, label, n=5, group=None):
+        """Like query() but starting from a dataframe index label"""
+        row = self._row_of_label[label]
+        key_rows = self._rows_of_key.get(self._keys[row], [row])
+        found, scores = self.top_k(row, n, group=group, exclude_rows=key_rows)
+        return self._labels[found], scores
@@ -0,0 +1,237 @@
+"""
+Compact player data export for the static website
+Writes the full dataset column-oriented (dictionary-encoded strings, integer-quantized
+numbers), sharded by position and league, with precomputed lookup tables (similar
+players, percentiles), a sharded player-name search index, precompressed copies and
+manifests
+"""
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.name_index import fold_name, NGRAM
+
+try:
+    import brotli
+except ImportError:  # optional: .br copies are skipped without it
+    brotli = None
+
+EXPORT_VERSION = 2
+MANIFEST = 'manifest.json'
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '-', str(text)).strip('-').lower()
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def _remove_stale(out_dir, written):
+    for path in out_dir.iterdir():
+        if path.is_file() and path.name not in written:
+            path.unlink()
+
+
+def compressed_copies(path):
+    """The files write_compressed(path, ...) writes: path, .gz and (with brotli) .br"""
+    path = Path(path)
+    suffixes = ['', '.gz'] + (['.br'] if brotli is not None else [])
+    return [path.with_name(path.name + suffix) for suffix in suffixes]
+
+
+def write_compressed(path, data):
+    """Write data (bytes) to path plus .gz (and .br when brotli is installed) siblings
+
+    Returns {'bytes', 'gz', 'br'} sizes; gzip output has no timestamp, so
+    unchanged data gives byte-identical files.
+    """
+    path = Path(path)
+    path.write_bytes(data)
+    sizes = {'bytes': len(data)}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    path.with_name(path.name + '.gz').write_bytes(gz)
+    sizes['gz'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        path.with_name(path.name + '.br').write_bytes(br)
+        sizes['br'] = len(br)
+    return sizes
+
+
+def encode_columns(df, columns, dictionaries):
+    """Column arrays for one shard
+
+    columns maps a column name to its spec: {'kind': 'text'} for plain strings,
+    {'kind': 'dict'} for codes into dictionaries[name], or
+    {'kind': 'number', 'scale': s} for round(value * s) as integers. Missing
+    values are null.
+    """
+    encoded = {}
+    for name, spec in columns.items():
+        series = df[name]
+        if spec['kind'] == 'dict':
+            codes = pd.Categorical(series, categories=dictionaries[name]).codes
+            encoded[name] = [int(c) if c >= 0 else None for c in codes]
+        elif spec['kind'] == 'number':
+            values = np.round(series.to_numpy(dtype=np.float64) * spec['scale'])
+            encoded[name] = [None if np.isnan(v) else int(v) for v in values]
+        else:
+            encoded[name] = [None if pd.isna(v) else str(v) for v in series]
+    return encoded
+
+
+def neighbour_table(neighbours, scores, scale=10000):
+    """Lookup table for precomputed similar players, keyed by player id
+
+    neighbours and scores are (players, k) arrays as returned by
+    FootballDataProcessor.neighbour_table() (-1 / NaN padded). The table holds
+    them flattened row-major: player id p's neighbours are ids[p*k:(p+1)*k],
+    with scores as integers at the given scale (null where padded).
+    """
+    neighbours = np.asarray(neighbours)
+    values = np.round(np.asarray(scores, dtype=np.float64) * scale).ravel()
+    return {
+        'kind': 'neighbours',
+        'k': int(neighbours.shape[1]),
+        'scale': scale,
+        'ids': neighbours.ravel().astype(int).tolist(),
+        'scores': [None if np.isnan(v) else int(v) for v in values],
+    }
+
+
+def percentile_table(percentiles, cohort, scale=10):
+    """Lookup table for precomputed percentiles, keyed by player id
+
+    percentiles is a (players, metrics) DataFrame such as
+    FootballDataProcessor.get_percentile_table() returns. Player id p's value
+    for metrics[j] is values[p*len(metrics) + j] / scale.
+    """
+    values = np.round(percentiles.to_numpy(dtype=np.float64) * scale).ravel()
+    return {
+        'kind': 'percentiles',
+        'cohort': cohort,
+        'metrics': list(percentiles.columns),
+        'scale': scale,
+        'values': [None if np.isnan(v) else int(v) for v in values],
+    }
+
+
+def export_players(df, out_dir, columns, shard_by=('Position', 'Comp'), tables=None):
+    """Write df as content-hashed shards plus manifest.json to out_dir; returns the manifest
+
+    Each shard holds the players of one (position, league) pair as
+    {"n": rows, "ids": [...], "columns": {name: array}}; a player's id is its
+    row position in df. tables maps names to lookup tables keyed by player id
+    (see neighbour_table() and percentile_table()), each written to its own
+    file. The manifest lists the column specs, the dictionaries of
+    dict-encoded columns, per shard its key values, row count, file name,
+    SHA-1 and raw/compressed sizes, and the same for each table. File names
+    contain their hash, so they can be cached indefinitely; files from older
+    exports are removed.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dictionaries = {
+        name: sorted(df[name].dropna().astype(str).unique())
+        for name, spec in columns.items() if spec['kind'] == 'dict'
+    }
+
+    shards, written = [], {MANIFEST}
+    groups = df.groupby(list(shard_by), sort=True)
+    for key, part in groups:
+        data = _dumps({
+            'n': len(part),
+            'ids': groups.indices[key].tolist(),
+            'columns': encode_columns(part, columns, dictionaries),
+        }).encode()
+        sha1 = hashlib.sha1(data).hexdigest()
+        name = '_'.join(_slug(k) for k in key) + f'.{sha1[:12]}.json'
+        sizes = write_compressed(out_dir / name, data)
+        written.update({name, name + '.gz', name + '.br'})
+        shards.append({'file': name, **dict(zip(shard_by, key)), 'rows': len(part), 'sha1': sha1, **sizes})
+
+    table_files = {}
+    for table_name, table in (tables or {}).items():
+        data = _dumps(table).encode()
+        sha1 = hashlib.sha1(data).hexdigest()
+        name = f'{_slug(table_name)}.{sha1[:12]}.json'
+        sizes = write_compressed(out_dir / name, data)
+        written.update({name, name + '.gz', name + '.br'})
+        table_files[table_name] = {'file': name, 'kind': table['kind'], 'sha1': sha1, **sizes}
+
+    manifest = {
+        'version': EXPORT_VERSION,
+        'total_players': len(df),
+        'shard_by': list(shard_by),
+        'columns': columns,
+        'dictionaries': dictionaries,
+        'shards': shards,
+        'tables': table_files,
+    }
+    write_compressed(out_dir / MANIFEST, _dumps(manifest).encode())
+    written.update({MANIFEST + '.gz', MANIFEST + '.br'})
+    _remove_stale(out_dir, written)
+    return manifest
+
+
+def _search_shard(char):
+    return char if char.isascii() and char.isalnum() else '_'
+
+
+def export_search_index(names, out_dir):
+    """Write a player-name search index for the search boxes to out_dir; returns its manifest
+
+    names holds one name per player id (row of the player export). Names are
+    folded like NameIndex (lower case, no accents) and split into one shard
+    per first character:
+    - keys/ids/full: sorted search keys (each full name and every word suffix
+      of it, so "odeg" finds "Martin Ødegaard"), the player id of each, and
+      1 where the key is the full name, for prefix search by binary search;
+    - postings: player ids per n-gram (NGRAM characters) for substring search.
+    Keys live in the shard of their first character and n-grams in the shard
+    of theirs, so a query reads one shard for prefixes plus one per distinct
+    first character of its n-grams.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    keys, postings = {}, {}
+    for row, name in enumerate(names):
+        folded = fold_name(name)
+        if not folded:
+            continue
+        words = folded.split(' ')
+        for i in range(len(words)):
+            key = ' '.join(words[i:])
+            keys.setdefault(_search_shard(key[0]), []).append((key, row, int(i == 0)))
+        for gram in sorted({folded[i:i + NGRAM] for i in range(len(folded) - NGRAM + 1)}):
+            postings.setdefault(_search_shard(gram[0]), {}).setdefault(gram, []).append(row)
+
+    shards, written = {}, {MANIFEST}
+    for shard in sorted(set(keys) | set(postings)):
+        entries = sorted(keys.get(shard, []))
+        data = _dumps({
+            'keys': [key for key, _, _ in entries],
+            'ids': [row for _, row, _ in entries],
+            'full': [full for _, _, full in entries],
+            'postings': dict(sorted(postings.get(shard, {}).items())),
+        }).encode()
+        sha1 = hashlib.sha1(data).hexdigest()
+        name = f'{shard}.{sha1[:12]}.json'
+        sizes = write_compressed(out_dir / name, data)
+        written.update({name, name + '.gz', name + '.br'})
+        shards[shard] = {'file': name, 'sha1': sha1, **sizes}
+
+    manifest = {'version': EXPORT_VERSION, 'ngram': NGRAM, 'total_players': len(names), 'shards': shards}
+    write_compressed(out_dir / MANIFEST, _dumps(manifest).encode())
+    written.update({MANIFEST + '.gz', MANIFEST + '.br'})
+    _remove_stale(out_dir, written)
+    return manifest
@@ -0,0 +1,321 @@
+"""
+Production static file serving for run_server.py
+A threaded HTTP/1.1 server that picks precompressed .br/.gz siblings, sends strong
+ETags, Last-Modified and long-lived Cache-Control for content-hashed files, answers
+conditional and range requests, and logs latency and bytes per request
+"""
+
+import email.utils
+import hashlib
+import http.client
+import http.server
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# File names carrying a content hash (players shards, chart data): safe to cache forever
+HASHED_NAME = re.compile(r'(^|[./_-])[0-9a-f]{12,}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Accept-Encoding token -> sibling file suffix, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def accepted_encodings(header):
+    """Encodings a client accepts (q=0 and malformed q-values excluded)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:] or 0) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class _ETagCache:
+    """Content hash per file, recomputed only when its size or mtime changes"""
+
+    def __init__(self):
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, stat):
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        etag = '"' + digest.hexdigest()[:24] + '"'
+        with self._lock:
+            self._hashes[path] = (signature, etag)
+        return etag
+
+
+class StaticHandler(http.server.SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler with compression negotiation, validators, ranges and timing logs
+
+    Directory listings and everything not handled here fall back to the base class.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients wait
+    # ~40ms for the delayed ACK on every response
+    disable_nagle_algorithm = True
+    etags = _ETagCache()
+    # True once _serve() takes a request over; errors sent before routing (400, 414, 501) log normally
+    _timed = False
+
+    def parse_request(self):
+        # Keep-alive connections reuse the handler, so reset per request
+        self._timed = False
+        return super().parse_request()
+
+    def log_request(self, code='-', size='-'):
+        # Files served here get the timed log line instead; fallbacks keep the base class log
+        if not self._timed:
+            super().log_request(code, size)
+
+    def _log_timed(self, status, sent, encoding):
+        elapsed = (time.perf_counter() - self._started) * 1000
+        self.log_message('"%s" %s %d %.1fms %s', self.requestline, status, sent, elapsed, encoding or '-')
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _resolve(self):
+        """(file path, stat) for the request, or None to defer to the base class"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not urlsplit(self.path).path.endswith('/'):
+                return None  # base class redirects to the slash URL
+            path = os.path.join(path, 'index.html')
+        try:
+            return path, os.stat(path)
+        except OSError:
+            return None
+
+    def _variant(self, path):
+        """(file to send, Content-Encoding or None) given Accept-Encoding"""
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        for name, suffix in ENCODINGS:
+            if name in accepted and os.path.isfile(path + suffix):
+                return path + suffix, name
+        return path, None
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _byte_range(self, size, etag):
+        """(start, end) inclusive for a satisfiable single Range, None for the full body, or 'invalid'"""
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range is not None and if_range.strip() != etag:
+            return None
+        match = RANGE.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            return None  # multiple or malformed ranges: send everything
+        first, last = match.groups()
+        if first == '':
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return 'invalid'
+        return start, end
+
+    def _serve(self, head):
+        self._started = time.perf_counter()
+        self._timed = False
+        resolved = self._resolve()
+        if resolved is None:
+            if head:
+                super().do_HEAD()
+            else:
+                super().do_GET()
+            return
+        path, _ = resolved
+        self._timed = True
+        ctype = self.guess_type(path)
+        file_path, encoding = self._variant(path)
+        stat = os.stat(file_path)
+        etag = self.etags.get(file_path, stat)
+        if encoding:
+            etag = etag[:-1] + '-' + encoding + '"'
+
+        headers = {
+            'ETag': etag,
+            'Last-Modified': email.utils.formatdate(stat.st_mtime, usegmt=True),
+            'Cache-Control': IMMUTABLE if HASHED_NAME.search(os.path.basename(path)) else REVALIDATE,
+            'Vary': 'Accept-Encoding',
+            'Accept-Ranges': 'bytes',
+        }
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self._log_timed(304, 0, encoding)
+            return
+
+        size = stat.st_size
+        byte_range = self._byte_range(size, etag)
+        if byte_range == 'invalid':
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self._log_timed(416, 0, encoding)
+            return
+
+        start, end = byte_range or (0, size - 1)
+        length = max(0, end - start + 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', ctype)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.send_header('Content-Length', str(length))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        sent = 0
+        if not head:
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(1 << 16, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    remaining -= len(chunk)
+        self._log_timed(206 if byte_range else 200, sent, encoding)
+
+
+class ProductionServer(http.server.ThreadingHTTPServer):
+    """One thread per connection, so a slow client does not block the others"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(directory, host='', port=8080, handler=StaticHandler):
+    """Threaded server for the files under directory"""
+    def factory(*args, **kwargs):
+        return handler(*args, directory=directory, **kwargs)
+    return ProductionServer((host, port), factory)
+
+
+# ============ LOAD TEST ============
+def _percentile(values, q):
+    """q-th percentile of sorted values, interpolated linearly as numpy.percentile does"""
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def load_test(base_url, paths=('/',), clients=8, requests=100, encoding='gzip, br', timeout=30):
+    """Fetch paths round-robin from clients keep-alive connections at once
+
+    Each client sends `requests` requests. Returns totals, throughput and
+    latency percentiles (milliseconds).
+    """
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    prefix = url.path.rstrip('/')
+    latencies, sizes, errors = [], [], []
+    lock = threading.Lock()
+
+    def client(offset):
+        connection = connection_class(url.hostname, url.port, timeout=timeout)
+        own_latencies, own_sizes, own_errors = [], [], []
+        for i in range(requests):
+            path = prefix + paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers={'Accept-Encoding': encoding})
+                response = connection.getresponse()
+                body = response.read()
+                if response.status >= 400:
+                    own_errors.append(f'{path}: HTTP {response.status}')
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                own_errors.append(f'{path}: {e!r}')
+                connection.close()
+                connection = connection_class(url.hostname, url.port, timeout=timeout)
+                continue
+            own_latencies.append(time.perf_counter() - start)
+            own_sizes.append(len(body))
+        connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            sizes.extend(own_sizes)
+            errors.extend(own_errors)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ms = sorted(latency * 1000 for latency in latencies) or [0.0]
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'megabytes_per_second': sum(sizes) / elapsed / 1e6,
+        'p50': _percentile(ms, 50),
+        'p95': _percentile(ms, 95),
+        'p99': _percentile(ms, 99),
+        'max': ms[-1],
+        'first_errors': errors[:5],
+    }
+
+
+def format_load_test(result):
+    lines = [
+        f"{result['clients']} clients: {result['requests']} requests in {result['seconds']:.2f}s, "
+        f"{result['errors']} errors",
+        f"  {result['requests_per_second']:.0f} requests/s, {result['megabytes_per_second']:.1f} MB/s",
+        f"  latency p50 {result['p50']:.1f}ms  p95 {result['p95']:.1f}ms  "
+        f"p99 {result['p99']:.1f}ms  max {result['max']:.1f}ms",
+    ]
+    lines += [f"  error: {e}" for e in result['first_errors']]
+    return '\n'.join(lines)
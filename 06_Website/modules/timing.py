@@ -0,0 +1,107 @@
+"""
+Timing spans for the Streamlit app
+Records how long each stage of a rerun takes (data loading, filtering, similarity,
+figure building, rendering) and summarizes the most recent samples per stage.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class SpanRecorder:
+    """Rolling window of durations per stage, shared by all sessions of a worker"""
+
+    def __init__(self, window=500):
+        """Keep the last `window` samples of each stage"""
+        self.window = window
+        self.started = time.time()
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Add one duration (in seconds) for stage"""
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            self._samples[stage].append(seconds)
+            self._totals[stage][0] += 1
+            self._totals[stage][1] += seconds
+
+    @contextmanager
+    def span(self, stage):
+        """Time the body of a with-block as one sample of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self):
+        """Per-stage count, total and rolling p50/p95/p99/max, in seconds"""
+        with self._lock:
+            snapshot = {stage: (np.fromiter(s, dtype=float), tuple(self._totals[stage]))
+                        for stage, s in self._samples.items()}
+
+        summary = {}
+        for stage, (samples, (count, total)) in sorted(snapshot.items()):
+            p50, p95, p99 = np.quantile(samples, QUANTILES)
+            summary[stage] = {
+                'count': count, 'total': total, 'window': len(samples),
+                'p50': p50, 'p95': p95, 'p99': p99, 'max': samples.max(),
+            }
+        return summary
+
+    def reset(self):
+        """Drop all samples"""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+        self.started = time.time()
+
+    def to_json(self):
+        """Summary as a JSON document"""
+        return json.dumps({'started': self.started, 'window': self.window, 'stages': self.summary()}, indent=2)
+
+    def to_prometheus(self, name='scout_stage_seconds'):
+        """Summary in the Prometheus text exposition format (one summary metric)"""
+        lines = [f'# HELP {name} Duration of app stages per rerun.', f'# TYPE {name} summary']
+        for stage, stats in self.summary().items():
+            label = stage.replace('\\', '\\\\').replace('"', '\\"')
+            for q, key in zip(QUANTILES, ('p50', 'p95', 'p99')):
+                lines.append(f'{name}{{stage="{label}",quantile="{q}"}} {stats[key]:.6f}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {stats["total"]:.6f}')
+            lines.append(f'{name}_count{{stage="{label}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class RerunProfiler:
+    """cProfile capture of one rerun, started and stopped explicitly
+
+    The app script has no single function to wrap (and st.rerun() can end it
+    early), so capture runs between start() and stop() calls.
+    """
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self, sort='cumulative', limit=40):
+        """Stop profiling and return the pstats report as text"""
+        self._profile.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
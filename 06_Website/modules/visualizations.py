@@ -7,6 +7,8 @@ import altair as alt
 import pandas as pd
 import numpy as np
 
+from modules.binning import ScatterBins, BINNING_MIN_POINTS
+
 
 class PlayerVisualizations:
     """Create interactive Altair visualizations for player analysis"""
@@ -116,7 +118,16 @@ class PlayerVisualizations:
         return chart
 
     def create_scatter_explorer(self, df, x_metric, y_metric, color_by='Position', size_metric=None):
-        """Create interactive scatter plot for exploring player metrics"""
+        """Create interactive scatter plot for exploring player metrics
+
+        From BINNING_MIN_POINTS players on, crowded areas are drawn as grid
+        cells shaded by player count and only the players around them as points.
+        """
+        bins = None
+        if len(df) >= BINNING_MIN_POINTS:
+            bins = ScatterBins(df[x_metric], df[y_metric])
+            df = df.iloc[bins.outliers]
+
         # Create selection for interaction
         selection = alt.selection_point(fields=['Player_Clean'], on='mouseover', empty=False)
 
@@ -172,6 +183,20 @@ class PlayerVisualizations:
             opacity=alt.condition(selection, alt.value(1.0), alt.value(0.4))
         ).add_params(selection)
 
+        if bins is not None:
+            x0, x1, y0, y1 = bins.cell_bounds()
+            cells = pd.DataFrame({'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1, 'Players': bins.counts})
+            rects = alt.Chart(cells).mark_rect(opacity=0.8).encode(
+                x=alt.X('x0:Q', title=x_metric.replace('_', ' ').title(), scale=alt.Scale(zero=False)),
+                x2='x1:Q',
+                y=alt.Y('y0:Q', title=y_metric.replace('_', ' ').title(), scale=alt.Scale(zero=False)),
+                y2='y1:Q',
+                color=alt.Color('Players:Q', scale=alt.Scale(scheme='greens', type='log'),
+                                legend=alt.Legend(title='Players per cell')),
+                tooltip=[alt.Tooltip('Players:Q', title='Players')]
+            )
+            points = alt.layer(rects, points).resolve_scale(color='independent')
+
         # Chart
         chart = points.properties(
             width=700,
@@ -1,26 +1,95 @@
 #!/usr/bin/env python3
 """
 Simple HTTP server to test the Football Scout Tool locally
-Run this script and open http://localhost:8000 in your browser
+Run this script and open http://localhost:8080 in your browser
+
+    python3 run_server.py                      # development server
+    python3 run_server.py --production         # threaded, compressed, cached (modules/static_server.py)
+    python3 run_server.py --api                # production server plus the JSON query API (modules/query_api.py)
+    python3 run_server.py --load-test http://localhost:8080 --clients 32
 """
 
+import argparse
 import http.server
 import socketserver
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 PORT = 8080
 
-# Change to the website directory
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Pages and data every visit loads, used by --load-test unless --paths is given
+LOAD_TEST_PATHS = [
+    '/', '/explore.html', '/compare.html', '/similar.html', '/analysis.html',
+    '/static/css/style.css', '/static/js/app.js', '/static/js/data.js',
+    '/static/data/metadata.json', '/static/data/players/manifest.json', '/static/charts/league_scatter.html',
+]
+
+
+def load_api(cache_size):
+    """QueryAPI over the same data selection as the app and generate_charts.py"""
+    from modules.data_processor import FootballDataProcessor
+    from modules.query_api import QueryAPI
+    from modules.player_store import dataset_signature
+
+    data_path = os.environ.get('SCOUT_DATA') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'players_data_light-2024_2025.csv')
+    query = {
+        'seasons': os.environ['SCOUT_SEASONS'].split(',') if os.environ.get('SCOUT_SEASONS') else None,
+        'leagues': os.environ['SCOUT_LEAGUES'].split(',') if os.environ.get('SCOUT_LEAGUES') else None,
+    }
+    processor = FootballDataProcessor(data_path, **query)
+    df = processor.load_and_clean(min_minutes=450)
+    print(f"Loaded {len(df)} players for the API")
+    return QueryAPI(processor, version=dataset_signature(data_path, **query)[:12], cache_size=cache_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--host', default='', help='interface to bind (default: all)')
+    parser.add_argument('--production', action='store_true',
+                        help='threaded server with precompressed files, ETags, caching and range requests')
+    parser.add_argument('--api', action='store_true',
+                        help='also answer /api/... queries from the player data (implies --production)')
+    parser.add_argument('--api-cache', type=int, default=1024, help='API responses kept in the LRU cache')
+    parser.add_argument('--load-test', metavar='URL', help='benchmark a running server instead of serving')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent load-test clients')
+    parser.add_argument('--requests', type=int, default=200, help='requests per load-test client')
+    parser.add_argument('--paths', nargs='+', default=LOAD_TEST_PATHS, help='load-test paths')
+    args = parser.parse_args()
+
+    if args.load_test:
+        from modules.static_server import load_test, format_load_test
+        print(format_load_test(load_test(args.load_test, args.paths, args.clients, args.requests)))
+        return
+
+    # Change to the website directory
+    directory = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(directory)
+
+    # The development server needs only the standard library; the others import their modules here
+    if args.api:
+        from modules.static_server import make_server
+        from modules.query_api import api_handler
+        httpd = make_server(directory, args.host, args.port, handler=api_handler(load_api(args.api_cache)))
+    elif args.production:
+        from modules.static_server import make_server
+        httpd = make_server(directory, args.host, args.port)
+    else:
+        httpd = socketserver.TCPServer((args.host, args.port), http.server.SimpleHTTPRequestHandler)
+
+    with httpd:
+        print(f"⚽ Football Scout Tool")
+        print(f"Server running at http://localhost:{args.port}/" + (
+            " (production mode with API)" if args.api else " (production mode)" if args.production else ""))
+        print("Press Ctrl+C to stop")
+        print()
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nServer stopped")
 
-Handler = http.server.SimpleHTTPRequestHandler
 
-with socketserver.TCPServer(("", PORT), Handler) as httpd:
-    print(f"⚽ Football Scout Tool")
-    print(f"Server running at http://localhost:{PORT}/")
-    print("Press Ctrl+C to stop")
-    print()
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\nServer stopped")
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function loadPlayerData() {
     try {
-        const response = await fetch('static/data/players_sample.json');
-        playerData = await response.json();
+        playerData = await loadPlayers();
         console.log('Loaded ' + playerData.length + ' players');
         updateAnalysisChart();
     } catch (error) {
@@ -20,8 +20,7 @@ async function loadMetadata() {
         window.footballData = {
             leagues: metadata.leagues,
             positions: metadata.positions,
-            teams: metadata.teams,
-            players: metadata.players
+            teams: metadata.teams
         };
 
         console.log('Metadata loaded successfully');
@@ -2,6 +2,7 @@
 let playerData = [];
 let selectedPlayer1 = null;
 let selectedPlayer2 = null;
+let percentileTable = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     loadPlayerData();
@@ -10,8 +11,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function loadPlayerData() {
     try {
-        const response = await fetch('static/data/players_sample.json');
-        playerData = await response.json();
+        [playerData, percentileTable] = await Promise.all([loadPlayers(), loadTable('percentiles_position')]);
         console.log('Loaded ' + playerData.length + ' players for comparison');
     } catch (error) {
         console.error('Error loading player data:', error);
@@ -40,7 +40,7 @@ function setupAutocomplete() {
         });
 
         // Input event listener
-        input.addEventListener('input', function() {
+        input.addEventListener('input', async function() {
             const query = this.value.toLowerCase().trim();
 
             if (query.length < 2) {
@@ -49,10 +49,13 @@ function setupAutocomplete() {
                 return;
             }
 
-            // Filter players by search query
-            const matches = playerData.filter(p =>
-                p.Player_Clean.toLowerCase().includes(query)
-            ).slice(0, 10); // Limit to 10 results
+            // Look the query up in the prebuilt search index (static/js/search.js)
+            const byId = playersById(playerData);
+            const ids = await searchPlayers(query, 10, byId);
+            if (this.value.toLowerCase().trim() !== query) {
+                return;  // a later keystroke has its own lookup
+            }
+            const matches = ids.map(id => byId[id]).filter(Boolean);
 
             if (matches.length === 0) {
                 dropdown.innerHTML = '<div class="autocomplete-item" style="color: #6b7280;">No players found</div>';
@@ -115,9 +118,9 @@ function addDropdownClickListeners(dropdown, input, inputId) {
 
             // Store selected player
             if (inputId === 'player1') {
-                selectedPlayer1 = playerData.find(p => p.Player_Clean === playerName);
+                selectedPlayer1 = findPlayer(playerData, playerName);
             } else {
-                selectedPlayer2 = playerData.find(p => p.Player_Clean === playerName);
+                selectedPlayer2 = findPlayer(playerData, playerName);
             }
         });
     });
@@ -132,8 +135,8 @@ function comparePlayer() {
         return;
     }
 
-    const player1 = playerData.find(p => p.Player_Clean === player1Name);
-    const player2 = playerData.find(p => p.Player_Clean === player2Name);
+    const player1 = findPlayer(playerData, player1Name);
+    const player2 = findPlayer(playerData, player2Name);
 
     if (!player1 || !player2) {
         alert('Player not found');
@@ -155,6 +158,12 @@ function displayComparison(player1, player2) {
     createComparisonChart(player1, player2);
 }
 
+// Percentile of a player within their position (precomputed by generate_charts.py)
+function percentileLabel(player, metric) {
+    const value = percentileTable ? lookupPercentiles(percentileTable, player.id)[metric] : null;
+    return value === null || value === undefined ? '' : ` · P${Math.round(value)}`;
+}
+
 function displayPlayerCard(cardId, player) {
     const card = document.getElementById(cardId);
     card.innerHTML = `
@@ -171,19 +180,19 @@ function displayPlayerCard(cardId, player) {
             </div>
             <div class="stat">
                 <div class="stat-value">${player.Gls_per90?.toFixed(2) || 'N/A'}</div>
-                <div class="stat-label">Goals/90</div>
+                <div class="stat-label">Goals/90${percentileLabel(player, 'Gls_per90')}</div>
             </div>
             <div class="stat">
                 <div class="stat-value">${player.Ast_per90?.toFixed(2) || 'N/A'}</div>
-                <div class="stat-label">Assists/90</div>
+                <div class="stat-label">Assists/90${percentileLabel(player, 'Ast_per90')}</div>
             </div>
             <div class="stat">
                 <div class="stat-value">${player.xG_per90?.toFixed(2) || 'N/A'}</div>
-                <div class="stat-label">xG/90</div>
+                <div class="stat-label">xG/90${percentileLabel(player, 'xG_per90')}</div>
             </div>
             <div class="stat">
                 <div class="stat-value">${player.PrgC_per90?.toFixed(2) || 'N/A'}</div>
-                <div class="stat-label">Prog. Carries/90</div>
+                <div class="stat-label">Prog. Carries/90${percentileLabel(player, 'PrgC_per90')}</div>
             </div>
         </div>
     `;
@@ -192,18 +201,23 @@ function displayPlayerCard(cardId, player) {
 function createComparisonChart(player1, player2) {
     const metrics = ['Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90', 'PrgC_per90', 'Tkl_per90'];
 
+    const percentiles1 = percentileTable ? lookupPercentiles(percentileTable, player1.id) : {};
+    const percentiles2 = percentileTable ? lookupPercentiles(percentileTable, player2.id) : {};
+
     const data = [];
     metrics.forEach(metric => {
         if (player1[metric] !== undefined && player2[metric] !== undefined) {
             data.push({
                 Metric: metric.replace(/_/g, ' ').replace('per90', '/90'),
                 Player: player1.Player_Clean,
-                Value: player1[metric] || 0
+                Value: player1[metric] || 0,
+                Percentile: percentiles1[metric] ?? null
             });
             data.push({
                 Metric: metric.replace(/_/g, ' ').replace('per90', '/90'),
                 Player: player2.Player_Clean,
-                Value: player2[metric] || 0
+                Value: player2[metric] || 0,
+                Percentile: percentiles2[metric] ?? null
             });
         }
     });
@@ -233,7 +247,8 @@ function createComparisonChart(player1, player2) {
             "tooltip": [
                 {"field": "Player", "type": "nominal"},
                 {"field": "Metric", "type": "nominal"},
-                {"field": "Value", "type": "quantitative", "format": ".2f"}
+                {"field": "Value", "type": "quantitative", "format": ".2f"},
+                {"field": "Percentile", "type": "quantitative", "title": "Percentile (position)", "format": ".0f"}
             ]
         },
         "title": {
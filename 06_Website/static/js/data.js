@@ -0,0 +1,107 @@
+// Player data loader: reads the sharded, column-oriented export written by generate_charts.py
+const PLAYER_DATA_DIR = 'static/data/players/';
+let playerManifest = null;
+const shardCache = {};
+const tableCache = {};
+
+async function loadPlayerManifest() {
+    if (!playerManifest) {
+        // Shard names carry their content hash, so only the manifest needs revalidating
+        const response = await fetch(PLAYER_DATA_DIR + 'manifest.json', {cache: 'no-cache'});
+        playerManifest = await response.json();
+    }
+    return playerManifest;
+}
+
+// Player rows (one object per player) from the shards matching the filters,
+// e.g. loadPlayers({Position: ['FW'], Comp: ['es La Liga']}); omitted filters match everything
+async function loadPlayers(filters = {}) {
+    const manifest = await loadPlayerManifest();
+    const shards = manifest.shards.filter(shard =>
+        Object.entries(filters).every(([column, values]) => !values || values.includes(shard[column]))
+    );
+    const parts = await Promise.all(shards.map(loadShard));
+    return parts.flat();
+}
+
+function loadShard(shard) {
+    if (!shardCache[shard.file]) {
+        shardCache[shard.file] = fetch(PLAYER_DATA_DIR + shard.file)
+            .then(response => response.json())
+            .then(decodeShard);
+    }
+    return shardCache[shard.file];
+}
+
+// Column arrays back to row objects: dictionary codes to strings, quantized integers to numbers
+function decodeShard(shard) {
+    const columns = Object.entries(playerManifest.columns).map(([name, spec]) => {
+        const values = shard.columns[name];
+        if (spec.kind === 'dict') {
+            const dictionary = playerManifest.dictionaries[name];
+            return [name, values.map(code => code === null ? null : dictionary[code])];
+        }
+        if (spec.kind === 'number') {
+            return [name, values.map(v => v === null ? null : v / spec.scale)];
+        }
+        return [name, values];
+    });
+
+    const rows = new Array(shard.n);
+    for (let i = 0; i < shard.n; i++) {
+        const row = {id: shard.ids[i]};
+        columns.forEach(([name, values]) => { row[name] = values[i]; });
+        rows[i] = row;
+    }
+    return rows;
+}
+
+// Precomputed lookup table from the manifest ('similar_position', 'similar_all',
+// 'percentiles_position'), keyed by player id
+async function loadTable(name) {
+    if (!tableCache[name]) {
+        const manifest = await loadPlayerManifest();
+        tableCache[name] = fetch(PLAYER_DATA_DIR + manifest.tables[name].file).then(response => response.json());
+    }
+    return tableCache[name];
+}
+
+// The player with this exact name; for shared names the one the Python tool picks (lowest id)
+function findPlayer(players, name) {
+    return players.reduce((best, p) =>
+        p.Player_Clean === name && (!best || p.id < best.id) ? p : best, null);
+}
+
+// Player rows by id, built once per loaded player array
+const idIndexes = new WeakMap();
+function playersById(players) {
+    if (!idIndexes.has(players)) {
+        const byId = {};
+        players.forEach(p => { byId[p.id] = p; });
+        idIndexes.set(players, byId);
+    }
+    return idIndexes.get(players);
+}
+
+// Neighbours of a player from a 'neighbours' table, as player rows with a Similarity field
+function lookupNeighbours(table, players, id) {
+    const byId = playersById(players);
+    const result = [];
+    for (let i = id * table.k; i < (id + 1) * table.k; i++) {
+        if (table.ids[i] >= 0) {
+            result.push({...byId[table.ids[i]], Similarity: table.scores[i] / table.scale});
+        }
+    }
+    return result;
+}
+
+// {metric: percentile} of a player from a 'percentiles' table
+function lookupPercentiles(table, id) {
+    const m = table.metrics.length;
+    const result = {};
+    table.metrics.forEach((metric, j) => {
+        const value = table.values[id * m + j];
+        result[metric] = value === null ? null : value / table.scale;
+    });
+    return result;
+}
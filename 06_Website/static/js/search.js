@@ -0,0 +1,104 @@
+// Player name search over the prebuilt index written by generate_charts.py
+// (export_search_index in modules/static_export.py); results are player ids
+const SEARCH_INDEX_DIR = 'static/data/search/';
+let searchManifest = null;
+const searchShardCache = {};
+
+// Letters that NFKD does not decompose, as in modules/name_index.py
+const EXTRA_FOLDS = {
+    'ø': 'o', 'Ø': 'o', 'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe',
+    'đ': 'd', 'Đ': 'd', 'ð': 'd', 'Ð': 'd', 'ł': 'l', 'Ł': 'l',
+    'þ': 'th', 'Þ': 'th', 'ı': 'i', 'ß': 'ss'
+};
+
+// Lower-case, accent-free form of a name, matching fold_name() in Python
+function foldName(name) {
+    return Array.from(String(name), c => EXTRA_FOLDS[c] ?? c).join('')
+        .normalize('NFKD').replace(/\p{M}/gu, '')
+        .toLowerCase().split(/\s+/).filter(Boolean).join(' ');
+}
+
+function searchShardOf(char) {
+    return /^[a-z0-9]$/i.test(char) ? char : '_';
+}
+
+async function loadSearchShard(char) {
+    if (!searchManifest) {
+        searchManifest = fetch(SEARCH_INDEX_DIR + 'manifest.json', {cache: 'no-cache'}).then(r => r.json());
+    }
+    const entry = (await searchManifest).shards[searchShardOf(char)];
+    if (!entry) {
+        return null;
+    }
+    if (!searchShardCache[entry.file]) {
+        searchShardCache[entry.file] = fetch(SEARCH_INDEX_DIR + entry.file).then(r => r.json());
+    }
+    return searchShardCache[entry.file];
+}
+
+function lowerBound(keys, q) {
+    let lo = 0, hi = keys.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (keys[mid] < q) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+// Folded names of the players in a playersById() object, built once per object
+const foldedNames = new WeakMap();
+function foldedNamesOf(byId) {
+    if (!foldedNames.has(byId)) {
+        foldedNames.set(byId, Object.values(byId).map(p => [p.id, foldName(p.Player_Clean ?? '')]));
+    }
+    return foldedNames.get(byId);
+}
+
+// Ids of the players matching query, in the same order as NameIndex.search():
+// exact (folded) name matches, then name or word prefix matches, then substring
+// matches. byId (playersById() of the loaded players) confirms substring
+// candidates, and answers queries shorter than the n-gram length by a scan
+// over its names, as NameIndex.contains() does; without it those queries only
+// get exact and prefix matches.
+async function searchPlayers(query, limit = 10, byId = null) {
+    const q = foldName(query);
+    if (!q) {
+        return [];
+    }
+
+    const exact = [], prefix = new Set();
+    const shard = await loadSearchShard(q[0]);
+    if (shard) {
+        for (let i = lowerBound(shard.keys, q); i < shard.keys.length && shard.keys[i].startsWith(q); i++) {
+            if (shard.full[i] && shard.keys[i] === q) exact.push(shard.ids[i]);
+            prefix.add(shard.ids[i]);
+        }
+    }
+
+    let contains = [];
+    const n = searchManifest ? (await searchManifest).ngram : 3;
+    if (q.length < n) {
+        contains = byId ? foldedNamesOf(byId).filter(([, name]) => name.includes(q)).map(([id]) => id) : [];
+    } else {
+        const grams = new Set();
+        for (let i = 0; i + n <= q.length; i++) grams.add(q.slice(i, i + n));
+        const shards = await Promise.all([...grams].map(gram => loadSearchShard(gram[0])));
+        let candidates = null;
+        [...grams].forEach((gram, i) => {
+            const posting = new Set((shards[i] && shards[i].postings[gram]) || []);
+            candidates = candidates === null ? posting : new Set([...candidates].filter(id => posting.has(id)));
+        });
+        contains = [...candidates].filter(id => !byId || foldName(byId[id]?.Player_Clean ?? '').includes(q));
+    }
+
+    const ascending = (a, b) => a - b;
+    const results = [];
+    const seen = new Set();
+    [exact.sort(ascending), [...prefix].sort(ascending), contains.sort(ascending)].forEach(ids => ids.forEach(id => {
+        if (!seen.has(id)) {
+            seen.add(id);
+            results.push(id);
+        }
+    }));
+    return results.slice(0, limit);
+}
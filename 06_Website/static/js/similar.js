@@ -8,8 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function loadPlayerData() {
     try {
-        const response = await fetch('static/data/players_sample.json');
-        playerData = await response.json();
+        playerData = await loadPlayers();
         console.log('Loaded ' + playerData.length + ' players');
     } catch (error) {
         console.error('Error loading player data:', error);
@@ -35,7 +34,7 @@ function setupAutocomplete() {
     });
 
     // Input event listener
-    input.addEventListener('input', function() {
+    input.addEventListener('input', async function() {
         const query = this.value.toLowerCase().trim();
 
         if (query.length < 2) {
@@ -44,10 +43,13 @@ function setupAutocomplete() {
             return;
         }
 
-        // Filter players by search query
-        const matches = playerData.filter(p =>
-            p.Player_Clean.toLowerCase().includes(query)
-        ).slice(0, 10); // Limit to 10 results
+        // Look the query up in the prebuilt search index (static/js/search.js)
+        const byId = playersById(playerData);
+        const ids = await searchPlayers(query, 10, byId);
+        if (this.value.toLowerCase().trim() !== query) {
+            return;  // a later keystroke has its own lookup
+        }
+        const matches = ids.map(id => byId[id]).filter(Boolean);
 
         if (matches.length === 0) {
             dropdown.innerHTML = '<div class="autocomplete-item" style="color: #6b7280;">No players found</div>';
@@ -110,7 +112,7 @@ function addDropdownClickListeners(dropdown, input) {
     });
 }
 
-function findSimilarPlayers() {
+async function findSimilarPlayers() {
     const playerName = document.getElementById('player-search').value;
     const positionFilter = document.getElementById('position-filter-similar').value === 'true';
 
@@ -119,46 +121,16 @@ function findSimilarPlayers() {
         return;
     }
 
-    const targetPlayer = playerData.find(p => p.Player_Clean === playerName);
+    const targetPlayer = findPlayer(playerData, playerName);
 
     if (!targetPlayer) {
         alert('Player not found');
         return;
     }
 
-    const similarPlayers = calculateSimilarity(targetPlayer, positionFilter);
-    displaySimilarPlayers(targetPlayer, similarPlayers);
-}
-
-function calculateSimilarity(targetPlayer, positionFilter) {
-    const metrics = ['Gls_per90', 'Ast_per90', 'xG_per90', 'xAG_per90', 'PrgC_per90', 'Tkl_per90', 'Touches_per90', 'Cmp%'];
-
-    // Filter players
-    let candidates = playerData.filter(p => p.Player_Clean !== targetPlayer.Player_Clean);
-    if (positionFilter) {
-        candidates = candidates.filter(p => p.Position === targetPlayer.Position);
-    }
-
-    // Calculate similarity scores
-    candidates.forEach(player => {
-        let similarity = 0;
-        let validMetrics = 0;
-
-        metrics.forEach(metric => {
-            if (targetPlayer[metric] !== undefined && player[metric] !== undefined &&
-                targetPlayer[metric] !== null && player[metric] !== null) {
-                const diff = Math.abs(targetPlayer[metric] - player[metric]);
-                const maxVal = Math.max(targetPlayer[metric], player[metric], 1);
-                similarity += (1 - (diff / maxVal));
-                validMetrics++;
-            }
-        });
-
-        player.Similarity = validMetrics > 0 ? similarity / validMetrics : 0;
-    });
-
-    // Sort by similarity and return top 10
-    return candidates.sort((a, b) => b.Similarity - a.Similarity).slice(0, 10);
+    // Precomputed by generate_charts.py with the same cosine similarity as the Python tool
+    const table = await loadTable(positionFilter ? 'similar_position' : 'similar_all');
+    displaySimilarPlayers(targetPlayer, lookupNeighbours(table, playerData, targetPlayer.id));
 }
 
 function displaySimilarPlayers(targetPlayer, similarPlayers) {
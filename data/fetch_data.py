@@ -2,87 +2,143 @@
 Fetch player statistics from FBref for the Big 5 European Leagues
 """
 
-import pandas as pd
-import requests
-from io import StringIO
+import argparse
 import time
 import os
 
-# FBref URLs for Big 5 leagues player stats (2024-2025 season)
+from ingest import LeagueStore, join_tables, write_changeset
+from http_fetcher import Fetcher, FetchError, FixtureBackend
+from table_parser import extract_table
+
+# FBref competition id and URL name of the Big 5 leagues (2024-2025 season)
+LEAGUES = {
+    'Premier_League': (9, 'Premier-League'),
+    'La_Liga': (12, 'La-Liga'),
+    'Bundesliga': (20, 'Bundesliga'),
+    'Serie_A': (11, 'Serie-A'),
+    'Ligue_1': (13, 'Ligue-1'),
+}
+
+# Player tables fetched per league: page name -> id of the table on that page
+# (FBref ships them inside HTML comments). The first is the base every other table is joined onto.
+STAT_TABLES = {
+    'stats': 'stats_standard',
+    'shooting': 'stats_shooting',
+    'passing': 'stats_passing',
+    'defense': 'stats_defense',
+    'possession': 'stats_possession',
+    'keepers': 'stats_keeper',
+}
+PLAYER_TABLE_ID = STAT_TABLES['stats']
+
 LEAGUE_URLS = {
-    'Premier_League': 'https://fbref.com/en/comps/9/stats/Premier-League-Stats',
-    'La_Liga': 'https://fbref.com/en/comps/12/stats/La-Liga-Stats',
-    'Bundesliga': 'https://fbref.com/en/comps/20/stats/Bundesliga-Stats',
-    'Serie_A': 'https://fbref.com/en/comps/11/stats/Serie-A-Stats',
-    'Ligue_1': 'https://fbref.com/en/comps/13/stats/Ligue-1-Stats',
+    (league, page): f'https://fbref.com/en/comps/{comp_id}/{page}/{slug}-Stats'
+    for league, (comp_id, slug) in LEAGUES.items()
+    for page in STAT_TABLES
 }
 
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(DATA_DIR, 'leagues')
+OUTPUT_PATH = os.path.join(DATA_DIR, 'player_stats_2024_2025.csv')
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, '.http_cache')
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-def fetch_league_stats(url, league_name):
-    """Fetch player stats table from FBref"""
-    print(f"Fetching {league_name}...")
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-
-        # Read all tables from the HTML
-        tables = pd.read_html(StringIO(response.text))
-
-        # The main stats table is usually one of the first few
-        for i, table in enumerate(tables):
-            cols = table.columns.tolist()
-            # Check for Player column (handle multi-index)
-            has_player = any('Player' in str(c) for c in cols)
-            if has_player and len(table) > 20:  # Main table has many rows
-                df = table.copy()
-                # Handle multi-level columns
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = ['_'.join([str(c) for c in col]).strip() for col in df.columns.values]
-                df['League'] = league_name
-                # Remove rows that are headers repeated in table
-                df = df[df.iloc[:, 0] != 'Player']
-                df = df[df.iloc[:, 0] != 'Rk']
-                print(f"  Found {len(df)} players")
-                return df
-
-        print(f"  Warning: Could not find player table")
-        return None
-    except Exception as e:
-        print(f"  Error: {e}")
-        return None
+def parse_league_stats(pages, league_name):
+    """Extract and join the player stats tables from a league's fetched FBref pages
+
+    pages maps each STAT_TABLES page name to its HTML. Returns None if any table is
+    missing, so a league is never stored with only part of its columns.
+    """
+    print(f"Parsing {league_name}...")
+    tables = {}
+    for page, table_id in STAT_TABLES.items():
+        # Only the player table is parsed (repeated header rows are dropped while parsing)
+        df = extract_table(pages[page], table_id)
+        if df is None or 'Player' not in df.columns:
+            print(f"  Warning: Could not find player table {table_id}")
+            return None
+        tables[table_id] = df
+
+    base = tables.pop(PLAYER_TABLE_ID)
+    df, unmatched = join_tables(base, tables)
+    for table_id, count in unmatched.items():
+        if count:
+            print(f"  Warning: {count} {table_id} rows not in {PLAYER_TABLE_ID}")
+    df['League'] = league_name
+    print(f"  Found {len(df)} players, {len(df.columns)} columns")
+    return df
 
 def main():
-    all_players = []
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--full', action='store_true', help='ignore stored hashes and rewrite every league')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent downloads')
+    parser.add_argument('--rate', type=float, default=10, help='requests per minute across all workers')
+    parser.add_argument('--max-age', type=float, default=0,
+                        help='reuse cached pages younger than this many seconds without revalidating')
+    parser.add_argument('--fixtures', help='read pages from this directory instead of FBref (for tests)')
+    args = parser.parse_args()
 
-    for league_name, url in LEAGUE_URLS.items():
-        df = fetch_league_stats(url, league_name)
+    # Shared rate limit across threads, retries on 429/5xx, ETag/Last-Modified revalidation
+    fetcher = Fetcher(
+        backend=FixtureBackend(args.fixtures) if args.fixtures else None,
+        cache_dir=HTTP_CACHE_DIR, rate=args.rate / 60, max_workers=args.workers, max_age=args.max_age, headers=HEADERS,
+    )
+    print(f"Fetching {len(STAT_TABLES)} tables for {len(LEAGUES)} leagues...")
+    start = time.perf_counter()
+    pages = fetcher.fetch_all(LEAGUE_URLS)
+    print(f"  Done in {time.perf_counter() - start:.1f}s ({fetcher.stats['requests']} requests, "
+          f"{fetcher.stats['not_modified']} not modified, {fetcher.stats['cache_hits']} from cache)")
+
+    store = LeagueStore(STORE_DIR)
+    if args.full:
+        store.manifest['leagues'] = {}
+    changes = {}
+
+    for league_name in LEAGUES:
+        league_pages = {page: pages[league_name, page] for page in STAT_TABLES}
+        errors = [page for page in league_pages.values() if isinstance(page, FetchError)]
+        if errors:
+            # Keep the stored table rather than storing a partial one
+            print(f"  Error fetching {league_name}: {errors[0]}")
+            continue
+        df = parse_league_stats(league_pages, league_name)
         if df is not None:
-            all_players.append(df)
-        # Be respectful to FBref servers - they rate limit
-        print("  Waiting 5 seconds...")
-        time.sleep(5)
-
-    if all_players:
-        # Combine all leagues
-        combined_df = pd.concat(all_players, ignore_index=True)
-
-        # Save to CSV
-        output_path = os.path.join(os.path.dirname(__file__), 'player_stats_2024_2025.csv')
-        combined_df.to_csv(output_path, index=False)
-        print(f"\nSaved {len(combined_df)} players to {output_path}")
-
-        # Also save a summary
-        print("\nLeague breakdown:")
-        print(combined_df['League'].value_counts())
-
-        # Print columns
-        print("\nColumns available:")
-        print(combined_df.columns.tolist()[:20], "...")
-    else:
+            # Unchanged leagues (same content hash) are not rewritten
+            change = store.update(league_name, df)
+            if change is None:
+                print("  Unchanged")
+            else:
+                changes[league_name] = change
+                print(f"  {len(change['inserted'])} inserted, {len(change['updated'])} updated, "
+                      f"{len(change['removed'])} removed")
+
+    store.save()
+    if not changes and os.path.exists(OUTPUT_PATH):
+        print("\nNo changes since the last fetch")
+        return
+
+    # Combine all leagues
+    combined_df = store.combined(list(LEAGUES))
+    if combined_df.empty:
         print("No data fetched!")
+        return
+
+    # Save to CSV
+    combined_df.to_csv(OUTPUT_PATH, index=False)
+    print(f"\nSaved {len(combined_df)} players to {OUTPUT_PATH}")
+    # Downstream indexes read this to rebuild only what changed
+    print(f"Changeset for {len(changes)} league(s): {write_changeset(DATA_DIR, changes)}")
+
+    # Also save a summary
+    print("\nLeague breakdown:")
+    print(combined_df['League'].value_counts())
+
+    # Print columns
+    print("\nColumns available:")
+    print(combined_df.columns.tolist()[:20], "...")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,254 @@
+"""
+Concurrent, rate-limited page fetcher with an on-disk HTTP cache
+Used by fetch_data.py. Requests go through a token bucket shared by all worker
+threads, 429/5xx responses are retried with exponential backoff, and cached pages
+are revalidated with ETag / Last-Modified so unchanged pages come back as 304.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ============ BACKENDS ============
+# A backend is called as backend(url, headers, timeout) and returns (status, headers, body bytes)
+
+class UrllibBackend:
+    """Standard-library HTTP backend"""
+
+    def __call__(self, url, headers, timeout):
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            # Non-2xx (including 304) still carries a status and headers
+            return e.code, dict(e.headers or {}), e.read() or b''
+
+
+class RequestsBackend:
+    """HTTP backend using requests (keeps one connection pool per thread)"""
+
+    def __init__(self):
+        import requests
+        self._requests = requests
+        self._local = threading.local()
+
+    def __call__(self, url, headers, timeout):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.get(url, headers=headers, timeout=timeout)
+        return response.status_code, dict(response.headers), response.content
+
+
+class FixtureBackend:
+    """Serves saved pages from a directory instead of the network (for tests)
+
+    A URL maps to the file named by url_to_filename(url). The file's hash is
+    used as its ETag, so conditional requests behave like a real server.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.requests = []
+
+    def __call__(self, url, headers, timeout):
+        self.requests.append(url)
+        path = os.path.join(self.directory, url_to_filename(url))
+        if not os.path.exists(path):
+            return 404, {}, b''
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag}, body
+
+
+def url_to_filename(url):
+    """File name for a URL: its path with / replaced, e.g. en_comps_9_stats_Premier-League-Stats.html"""
+    path = url.split('://', 1)[-1].split('/', 1)[-1].split('?', 1)[0]
+    return path.strip('/').replace('/', '_') + '.html'
+
+
+def default_backend():
+    """requests when it is installed, otherwise urllib"""
+    try:
+        return RequestsBackend()
+    except ImportError:
+        return UrllibBackend()
+
+
+# ============ CACHE ============
+class HttpCache:
+    """Response bodies on disk with the validators needed for conditional requests"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.directory, key + '.body'), os.path.join(self.directory, key + '.json')
+
+    def get(self, url):
+        """(meta, body) for a cached URL, or (None, None)"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def put(self, url, headers, body):
+        body_path, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag') or headers.get('etag'),
+            'last_modified': headers.get('Last-Modified') or headers.get('last-modified'),
+            'fetched': time.time(),
+        }
+        for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta), 'w')):
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def touch(self, url):
+        """Mark a cached response as revalidated now"""
+        meta, body = self.get(url)
+        if meta is not None:
+            self.put(url, {'ETag': meta['etag'], 'Last-Modified': meta['last_modified']}, body)
+
+
+# ============ FETCHER ============
+class FetchError(Exception):
+    """A page could not be fetched after all retries"""
+
+
+class Fetcher:
+    """Fetch pages on a bounded thread pool, politely and with caching
+
+    rate is requests per second across all threads (FBref asks for at most
+    about 10 per minute). Cached pages younger than max_age seconds are used
+    without any request; older ones are revalidated and cost a 304 if unchanged.
+    """
+
+    def __init__(self, backend=None, cache_dir=None, rate=10 / 60, burst=1, max_workers=4,
+                 retries=5, backoff=2.0, max_backoff=120, timeout=30, max_age=0, headers=None):
+        self.backend = backend or default_backend()
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.max_age = max_age
+        self.headers = dict(headers or {})
+        self.stats = {'requests': 0, 'not_modified': 0, 'cache_hits': 0, 'retries': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _retry_delay(self, attempt, headers):
+        retry_after = headers.get('Retry-After') or headers.get('retry-after')
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                try:
+                    return min(self.max_backoff, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+                except (TypeError, ValueError):
+                    pass
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def get(self, url):
+        """Body of url as text, from the cache when it is fresh or unchanged"""
+        meta, cached = self.cache.get(url) if self.cache else (None, None)
+        if meta is not None and time.time() - meta['fetched'] < self.max_age:
+            self._count('cache_hits')
+            return cached.decode('utf-8')
+
+        headers = dict(self.headers)
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self._count('requests')
+            try:
+                status, response_headers, body = self.backend(url, headers, self.timeout)
+            except OSError as e:
+                # Connection errors are retried like 5xx
+                status, response_headers, body, error = None, {}, b'', e
+            else:
+                error = None
+
+            if status == 304 and cached is not None:
+                self._count('not_modified')
+                self.cache.touch(url)
+                return cached.decode('utf-8')
+            if status is not None and 200 <= status < 300:
+                if self.cache:
+                    self.cache.put(url, response_headers, body)
+                return body.decode('utf-8')
+            if status is not None and status not in RETRY_STATUSES:
+                raise FetchError(f"{url}: HTTP {status}")
+            if attempt < self.retries:
+                self._count('retries')
+                time.sleep(self._retry_delay(attempt, response_headers))
+
+        raise FetchError(f"{url}: gave up after {self.retries + 1} attempts ({error or f'HTTP {status}'})")
+
+    def fetch_all(self, urls):
+        """Fetch a {name: url} mapping concurrently; returns {name: text or FetchError}"""
+        def fetch(url):
+            try:
+                return self.get(url)
+            except FetchError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(zip(urls, pool.map(fetch, urls.values())))
@@ -0,0 +1,175 @@
+"""
+Incremental ingestion for fetch_data.py
+Joins a league's FBref stats tables into one wide table, keeps one CSV per league plus
+a manifest of content hashes, so a refresh only rewrites the leagues that changed and
+reports which players were inserted, updated or removed
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '06_Website'))
+
+from modules.changes import KEY_COLS, player_keys
+
+MANIFEST = 'manifest.json'
+
+# Columns every FBref player table repeats; only the base table's copy is kept
+IDENTITY_COLS = ['Rk', 'Player', 'Nation', 'Pos', 'Squad', 'Comp', 'Age', 'Born', '90s', 'Matches']
+
+
+def _same_values(a, b):
+    """True if two equal-length arrays hold the same values (missing values match each other)"""
+    a, b = pd.Series(a), pd.Series(b)
+    return bool((a.eq(b) | (a.isna() & b.isna())).all())
+
+
+def join_tables(base, tables, key_cols=KEY_COLS):
+    """Join extra stats tables onto the base (standard) table by player key
+
+    tables maps a table id (e.g. 'stats_shooting') to its DataFrame. The base table's
+    keys are indexed once, every other table is mapped onto base row positions in a
+    single pass, and its columns are scattered into full-length arrays, so the cost
+    is linear in the total number of cells. Identity columns repeated by every table
+    are dropped, and so is any other column whose name is already present with the
+    same values for the rows this table covers (Gls in the shooting table). Only a
+    name whose values differ is kept, with a _<table id> suffix as in the Kaggle
+    dataset (Gls_stats_shooting). Rows with no match in the base table (and so no
+    minutes) are dropped. Returns (wide DataFrame, {table id: unmatched rows}).
+    """
+    position = {}
+    for i, key in enumerate(player_keys(base, key_cols)):
+        position.setdefault(key, i)
+    n = len(base)
+
+    columns = {name: base[name].to_numpy() for name in base.columns}
+    unmatched = {}
+    for table_id, df in tables.items():
+        rows = np.array([position.get(key, -1) for key in player_keys(df, key_cols)], dtype=np.int64)
+        found = rows >= 0
+        unmatched[table_id] = int((~found).sum())
+        target = rows[found]
+        # Integer columns stay integers when the table covers every base row
+        complete = bool(np.bincount(target, minlength=n).all()) if n else True
+
+        for name in df.columns:
+            if name in IDENTITY_COLS:
+                continue
+            values = df[name].to_numpy()[found]
+            if name in columns:
+                if _same_values(columns[name][target], values):
+                    continue  # redundant copy of a column we already have
+                name = f'{name}_{table_id}'
+            if complete:
+                column = np.empty(n, dtype=values.dtype)
+            elif values.dtype.kind in 'iufb':
+                column = np.full(n, np.nan)
+            else:
+                column = np.full(n, None, dtype=object)
+            column[target] = values
+            columns[name] = column
+
+    # One DataFrame construction instead of a merge (and a copy) per table
+    return pd.DataFrame(columns), unmatched
+
+
+def table_hash(df):
+    """Content hash of a whole league table"""
+    return hashlib.sha1(df.to_csv(index=False).encode()).hexdigest()
+
+
+def row_hashes(df):
+    """Content hash per player, keyed by the JSON-encoded (player, squad, born) key"""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return {json.dumps(key): format(h, '016x') for key, h in zip(player_keys(df), hashes)}
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class LeagueStore:
+    """Directory of per-league tables with their content hashes
+
+    Layout:
+        <directory>/manifest.json          table hash and per-player row hashes per league
+        <directory>/<league>.csv           latest table for each league
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'leagues': {}}
+
+    def path(self, league):
+        return os.path.join(self.directory, f'{league}.csv')
+
+    def leagues(self):
+        return list(self.manifest['leagues'])
+
+    def update(self, league, df):
+        """Store a freshly fetched league table; returns its change, or None if identical
+
+        The change is {'inserted', 'updated', 'removed'} lists of player keys. Only
+        leagues whose table hash differs are compared row by row and rewritten.
+        """
+        missing = [c for c in KEY_COLS if c not in df.columns]
+        if missing:
+            raise KeyError(f"{league} table has no {missing} column(s)")
+
+        digest = table_hash(df)
+        previous = self.manifest['leagues'].get(league)
+        if previous is not None and previous['sha1'] == digest:
+            return None
+
+        rows = row_hashes(df)
+        old_rows = previous['rows'] if previous is not None else {}
+        change = {
+            'inserted': [json.loads(k) for k in rows if k not in old_rows],
+            'updated': [json.loads(k) for k, h in rows.items() if k in old_rows and old_rows[k] != h],
+            'removed': [json.loads(k) for k in old_rows if k not in rows],
+        }
+
+        df.to_csv(self.path(league), index=False)
+        self.manifest['leagues'][league] = {'sha1': digest, 'rows': rows, 'updated': time.time()}
+        return change
+
+    def save(self):
+        """Write the manifest (after the league files, so it never points at stale data)"""
+        _write_atomic(os.path.join(self.directory, MANIFEST), json.dumps(self.manifest))
+
+    def combined(self, leagues=None):
+        """All stored leagues as one table, in the given (or stored) league order"""
+        frames = [pd.read_csv(self.path(league)) for league in (leagues or self.leagues())
+                  if league in self.manifest['leagues']]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def write_changeset(directory, changes):
+    """Save a changeset as <directory>/changesets/<timestamp>.json and <directory>/changeset.json
+
+    changes maps league names to the dicts returned by LeagueStore.update().
+    Returns the path of the timestamped file.
+    """
+    history = os.path.join(directory, 'changesets')
+    os.makedirs(history, exist_ok=True)
+    created = time.strftime('%Y%m%dT%H%M%S')
+    text = json.dumps({'created': created, 'leagues': changes}, indent=1)
+    path = os.path.join(history, f'{created}.json')
+    _write_atomic(path, text)
+    _write_atomic(os.path.join(directory, 'changeset.json'), text)
+    return path
@@ -0,0 +1,173 @@
+"""
+Streaming extraction of one FBref stats table
+Finds a table by its id (also inside the HTML comments FBref hides most tables in)
+and parses just that table's rows with an incremental tokenizer, straight into columns
+"""
+
+import html as html_lib
+import re
+
+import numpy as np
+import pandas as pd
+
+# Body rows FBref repeats as headers every few rows, or uses as spacers
+SKIP_ROW_CLASSES = {'thead', 'over_header', 'spacer'}
+
+# Cells whose text needs cleaning before the numeric conversion, by data-stat
+CELL_CLEANERS = {
+    'age': lambda text: text.split('-')[0],  # "25-123" = 25 years, 123 days
+}
+
+FEED_CHUNK = 1 << 16
+
+_TOKEN = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>|([^<]+)')
+_ATTR = re.compile(r'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*"([^"]*)"')
+
+
+class TableExtractor:
+    """Incremental parser collecting the header and body cells of the table with id table_id
+
+    feed() accepts the page in arbitrary chunks and returns True once the table has
+    been read, so callers can stop reading. Only tags that matter for table structure
+    (table, thead, tbody, tr, th, td) are interpreted; markup inside cells is dropped.
+    Header names come from the last header row, and over-header groups (e.g.
+    'Per 90 Minutes') are kept to tell repeated names apart.
+    """
+
+    def __init__(self, table_id):
+        self.table_id = table_id
+        self.found = False
+        self.done = False
+        self.header = []      # (over_header, name, data_stat) per column
+        self.columns = []     # one list of cell strings per column
+        self._over = []       # over-header group per column position
+        self._buffer = ''     # unparsed tail of the last chunk (an unfinished tag)
+        self._depth = 0       # table nesting depth once inside the target table
+        self._section = None  # 'thead' or 'tbody'
+        self._row = None      # cells of the current row, None when skipping it
+        self._row_is_over = False
+        self._cell = None     # text parts of the current cell
+        self._cell_attrs = {}
+
+    def feed(self, chunk):
+        """Parse the next chunk of HTML; returns True when the table is complete"""
+        if self.done:
+            return True
+        text = self._buffer + chunk
+        # Hold back a trailing partial tag until the next chunk
+        cut = text.rfind('<')
+        if cut >= 0 and text.find('>', cut) < 0:
+            text, self._buffer = text[:cut], text[cut:]
+        else:
+            self._buffer = ''
+
+        for match in _TOKEN.finditer(text):
+            closing, tag, attrs, data = match.groups()
+            if data is not None:
+                if self._cell is not None:
+                    self._cell.append(data)
+            elif closing:
+                self._end(tag.lower())
+            else:
+                self._start(tag.lower(), attrs)
+            if self.done:
+                self._buffer = ''
+                return True
+        return False
+
+    def _start(self, tag, attrs):
+        if self._depth == 0:
+            if tag == 'table' and f'id="{self.table_id}"' in attrs:
+                self.found = True
+                self._depth = 1
+            return
+        if tag == 'table':
+            self._depth += 1
+        elif self._depth > 1:
+            return
+        elif tag in ('thead', 'tbody'):
+            self._section = tag
+        elif tag == 'tr':
+            classes = set(dict(_ATTR.findall(attrs)).get('class', '').split())
+            self._row_is_over = 'over_header' in classes
+            skip = self._section == 'tbody' and classes & SKIP_ROW_CLASSES
+            self._row = None if skip else []
+        elif tag in ('th', 'td') and self._row is not None:
+            self._cell = []
+            self._cell_attrs = dict(_ATTR.findall(attrs))
+
+    def _end(self, tag):
+        if self._depth == 0:
+            return
+        if tag == 'table':
+            self._depth -= 1
+            self.done = self._depth == 0
+        elif self._depth > 1:
+            return
+        elif tag in ('th', 'td') and self._cell is not None:
+            text = html_lib.unescape(''.join(self._cell)).strip()
+            self._row.append((text, self._cell_attrs))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._end_row(self._row)
+            self._row = None
+
+    def _end_row(self, cells):
+        if self._section == 'thead' and self._row_is_over:
+            self._over = []
+            for text, attrs in cells:
+                self._over.extend([text] * int(attrs.get('colspan', 1)))
+        elif self._section == 'thead':
+            self.header = [
+                (self._over[i] if i < len(self._over) else '', text, attrs.get('data-stat', ''))
+                for i, (text, attrs) in enumerate(cells)
+            ]
+            self.columns = [[] for _ in self.header]
+        elif self.header and len(cells) == len(self.header):
+            for column, (text, attrs), (_, _, stat) in zip(self.columns, cells, self.header):
+                cleaner = CELL_CLEANERS.get(stat)
+                column.append(cleaner(text) if cleaner and text else text)
+
+
+def _typed(values):
+    """Numeric array when every non-empty cell is a number (thousands commas allowed), else strings"""
+    stripped = [v.replace(',', '') for v in values]
+    try:
+        numbers = np.array([float(v) if v else np.nan for v in stripped])
+    except ValueError:
+        return pd.array([v if v else None for v in values], dtype=object)
+    finite = numbers[~np.isnan(numbers)]
+    if len(finite) == len(numbers) and np.all(finite == np.round(finite)):
+        return numbers.astype(np.int64)
+    return numbers
+
+
+def column_names(header):
+    """Header text as column names; a repeated name is prefixed with its over-header group"""
+    names, seen = [], set()
+    for over, name, stat in header:
+        label = name or stat
+        if label in seen:
+            label = f'{over}_{label}' if over else f'{label}_{stat}'
+        seen.add(label)
+        names.append(label)
+    return names
+
+
+def extract_table(html, table_id):
+    """DataFrame of the table with id table_id in html, or None if there is no such table"""
+    # Jump straight to the table's opening tag, even when it sits inside a comment;
+    # FBref stats tables are never nested, so nothing before it is needed
+    marker = html.find(f'id="{table_id}"')
+    if marker < 0:
+        return None
+    start = max(html.rfind('<table', 0, marker), 0)
+
+    table = TableExtractor(table_id)
+    for offset in range(start, len(html), FEED_CHUNK):
+        if table.feed(html[offset:offset + FEED_CHUNK]):
+            break
+    if not table.found or not table.header:
+        return None
+    names = column_names(table.header)
+    return pd.DataFrame({name: _typed(values) for name, values in zip(names, table.columns)})